@@ -1,65 +1,108 @@
 import torch, os, cv2
+import numpy as np
 from utils.dist_utils import dist_print
 import torch, os
-from utils.common import merge_config, get_model
+from utils.common import merge_config
+from utils.infer_utils import build_model, configure_threads, forward
 import tqdm
 import torchvision.transforms as transforms
 from data.dataset import LaneTestDataset
+from deploy.lane_decode import lane_slots
+
+def _window_soft_argmax(loc, local_width):
+    # loc: [N, grid, cls, lanes] -> argmax 주변 ±local_width 구간 softmax 기대값 + 0.5, [N, cls, lanes]
+    num_grid = loc.shape[1]
+    max_ind = loc.argmax(1, keepdim=True)                                           # [N, 1, cls, lanes]
+    offsets = torch.arange(-local_width, local_width + 1, device=loc.device).view(1, -1, 1, 1)
+    ind = max_ind + offsets                                                         # [N, 2w+1, cls, lanes]
+    inside = (ind >= 0) & (ind <= num_grid - 1)
+    ind = ind.clamp(0, num_grid - 1)
+    logits = loc.gather(1, ind).masked_fill(~inside, float('-inf'))
+    return (logits.softmax(1) * ind.to(loc.dtype)).sum(1) + 0.5
+
+
+def _per_image(value, batch_size, device):
+    # 공통 크기(int) 또는 이미지별 크기 시퀀스 -> [N, 1, 1] float64
+    return torch.as_tensor(value, dtype=torch.float64, device=device).expand(batch_size).reshape(-1, 1, 1)
+
+
+def decode_lanes(pred, row_anchor, col_anchor, local_width = 1, original_image_width = 1640, original_image_height = 590,
+                 row_lane_idx = (1, 2), col_lane_idx = (0, 3)):
+    """
+    배치 전체 [N, grid, cls, lanes]를 텐서가 있는 장치에서 그대로 디코드
+    original_image_width/height: 공통 크기 또는 이미지별 크기 시퀀스
+    반환: coords [N, L, K, 2] (x, y) float64, point_mask [N, L, K], lane_mask [N, L]
+      L = row 레인 + col 레인 (pred2coords와 같은 순서), K = max(num_cls_row, num_cls_col), 빈 칸은 0
+    slice_head() 모델(레인 축이 사용 레인만)의 출력도 그대로 받음
+    """
+    loc_row, loc_col = pred['loc_row'], pred['loc_col']
+    batch_size, num_grid_row, num_cls_row, _ = loc_row.shape
+    _, num_grid_col, num_cls_col, _ = loc_col.shape
+    device = loc_row.device
+    row_lane_idx = lane_slots(loc_row.shape[3], row_lane_idx)
+    col_lane_idx = lane_slots(loc_col.shape[3], col_lane_idx)
+    width = _per_image(original_image_width, batch_size, device)
+    height = _per_image(original_image_height, batch_size, device)
+
+    # row 레인: x = 기대 grid 위치, y = row 앵커
+    loc = _window_soft_argmax(loc_row[..., row_lane_idx], local_width)           # [N, cls, Lr]
+    valid_row = pred['exist_row'][..., row_lane_idx].argmax(1).bool()            # [N, cls, Lr]
+    x = (loc / (num_grid_row - 1) * width.to(loc.dtype)).double()
+    y = torch.as_tensor(row_anchor, dtype=torch.float64, device=device).view(1, -1, 1) * height
+    row_xy = torch.stack([x, y.expand_as(x)], dim=-1)                             # [N, cls, Lr, 2]
+    row_lane = valid_row.sum(1) > num_cls_row / 2                                  # [N, Lr]
+
+    # col 레인: x = col 앵커, y = 기대 grid 위치
+    loc = _window_soft_argmax(loc_col[..., col_lane_idx], local_width)
+    valid_col = pred['exist_col'][..., col_lane_idx].argmax(1).bool()
+    y = (loc / (num_grid_col - 1) * height.to(loc.dtype)).double()
+    x = torch.as_tensor(col_anchor, dtype=torch.float64, device=device).view(1, -1, 1) * width
+    col_xy = torch.stack([x.expand_as(y), y], dim=-1)
+    col_lane = valid_col.sum(1) > num_cls_col / 4
+
+    num_cls = max(num_cls_row, num_cls_col)
+    num_lanes = len(row_lane_idx) + len(col_lane_idx)
+    coords = torch.zeros(batch_size, num_lanes, num_cls, 2, dtype=torch.float64, device=device)
+    point_mask = torch.zeros(batch_size, num_lanes, num_cls, dtype=torch.bool, device=device)
+    nr = len(row_lane_idx)
+    coords[:, :nr, :num_cls_row] = row_xy.transpose(1, 2)
+    coords[:, nr:, :num_cls_col] = col_xy.transpose(1, 2)
+    lane_mask = torch.cat([row_lane, col_lane], dim=1)
+    point_mask[:, :nr, :num_cls_row] = valid_row.transpose(1, 2)
+    point_mask[:, nr:, :num_cls_col] = valid_col.transpose(1, 2)
+    point_mask &= lane_mask[..., None]
+    return coords, point_mask, lane_mask
+
+
+def coords_to_lists(coords, point_mask, lane_mask):
+    """
+    decode_lanes 결과 -> 이미지별 [[(x, y), ...], ...] (정수 픽셀, 유효 레인만)
+    """
+    coords = coords.cpu().numpy().astype(int)
+    point_mask, lane_mask = point_mask.cpu().numpy(), lane_mask.cpu().numpy()
+    out = []
+    for b in range(coords.shape[0]):
+        out.append([[tuple(pt) for pt in coords[b, l][point_mask[b, l]].tolist()]
+                    for l in range(coords.shape[1]) if lane_mask[b, l]])
+    return out
+
 
 def pred2coords(pred, row_anchor, col_anchor, local_width = 1, original_image_width = 1640, original_image_height = 590):
-    batch_size, num_grid_row, num_cls_row, num_lane_row = pred['loc_row'].shape
-    batch_size, num_grid_col, num_cls_col, num_lane_col = pred['loc_col'].shape
-
-    max_indices_row = pred['loc_row'].argmax(1).cpu()
-    # n , num_cls, num_lanes
-    valid_row = pred['exist_row'].argmax(1).cpu()
-    # n, num_cls, num_lanes
-
-    max_indices_col = pred['loc_col'].argmax(1).cpu()
-    # n , num_cls, num_lanes
-    valid_col = pred['exist_col'].argmax(1).cpu()
-    # n, num_cls, num_lanes
-
-    pred['loc_row'] = pred['loc_row'].cpu()
-    pred['loc_col'] = pred['loc_col'].cpu()
-
-    coords = []
-
-    row_lane_idx = [1,2]
-    col_lane_idx = [0,3]
-
-    for i in row_lane_idx:
-        tmp = []
-        if valid_row[0,:,i].sum() > num_cls_row / 2:
-            for k in range(valid_row.shape[1]):
-                if valid_row[0,k,i]:
-                    all_ind = torch.tensor(list(range(max(0,max_indices_row[0,k,i] - local_width), min(num_grid_row-1, max_indices_row[0,k,i] + local_width) + 1)))
-                    
-                    out_tmp = (pred['loc_row'][0,all_ind,k,i].softmax(0) * all_ind.float()).sum() + 0.5
-                    out_tmp = out_tmp / (num_grid_row-1) * original_image_width
-                    tmp.append((int(out_tmp), int(row_anchor[k] * original_image_height)))
-            coords.append(tmp)
-
-    for i in col_lane_idx:
-        tmp = []
-        if valid_col[0,:,i].sum() > num_cls_col / 4:
-            for k in range(valid_col.shape[1]):
-                if valid_col[0,k,i]:
-                    all_ind = torch.tensor(list(range(max(0,max_indices_col[0,k,i] - local_width), min(num_grid_col-1, max_indices_col[0,k,i] + local_width) + 1)))
-                    
-                    out_tmp = (pred['loc_col'][0,all_ind,k,i].softmax(0) * all_ind.float()).sum() + 0.5
-
-                    out_tmp = out_tmp / (num_grid_col-1) * original_image_height
-                    tmp.append((int(col_anchor[k] * original_image_width), int(out_tmp)))
-            coords.append(tmp)
-
-    return coords
+    # 배치 0번 이미지의 좌표 리스트 (기존 인터페이스). 배치 전체는 decode_lanes / coords_to_lists 사용
+    first = {k: v[:1] for k, v in pred.items()}
+    # 스칼라(numpy 정수 포함)는 그대로, 이미지별 시퀀스면 0번 값
+    width = original_image_width if np.ndim(original_image_width) == 0 else original_image_width[0]
+    height = original_image_height if np.ndim(original_image_height) == 0 else original_image_height[0]
+    return coords_to_lists(*decode_lanes(first, row_anchor, col_anchor, local_width, width, height))[0]
+
+
 if __name__ == "__main__":
     torch.backends.cudnn.benchmark = True
 
     args, cfg = merge_config()
-    cfg.batch_size = 1
-    print('setting batch_size to 1 for demo generation')
+    # 설정 파일의 batch_size는 학습용이므로 --batch_size를 준 경우에만 배치로 생성
+    cfg.batch_size = args.batch_size or 1
+    print(f'setting batch_size to {cfg.batch_size} for demo generation')
 
     dist_print('start testing...')
     assert cfg.backbone in ['18','34','50','101','152','50next','101next','50wide','101wide']
@@ -71,18 +114,9 @@ if __name__ == "__main__":
     else:
         raise NotImplementedError
 
-    net = get_model(cfg)
-
-    state_dict = torch.load(cfg.test_model, map_location='cpu')['model']
-    compatible_state_dict = {}
-    for k, v in state_dict.items():
-        if 'module.' in k:
-            compatible_state_dict[k[7:]] = v
-        else:
-            compatible_state_dict[k] = v
-
-    net.load_state_dict(compatible_state_dict, strict=False)
-    net.eval()
+    # CUDA가 없으면 CPU (channels_last, --threads, --amp 시 bf16)
+    configure_threads(args.threads)
+    net = build_model(cfg, checkpoint = cfg.test_model, device = args.device)
 
     img_transforms = transforms.Compose([
         transforms.Resize((int(cfg.train_height / cfg.crop_ratio), cfg.train_width)),
@@ -100,21 +134,20 @@ if __name__ == "__main__":
     else:
         raise NotImplementedError
     for split, dataset in zip(splits, datasets):
-        loader = torch.utils.data.DataLoader(dataset, batch_size=1, shuffle = False, num_workers=1)
+        loader = torch.utils.data.DataLoader(dataset, batch_size=cfg.batch_size, shuffle = False, num_workers=1)
         fourcc = cv2.VideoWriter_fourcc(*'MJPG')
         print(split[:-3]+'avi')
         vout = cv2.VideoWriter(split[:-3]+'avi', fourcc , 30.0, (img_w, img_h))
         for i, data in enumerate(tqdm.tqdm(loader)):
             imgs, names = data
-            imgs = imgs.cuda()
-            with torch.no_grad():
-                pred = net(imgs)
-
-            vis = cv2.imread(os.path.join(cfg.data_root,names[0]))
-            coords = pred2coords(pred, cfg.row_anchor, cfg.col_anchor, original_image_width = img_w, original_image_height = img_h)
-            for lane in coords:
-                for coord in lane:
-                    cv2.circle(vis,coord,5,(0,255,0),-1)
-            vout.write(vis)
+            pred = forward(net, imgs, amp = args.amp)
+
+            batch_coords = coords_to_lists(*decode_lanes(pred, cfg.row_anchor, cfg.col_anchor, original_image_width = img_w, original_image_height = img_h))
+            for name, coords in zip(names, batch_coords):
+                vis = cv2.imread(os.path.join(cfg.data_root,name))
+                for lane in coords:
+                    for coord in lane:
+                        cv2.circle(vis,coord,5,(0,255,0),-1)
+                vout.write(vis)
         
         vout.release()
@@ -1,9 +1,13 @@
 # single_infer.py
 import os, glob, torch, cv2
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from PIL import Image
 import torchvision.transforms as T
-from utils.common import merge_config, get_model
-from demo import pred2coords  # demo.py의 함수 재사용
+from utils.common import merge_config
+from utils.infer_utils import build_model, configure_threads, forward
+from demo import decode_lanes, coords_to_lists  # demo.py의 배치 디코더 재사용
 
 import argparse, sys
 
@@ -12,6 +16,8 @@ import time
 _user_parser = argparse.ArgumentParser(add_help=False)
 _user_parser.add_argument("--image", type=str, default=None, help="단일 이미지 경로")
 _user_parser.add_argument("--images_dir", type=str, default=None, help="이미지 폴더 경로")
+_user_parser.add_argument("--num_workers", type=int, default=4, help="폴더 모드 DataLoader 워커 수(디코드/전처리 prefetch)")
+_user_parser.add_argument("--writers", type=int, default=4, help="폴더 모드 결과 그리기/저장 스레드 수")
 _user_args, _remaining = _user_parser.parse_known_args()
 
 # merge_config가 --image 등의 커스텀 옵션을 몰라도 되도록 제거
@@ -25,90 +31,159 @@ def build_transform(cfg):
         T.Normalize( (0.485, 0.456, 0.406), (0.229, 0.224, 0.225) ),
     ])
 
-@torch.no_grad()
-def load_model(cfg):
-    net = get_model(cfg)
-    sd = torch.load(cfg.test_model, map_location='cpu')['model']
-    # 'module.' prefix 정리
-    sd = { (k[7:] if k.startswith('module.') else k): v for k, v in sd.items() }
-    net.load_state_dict(sd, strict=False)
-    net.eval()
-    if torch.cuda.is_available():
-        net.cuda()
-    return net
-
-def infer_image(model, cfg, img_path, out_path=None):
-    start_time = time.time()
-    # 1) 원본 이미지 읽기 (시각화용)
-    vis = cv2.imread(img_path)
-    if vis is None:
-        raise FileNotFoundError(f"Cannot read image: {img_path}")
-    img_h, img_w = vis.shape[:2]
+def load_model(cfg, device=None):
+    # device=None이면 CUDA가 있을 때만 GPU, CPU면 channels_last
+    return build_model(cfg, checkpoint=cfg.test_model, device=device)
 
-    # 2) 네트워크 입력 만들기 (demo.py와 동일 규칙)
-    tfm = build_transform(cfg)
-    pil = Image.open(img_path).convert('RGB')
+def load_input(cfg, tfm, img_path):
+    # 원본(시각화용 BGR)과 네트워크 입력 [C, train_height, train_width] (demo.py와 동일 규칙), 디코드는 한 번만
+    try:
+        pil = Image.open(img_path).convert('RGB')
+    except OSError:
+        raise FileNotFoundError(f"Cannot read image: {img_path}")
+    vis = cv2.cvtColor(np.asarray(pil), cv2.COLOR_RGB2BGR)
     x = tfm(pil)  # [C, H_resized, W]
     # 아래쪽 crop: 최종 입력 높이는 cfg.train_height
     H = x.shape[1]
-    bot = x[:, H - cfg.train_height : , :]  # [C, train_height, train_width]
-    if torch.cuda.is_available():
-        bot = bot.cuda().unsqueeze(0)
-    else:
-        bot = bot.unsqueeze(0)
+    return vis, x[:, H - cfg.train_height : , :]
 
-    # 3) 추론
-    pred = model(bot)
+def infer_images(model, cfg, img_paths, out_paths=None, amp=False):
+    """
+    이미지 여러 장을 한 번의 forward + 배치 디코드로 처리 (해상도가 달라도 됨)
+    """
+    start_time = time.time()
+    tfm = build_transform(cfg)
+    vis_list, inputs = zip(*(load_input(cfg, tfm, p) for p in img_paths))
+    bot = torch.stack(inputs)
+
+    # 추론 (모델이 있는 장치로 이동, inference_mode)
+    pred = forward(model, bot, amp=amp)
 
-    # 4) 좌표 변환 (출력은 원본 해상도로 스케일해 찍을 거라 img_w/img_h 사용)
-    coords = pred2coords(
+    # 좌표 변환 (출력은 원본 해상도로 스케일해 찍을 거라 이미지별 img_w/img_h 사용)
+    batch_coords = coords_to_lists(*decode_lanes(
         pred,
         cfg.row_anchor,
         cfg.col_anchor,
-        original_image_width = img_w,
-        original_image_height = img_h
-    )
+        original_image_width = [v.shape[1] for v in vis_list],
+        original_image_height = [v.shape[0] for v in vis_list]
+    ))
 
     print("inference_time : ", time.time() - start_time)
 
-    # 5) 시각화
-    out = vis.copy()
+    results = []
+    for i, (img_path, vis, coords) in enumerate(zip(img_paths, vis_list, batch_coords)):
+        # 시각화
+        out = vis.copy()
+        for lane in coords:
+            for (xpt, ypt) in lane:
+                cv2.circle(out, (int(xpt), int(ypt)), 5, (0,255,0), -1)
+
+        # 저장
+        out_path = out_paths[i] if out_paths is not None else None
+        if out_path is None:
+            base = os.path.splitext(os.path.basename(img_path))[0]
+            out_path = f"{base}_lane.jpg"
+        cv2.imwrite(out_path, out)
+        results.append(out_path)
+    return results
+
+def infer_image(model, cfg, img_path, out_path=None, amp=False):
+    return infer_images(model, cfg, [img_path], [out_path], amp=amp)[0]
+
+class LaneImageDataset(torch.utils.data.Dataset):
+    """
+    DataLoader 워커에서 디코드(1회) + 전처리. 반환: (입력 [C, H, W], 원본 BGR uint8 텐서, 인덱스)
+    원본도 텐서로 넘겨 워커 → 메인 전달이 공유 메모리로 이뤄지게 함
+    """
+    def __init__(self, cfg, paths):
+        self.cfg = cfg
+        self.paths = paths
+        self.tfm = build_transform(cfg)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        vis, x = load_input(self.cfg, self.tfm, self.paths[idx])
+        return x, torch.from_numpy(vis), idx
+
+def _collate(batch):
+    # 원본 해상도가 달라도 되도록 원본은 리스트로 유지
+    xs, vis, idx = zip(*batch)
+    return torch.stack(xs), list(vis), list(idx)
+
+def _render(vis, coords, out_path):
+    out = np.ascontiguousarray(vis)
     for lane in coords:
         for (xpt, ypt) in lane:
             cv2.circle(out, (int(xpt), int(ypt)), 5, (0,255,0), -1)
-
-    # 6) 저장/표시
-    if out_path is None:
-        base = os.path.splitext(os.path.basename(img_path))[0]
-        out_path = f"{base}_lane.jpg"
     cv2.imwrite(out_path, out)
     return out_path
 
-def infer_folder(model, cfg, folder):
+def infer_stream(model, cfg, paths, out_paths, batch_size=8, num_workers=4, writers=4, amp=False):
+    """
+    고처리량 모드: DataLoader prefetch(워커 디코드/전처리, pinned memory) → 배치 forward(inference_mode, 선택적 AMP)
+    → 배치 디코드 → 그리기/저장은 스레드 풀에서 (cv2가 GIL을 풀어 병렬로 진행)
+    """
+    device = next(model.parameters()).device
+    loader = torch.utils.data.DataLoader(
+        LaneImageDataset(cfg, paths), batch_size=batch_size, shuffle=False, num_workers=num_workers,
+        collate_fn=_collate, pin_memory=device.type == 'cuda',
+        persistent_workers=False, prefetch_factor=4 if num_workers > 0 else None)
+
+    start_time = time.time()
+    results = [None] * len(paths)
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=max(1, writers)) as pool:
+        for bot, vis_list, idx in loader:
+            pred = forward(model, bot, amp=amp)
+            batch_coords = coords_to_lists(*decode_lanes(
+                pred,
+                cfg.row_anchor,
+                cfg.col_anchor,
+                original_image_width = [v.shape[1] for v in vis_list],
+                original_image_height = [v.shape[0] for v in vis_list]
+            ))
+            for i, vis, coords in zip(idx, vis_list, batch_coords):
+                pending.append((i, pool.submit(_render, vis.numpy(), coords, out_paths[i])))
+            # 저장이 밀리면 메모리가 무한정 늘지 않도록 대기
+            while len(pending) > 4 * batch_size:
+                i, fut = pending.popleft()
+                results[i] = fut.result()
+        for i, fut in pending:
+            results[i] = fut.result()
+
+    elapsed = time.time() - start_time
+    print(f"[STREAM] {len(paths)} images in {elapsed:.2f}s ({len(paths) / max(elapsed, 1e-9):.1f} img/s)")
+    return results
+
+def infer_folder(model, cfg, folder, batch_size=1, num_workers=4, writers=4, amp=False):
     exts = ('*.jpg','*.jpeg','*.png','*.bmp')
     paths = []
     for e in exts:
         paths += glob.glob(os.path.join(folder, e))
-    paths.sort()
-    results = []
-    for p in paths:
-        out = os.path.join(folder, os.path.splitext(os.path.basename(p))[0] + "_lane.jpg")
-        results.append(infer_image(model, cfg, p, out))
-    return results
+    paths = sorted(p for p in set(paths) if not p.endswith("_lane.jpg"))  # 이전 결과물 제외
+    outs = [os.path.join(folder, os.path.splitext(os.path.basename(p))[0] + "_lane.jpg") for p in paths]
+    return infer_stream(model, cfg, paths, outs, batch_size=batch_size, num_workers=num_workers,
+                        writers=writers, amp=amp)
 
 if __name__ == "__main__":
     # 0) 설정 로드 (cfg.test_model 경로 반드시 세팅!)
     args, cfg = merge_config()
     assert os.path.isfile(cfg.test_model), "cfg.test_model을 유효한 가중치(.pth)로 설정하세요."
 
-    model = load_model(cfg)
+    configure_threads(args.threads)
+    model = load_model(cfg, device=args.device)
 
     # 사용 예시:
     # 1) 단일 이미지
     #breakpoint()
-    out_path = infer_image(model, cfg, _user_args.image)
-    print("saved ->", out_path)
-
-    # 2) 폴더 전체
-    # outs = infer_folder(model, cfg, "./images")
-    # print("\n".join(outs))
+    if _user_args.image:
+        out_path = infer_image(model, cfg, _user_args.image, amp=args.amp)
+        print("saved ->", out_path)
+
+    # 2) 폴더 전체 (--batch_size N 이면 N장씩 묶어 추론, 기본 8)
+    if _user_args.images_dir:
+        outs = infer_folder(model, cfg, _user_args.images_dir, batch_size=args.batch_size or 8,
+                            num_workers=_user_args.num_workers, writers=_user_args.writers, amp=args.amp)
+        print("\n".join(outs))
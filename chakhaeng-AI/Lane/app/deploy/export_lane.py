@@ -0,0 +1,195 @@
+# export_lane.py
+# parsingNet 체크포인트 → ONNX → (onnx2tf) SavedModel → TFLite
+#  - --slice_head: 디코더가 읽는 레인(row 1,2 / col 0,3)만 남긴 head로 export → 출력 레인 축 4 → 2
+#    UFLDv2TFLite / demo.decode_lanes는 레인 축 크기로 자른 모델을 알아서 처리
+#  - TFLite 변환 모드는 OCR convert.py와 같은 dynamic / fp16 (+ float32)
+#  - 변환 후 TFLite를 한 번 invoke해 UFLDv2TFLite 출력 매핑([N, grid, cls, lanes])과 torch 출력 일치를 확인,
+#    어긋나면 .tflite를 .rejected로 옮기고 실패 (onnx2tf의 NHWC 전치 등)
+#
+# 예) python deploy/export_lane.py --config_path configs/culane_res18.py --checkpoint weights/culane_res18.pth \
+#         --slice_head --tflite dynamic --out_dir export/
+import argparse
+import inspect
+import json
+import os
+import sys
+
+import numpy as np
+import torch
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_ROOT)
+
+from deploy.lane_config import load_config  # type: ignore
+from deploy.lane_decode import COL_LANE_IDX, ROW_LANE_IDX  # type: ignore
+from utils.infer_utils import build_model  # type: ignore
+
+OUTPUT_NAMES = ["loc_row", "loc_col", "exist_row", "exist_col"]
+# 변환 검증 허용치: 출력별 max|TFLite - torch| / max|torch|
+VERIFY_TOL = {"float32": 1e-3, "fp16": 2e-2, "dynamic": 1e-1}
+
+
+class _ExportWrapper(torch.nn.Module):
+    # dict 출력 → 이름이 고정된 tuple (ONNX 출력 순서 = OUTPUT_NAMES)
+    def __init__(self, net):
+        super().__init__()
+        self.net = net
+
+    def forward(self, x):
+        pred = self.net(x)
+        return tuple(pred[k] for k in OUTPUT_NAMES)
+
+
+def head_stats(net) -> dict:
+    """
+    cls head의 Linear 파라미터 수 / MAC (이미지 1장 기준)
+    """
+    linears = [m for m in net.cls.modules() if isinstance(m, torch.nn.Linear)]
+    return {
+        "params": int(sum(p.numel() for m in linears for p in m.parameters())),
+        "macs": int(sum(m.in_features * m.out_features for m in linears)),
+        "out_dim": int(linears[-1].out_features),
+    }
+
+
+def export_onnx(net, path, input_hw, opset: int = 13, dynamic_batch: bool = True):
+    h, w = input_hw
+    net = net.eval().to("cpu", memory_format=torch.contiguous_format)
+    dummy = torch.zeros(1, 3, h, w)
+    axes = {name: {0: "batch"} for name in ["input"] + OUTPUT_NAMES} if dynamic_batch else None
+    kwargs = {}
+    if "dynamo" in inspect.signature(torch.onnx.export).parameters:
+        kwargs["dynamo"] = False  # dynamic_axes를 쓰는 TorchScript exporter (onnxscript 불필요)
+    with torch.no_grad():
+        torch.onnx.export(_ExportWrapper(net), dummy, path, input_names=["input"], output_names=OUTPUT_NAMES,
+                          dynamic_axes=axes, opset_version=opset, do_constant_folding=True, **kwargs)
+    return path
+
+
+def onnx_to_tflite(onnx_path, out_dir, mode: str = "dynamic"):
+    """
+    onnx2tf로 NHWC SavedModel을 만든 뒤 TFLiteConverter로 변환 (입력 [N, H, W, 3], UFLDv2TFLite와 같은 배치)
+    """
+    try:
+        import onnx2tf
+        import tensorflow as tf
+    except ImportError as e:
+        raise RuntimeError(f"TFLite 변환에는 onnx2tf와 tensorflow가 필요합니다: {e}")
+
+    saved_dir = os.path.join(out_dir, "saved_model")
+    onnx2tf.convert(input_onnx_file_path=onnx_path, output_folder_path=saved_dir, non_verbose=True)
+
+    converter = tf.lite.TFLiteConverter.from_saved_model(saved_dir)
+    if mode == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif mode == "fp16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    out = os.path.join(out_dir, os.path.splitext(os.path.basename(onnx_path))[0] + f"_{mode}.tflite")
+    with open(out, "wb") as f:
+        f.write(converter.convert())
+    return out
+
+
+def verify_tflite(tflite_path, net, cfg, tol: float, seed: int = 0) -> dict:
+    """
+    TFLite를 한 번 invoke해 네 출력이 UFLDv2TFLite 규칙(map_output_indices)으로 매핑되고
+    net(torch, 자른 head면 자른 그대로)의 출력과 shape가 같으며 상대 오차가 tol 이하인지 확인. 실패하면 RuntimeError
+    반환: 출력별 {shape, max_abs, rel}
+    """
+    from deploy.tensorflow_lite_infer import get_interpreter_class, map_output_indices  # type: ignore
+
+    h, w = int(cfg.train_height), int(cfg.train_width)
+    x = np.random.default_rng(seed).standard_normal((1, 3, h, w)).astype(np.float32)
+    net = net.eval().to("cpu", memory_format=torch.contiguous_format)
+    with torch.no_grad():
+        pred = net(torch.from_numpy(x))
+    ref = {k: pred[k].float().numpy() for k in OUTPUT_NAMES}
+
+    interpreter = get_interpreter_class()(model_path=tflite_path, num_threads=1)
+    in0 = interpreter.get_input_details()[0]
+    shape = tuple(int(v) for v in in0["shape"])
+    if shape[1:] != (h, w, 3):
+        raise RuntimeError(f"TFLite 입력이 NHWC [N, {h}, {w}, 3]가 아닙니다: {shape}")
+    if shape[0] != 1:
+        interpreter.resize_tensor_input(in0["index"], (1, h, w, 3), strict=False)
+    interpreter.allocate_tensors()
+    in0 = interpreter.get_input_details()[0]
+    interpreter.set_tensor(in0["index"], np.ascontiguousarray(x.transpose(0, 2, 3, 1)).astype(in0["dtype"]))
+    interpreter.invoke()
+
+    index = map_output_indices(interpreter.get_output_details(), int(cfg.num_cell_row), int(cfg.num_row),
+                               int(cfg.num_cell_col), int(cfg.num_col), int(cfg.num_lanes))
+    result, errors = {}, []
+    for k in OUTPUT_NAMES:
+        out = interpreter.get_tensor(index[k]).astype(np.float32)
+        if out.shape != ref[k].shape:
+            errors.append(f"{k}: shape {out.shape} != torch {ref[k].shape}")
+            continue
+        max_abs = float(np.abs(out - ref[k]).max())
+        rel = max_abs / max(float(np.abs(ref[k]).max()), 1e-12)
+        result[k] = {"shape": list(out.shape), "max_abs": max_abs, "rel": rel}
+        if not rel <= tol:
+            errors.append(f"{k}: 상대 오차 {rel:.3g} > {tol:g}")
+    if errors:
+        raise RuntimeError("TFLite 출력 검증 실패: " + "; ".join(errors))
+    return result
+
+
+def get_args():
+    p = argparse.ArgumentParser(description="parsingNet → ONNX / TFLite export")
+    p.add_argument("--config_path", required=True, type=str)
+    p.add_argument("--checkpoint", required=True, type=str, help="parsingNet .pth")
+    p.add_argument("--out_dir", default="export", type=str)
+    p.add_argument("--name", default=None, type=str, help="파일 이름(기본: 설정 파일 이름)")
+    p.add_argument("--slice_head", action="store_true", help="디코더가 읽는 레인만 남긴 head로 export")
+    p.add_argument("--tflite", choices=["none", "dynamic", "fp16", "float32"], default="none")
+    p.add_argument("--opset", type=int, default=13)
+    p.add_argument("--verify_tol", type=float, default=None,
+                   help="TFLite 검증 상대 오차 허용치 (기본: 변환 모드별 VERIFY_TOL)")
+    return p.parse_args()
+
+
+def prepare_net(args):
+    """
+    체크포인트 로드 (+ slice_head). 이후 단계(예: 저랭크 분해)도 같은 net을 받아 export할 수 있도록 분리
+    """
+    cfg = load_config(args.config_path)
+    net = build_model(cfg, checkpoint=args.checkpoint, device="cpu", channels_last=False)
+    report = {"config": args.config_path, "checkpoint": args.checkpoint, "head_full": head_stats(net)}
+    if args.slice_head:
+        net.slice_head(ROW_LANE_IDX, COL_LANE_IDX)
+        report["head_sliced"] = head_stats(net)
+        report["lanes"] = {"row": list(net.row_lanes), "col": list(net.col_lanes)}
+    return cfg, net, report
+
+
+def export(net, cfg, args, report):
+    os.makedirs(args.out_dir, exist_ok=True)
+    name = args.name or os.path.splitext(os.path.basename(args.config_path))[0] + ("_sliced" if args.slice_head else "")
+    report["onnx"] = export_onnx(net, os.path.join(args.out_dir, f"{name}.onnx"),
+                                 (int(cfg.train_height), int(cfg.train_width)), opset=args.opset)
+    if args.tflite != "none":
+        tflite_path = onnx_to_tflite(report["onnx"], args.out_dir, args.tflite)
+        tol = getattr(args, "verify_tol", None) or VERIFY_TOL.get(args.tflite, VERIFY_TOL["float32"])
+        try:
+            report["verify"] = verify_tflite(tflite_path, net, cfg, tol)
+        except Exception:
+            # 레이아웃/값이 어긋난 모델이 배포 경로에서 로드되지 않도록 옮겨 둠
+            os.replace(tflite_path, tflite_path + ".rejected")
+            raise
+        report["tflite"] = tflite_path
+    with open(os.path.join(args.out_dir, f"{name}.json"), "w", encoding="utf-8") as fp:
+        json.dump(report, fp, indent=2)
+    return report
+
+
+def main():
+    args = get_args()
+    cfg, net, report = prepare_net(args)
+    report = export(net, cfg, args, report)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,189 @@
+# lane_async.py
+# UFLDv2TFLite 비동기 래퍼: 인터프리터 1개 + ping-pong 입력 버퍼
+#   전처리 스레드 : 프레임 N+1을 비어 있는 입력 버퍼에 전처리
+#   추론 스레드   : 프레임 N set_tensor → invoke → 출력 복사 (invoke 중 GIL 해제)
+#   후처리 스레드 : 프레임 N-1 pred2coords + classify_lane
+import queue
+import threading
+
+import numpy as np
+
+_END = object()
+
+
+class AsyncLaneRunner:
+    """
+    runner = AsyncLaneRunner(isnet)
+    runner.submit(frame)                  # 버퍼가 차 있으면 대기(backpressure)
+    for seq, frame, (coords, lane_meta) in runner.poll(): ...   # 준비된 결과만, 대기 없음
+    runner.close()
+    for seq, frame, (coords, lane_meta) in runner.results(): ...  # 남은 결과를 순서대로 전부
+    결과는 submit 순서대로 나온다. zero-copy 모드(출력이 내부 버퍼 뷰)와는 함께 쓸 수 없다.
+    """
+
+    def __init__(self, isnet, num_buffers: int = 2):
+        if getattr(isnet, "zero_copy", False):
+            raise ValueError("AsyncLaneRunner는 zero_copy=False인 UFLDv2TFLite가 필요합니다.")
+        self.isnet = isnet
+        shape = (1, isnet.input_height, isnet.input_width, 3)
+        if tuple(isnet.input_details[0]["shape"]) != shape:
+            isnet.resize_input(shape)
+        self._bufs = [np.empty(shape, dtype=np.float32) for _ in range(num_buffers)]
+
+        self._free = queue.Queue()
+        for i in range(num_buffers):
+            self._free.put(i)
+        self._q_in = queue.Queue(maxsize=num_buffers)
+        self._q_ready = queue.Queue(maxsize=num_buffers)
+        self._q_post = queue.Queue(maxsize=num_buffers)
+        self._q_out = queue.Queue()
+
+        self._stop = threading.Event()
+        self._error = None
+        self._seq = 0
+        self._closed = False
+        self._threads = [
+            threading.Thread(target=self._guard, args=(self._preprocess_loop,), name="lane-pre", daemon=True),
+            threading.Thread(target=self._guard, args=(self._invoke_loop,), name="lane-invoke", daemon=True),
+            threading.Thread(target=self._guard, args=(self._post_loop,), name="lane-post", daemon=True),
+        ]
+        for th in self._threads:
+            th.start()
+
+    # ------------------------------------------------------------------ API
+    def submit(self, frame):
+        """
+        프레임 제출. 반환: 순번(seq)
+        """
+        if self._closed:
+            raise RuntimeError("close() 이후에는 submit할 수 없습니다.")
+        self._raise_if_failed()
+        seq = self._seq
+        self._seq += 1
+        self._put(self._q_in, (seq, frame))
+        self._raise_if_failed()
+        return seq
+
+    def poll(self):
+        """
+        지금 준비된 결과만 순서대로 반환 (대기 없음)
+        """
+        out = []
+        while True:
+            try:
+                item = self._q_out.get_nowait()
+            except queue.Empty:
+                break
+            if item is _END:
+                self._q_out.put(_END)  # results()에서 다시 볼 수 있게 되돌림
+                break
+            out.append(item)
+        self._raise_if_failed()
+        return out
+
+    def results(self):
+        """
+        close() 이후 남은 결과를 모두 순서대로 yield (close 전이면 새 결과를 기다림)
+        """
+        while True:
+            item = self._q_out.get()
+            if item is _END:
+                self._q_out.put(_END)
+                break
+            yield item
+        self._raise_if_failed()
+
+    def close(self):
+        """
+        더 이상 submit하지 않음. 파이프라인은 남은 프레임을 끝까지 처리한다.
+        """
+        if not self._closed:
+            self._closed = True
+            self._put(self._q_in, _END)
+
+    def join(self):
+        for th in self._threads:
+            th.join()
+        self._raise_if_failed()
+
+    # ------------------------------------------------------------- stages
+    def _preprocess_loop(self):
+        isnet, prof = self.isnet, self.isnet.profiler
+        while True:
+            item = self._get(self._q_in)
+            if item is _END:
+                break
+            seq, frame = item
+            slot = self._get(self._free)
+            if slot is _END:
+                break
+            with prof.frame(seq), prof.stage("preprocess"):
+                isnet._preprocess(frame, out=self._bufs[slot][0])
+            if not self._put(self._q_ready, (seq, frame, slot)):
+                break
+        self._put(self._q_ready, _END)
+
+    def _invoke_loop(self):
+        isnet, prof = self.isnet, self.isnet.profiler
+        in_index = isnet.input_details[0]["index"]
+        while True:
+            item = self._get(self._q_ready)
+            if item is _END:
+                break
+            seq, frame, slot = item
+            with prof.frame(seq):
+                isnet.interpreter.set_tensor(in_index, self._bufs[slot])
+                self._free.put(slot)  # set_tensor가 복사했으므로 다음 프레임 전처리에 바로 재사용
+                with prof.stage("invoke"):
+                    isnet.interpreter.invoke()
+                preds = isnet.collect_outputs()  # get_tensor: 복사본
+            if not self._put(self._q_post, (seq, frame, preds)):
+                break
+        self._put(self._q_post, _END)
+
+    def _post_loop(self):
+        isnet, prof = self.isnet, self.isnet.profiler
+        while True:
+            item = self._get(self._q_post)
+            if item is _END:
+                break
+            seq, frame, preds = item
+            with prof.frame(seq):
+                w, h = isnet._source_size(frame)
+                coords, confs = isnet.pred2coords(preds, ori_w=w, ori_h=h, return_conf=True)
+                lane_meta = isnet._classify_lanes(frame, coords, confs)
+            isnet.last_lane_meta = lane_meta
+            isnet._print_diag(preds, 0, coords, lane_meta)
+            self._q_out.put((seq, frame, (coords, lane_meta)))
+        self._q_out.put(_END)
+
+    # ------------------------------------------------------------ helpers
+    def _guard(self, loop):
+        try:
+            loop()
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+            self._stop.set()
+            self._q_out.put(_END)
+
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def _raise_if_failed(self):
+        if self._error is not None:
+            raise self._error
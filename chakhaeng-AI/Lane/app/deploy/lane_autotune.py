@@ -0,0 +1,134 @@
+# lane_autotune.py
+# 시작 시 num_threads × XNNPACK on/off 조합을 몇 번의 warm invoke로 측정해 가장 빠른 설정을 고르고,
+# (모델 파일 해시, CPU 모델, 코어 수, 입력 shape) 키로 JSON에 캐시해 다음 실행부터는 탐색을 건너뜀
+import hashlib
+import json
+import os
+import platform
+import time
+
+import numpy as np
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "chakhaeng", "lane_autotune.json")
+
+
+class XnnpackToggleUnsupported(RuntimeError):
+    """
+    런타임이 XNNPACK(기본 delegate)을 끌 수 없음 — make_interpreter(use_xnnpack=False)가 던지고 autotune이 건너뜀
+    """
+
+
+def model_hash(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for chunk in iter(lambda: fp.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:16]
+
+
+def cpu_model() -> str:
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8", errors="ignore") as fp:
+            for line in fp:
+                # x86: "model name", ARM: "Hardware" / "CPU part"
+                if line.startswith(("model name", "Hardware")):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine()
+
+
+def thread_candidates(cpu_count: int = None):
+    cpu = cpu_count or os.cpu_count() or 1
+    return sorted({t for t in (1, 2, 3, 4, 6, 8, cpu) if t <= cpu})
+
+
+def _load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path, cache):
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(cache, fp, indent=2)
+    os.replace(tmp, path)
+
+
+def time_invoke(interpreter, input_shape, warmup: int = 2, iters: int = 5) -> float:
+    """
+    입력을 input_shape로 맞춘 뒤 warm invoke 중앙값(ms)
+    """
+    in0 = interpreter.get_input_details()[0]
+    if tuple(in0["shape"]) != tuple(input_shape):
+        interpreter.resize_tensor_input(in0["index"], input_shape, strict=True)
+    interpreter.allocate_tensors()
+    in0 = interpreter.get_input_details()[0]
+    data = np.random.default_rng(0).standard_normal(input_shape).astype(in0["dtype"])
+    interpreter.set_tensor(in0["index"], data)
+    for _ in range(warmup):
+        interpreter.invoke()
+    ts = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        interpreter.invoke()
+        ts.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.median(ts))
+
+
+def autotune(model_path, make_interpreter, input_shape, cache_path: str = DEFAULT_CACHE,
+             threads=None, warmup: int = 2, iters: int = 5, force: bool = False, verbose: bool = True):
+    """
+    make_interpreter(model_path, num_threads, use_xnnpack) -> Interpreter
+      XNNPACK을 끌 수 없는 런타임이면 XnnpackToggleUnsupported → XNNPACK off 조합은 건너뜀
+    반환: {"num_threads": int, "use_xnnpack": bool, "ms": float, ...}
+    """
+    cpu = os.cpu_count() or 1
+    shape = "x".join(str(int(d)) for d in input_shape)
+    key = f"{model_hash(model_path)}|{cpu_model()}|{cpu}|{shape}"
+    cache = _load_cache(cache_path)
+    if not force and key in cache:
+        best = cache[key]
+        if verbose:
+            print(f"[TUNE] cache hit: threads={best['num_threads']} xnnpack={best['use_xnnpack']} "
+                  f"({best['ms']:.2f} ms)")
+        return best
+
+    trials = []
+    for use_xnnpack in (True, False):
+        for t in (threads or thread_candidates(cpu)):
+            try:
+                ms = time_invoke(make_interpreter(model_path, t, use_xnnpack), input_shape, warmup, iters)
+            except XnnpackToggleUnsupported as e:
+                if verbose:
+                    print(f"[TUNE] xnnpack={use_xnnpack} 건너뜀: {e}")
+                break
+            except Exception as e:
+                if verbose:
+                    print(f"[TUNE] threads={t} xnnpack={use_xnnpack} 실패: {e}")
+                continue
+            trials.append({"num_threads": t, "use_xnnpack": use_xnnpack, "ms": ms})
+            if verbose:
+                print(f"[TUNE] threads={t} xnnpack={use_xnnpack}: {ms:.2f} ms")
+    if not trials:
+        raise RuntimeError(f"autotune: 측정 가능한 설정이 없습니다: {model_path}")
+
+    best = dict(min(trials, key=lambda r: r["ms"]))
+    best.update({"model": os.path.basename(model_path), "cpu": cpu_model(), "cpu_count": cpu,
+                 "input_shape": [int(d) for d in input_shape],
+                 "trials": trials, "time": time.strftime("%Y-%m-%dT%H:%M:%S")})
+    cache[key] = best
+    try:
+        _save_cache(cache_path, cache)
+    except OSError as e:
+        if verbose:
+            print(f"[TUNE] 캐시 저장 실패({cache_path}): {e}")
+    if verbose:
+        print(f"[TUNE] best: threads={best['num_threads']} xnnpack={best['use_xnnpack']} ({best['ms']:.2f} ms)")
+    return best
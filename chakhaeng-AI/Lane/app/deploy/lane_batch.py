@@ -0,0 +1,203 @@
+# lane_batch.py
+# 이미지 폴더 / glob / 비디오 목록을 프로세스 풀로 나눠 처리 (워커당 인터프리터 1개를 유지)
+#
+# 예) python deploy/lane_batch.py --inputs /data/clips/*.mp4 /data/frames --output_dir out --workers 4
+#     python deploy/lane_batch.py --inputs /data/frames --headless --records out/frames.jsonl
+import argparse
+import glob
+import json
+import multiprocessing as mp
+import os
+import sys
+import time
+
+import cv2
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deploy.tensorflow_lite_infer import (  # type: ignore
+    UFLDv2TFLite, is_image_file, is_video_file, process_image, process_video,
+)
+from deploy.lane_records import LaneRecordWriter  # type: ignore
+from deploy.lane_config import DEFAULT_CACHE as DEFAULT_CONFIG_CACHE  # type: ignore
+
+# 워커 프로세스 전역: initializer에서 한 번 만들고 모든 작업에서 재사용
+_isnet = None
+_batch_size = 1
+_compact = False
+
+
+def expand_inputs(items):
+    """
+    디렉터리(이미지/비디오 파일만), glob 패턴, 파일 경로를 순서를 유지하며 펼침 (중복 제거)
+    """
+    paths = []
+    for item in items:
+        if os.path.isdir(item):
+            found = sorted(os.path.join(item, f) for f in os.listdir(item))
+            found = [p for p in found if is_image_file(p) or is_video_file(p)]
+        elif any(c in item for c in "*?["):
+            found = sorted(glob.glob(item))
+        else:
+            found = [item]
+        paths.extend(found)
+    return list(dict.fromkeys(paths))
+
+
+def plan_workers(num_tasks: int, workers: int = None, threads: int = None):
+    """
+    워커 수 / 워커당 num_threads 결정. 지정하지 않으면 코어를 워커 수로 나눠 쓴다.
+    """
+    cpu = os.cpu_count() or 1
+    if workers is None:
+        workers = max(1, min(num_tasks, cpu // 2 or 1))
+    if threads is None:
+        threads = max(1, cpu // workers)
+    return workers, threads
+
+
+def _init_worker(model_path, config_path, threads, ori_size, batch_size, compact, engine_opts):
+    global _isnet, _batch_size, _compact
+    _batch_size = batch_size
+    _compact = compact
+    _isnet = UFLDv2TFLite(model_path=model_path, config_path=config_path, ori_size=ori_size,
+                          debug=False, num_threads=threads, **engine_opts)
+
+
+def _work(task):
+    idx, path, out_path, headless = task
+    # 이전 입력의 결과를 다른 입력에 재사용하지 않도록 모션 게이트 기준 프레임 초기화
+    if _isnet.motion_gate is not None:
+        _isnet.motion_gate.reset()
+
+    result = {"index": idx, "input": path, "output": out_path}
+    t0 = time.perf_counter()
+    try:
+        if is_image_file(path):
+            if headless:
+                # 이미지 결과는 부모 프로세스가 하나의 레코드 파일로 순서대로 합친다
+                img = cv2.imread(path)
+                if img is None:
+                    raise RuntimeError(f"이미지를 열 수 없습니다: {path}")
+                result["coords"], result["lane_meta"] = _isnet.infer(img)
+            else:
+                process_image(_isnet, path, out_path)
+            result["frames"] = 1
+        else:
+            if headless:
+                with LaneRecordWriter(out_path, compact=_compact) as records:
+                    result["frames"] = process_video(_isnet, path, records=records, batch_size=_batch_size)
+            else:
+                result["frames"] = process_video(_isnet, path, out_path, batch_size=_batch_size)
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["seconds"] = time.perf_counter() - t0
+    return result
+
+
+def _output_path(path, output_dir, suffix, used):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out = os.path.join(output_dir, f"{stem}{suffix}")
+    n = 1
+    while out in used:
+        out = os.path.join(output_dir, f"{stem}_{n}{suffix}")
+        n += 1
+    used.add(out)
+    return out
+
+
+def get_args():
+    p = argparse.ArgumentParser(description="UFLDv2 TFLite 레인 배치 처리 (프로세스 풀)")
+    p.add_argument("--inputs", nargs="+", required=True, help="디렉터리 / glob / 파일 경로(여러 개)")
+    p.add_argument("--config_path", default="configs/culane_res34.py", type=str)
+    p.add_argument("--model_path", default="weights/culane_res34.tflite", type=str)
+    p.add_argument("--output_dir", default="lane_batch_out", type=str)
+    p.add_argument("--workers", type=int, default=None, help="워커 프로세스 수(기본: 코어/2, 작업 수 이하)")
+    p.add_argument("--threads", type=int, default=None, help="워커당 num_threads(기본: 코어/워커 수)")
+    p.add_argument("--ori_size", default=None,
+                   type=lambda s: None if s in [None, "None", ""] else eval(s),
+                   help="(W,H) 강제 원본 크기. 보통은 None(자동) 권장")
+    p.add_argument("--batch_size", type=int, default=1,
+                   help="비디오 프레임을 N장씩 묶어 한 번에 invoke (동적 배치 모델 필요)")
+    p.add_argument("--headless", action="store_true",
+                   help="그리기/인코딩 없이 레코드만 저장(이미지: --records 하나로 병합, 비디오: 입력별 .jsonl)")
+    p.add_argument("--records", default=None, type=str,
+                   help="헤드리스 이미지 결과 병합 경로(.jsonl 또는 .bin). 기본: <output_dir>/images_lanes.jsonl")
+    p.add_argument("--compact_records", action="store_true",
+                   help="헤드리스 레코드를 레인별 2차 다항식 계수(lane_compact)로 저장")
+    p.add_argument("--color_mask_roi", action="store_true")
+    p.add_argument("--zero_copy", action="store_true")
+    p.add_argument("--fused_preprocess", action="store_true")
+    p.add_argument("--motion_gate", type=float, default=0.0,
+                   help="비디오: 크롭 ROI 변화 픽셀 비율이 이 값 이하면 직전 결과 재사용(0: 끔)")
+    p.add_argument("--motion_max_reuse", type=int, default=15)
+    p.add_argument("--config_cache", default=DEFAULT_CONFIG_CACHE,
+                   type=lambda s: None if s in [None, "None", ""] else s,
+                   help="설정 JSON 스냅샷 캐시 경로(워커 시작 시 Config.fromfile 생략, None: 끔)")
+    return p.parse_args()
+
+
+def main():
+    args = get_args()
+    paths = [p for p in expand_inputs(args.inputs) if is_image_file(p) or is_video_file(p)]
+    if not paths:
+        raise RuntimeError(f"처리할 이미지/비디오가 없습니다: {args.inputs}")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    used = set()
+    tasks = []
+    for idx, path in enumerate(paths):
+        if args.headless:
+            out = None if is_image_file(path) else _output_path(path, args.output_dir, "_lanes.jsonl", used)
+        else:
+            out = _output_path(path, args.output_dir, "_lane.jpg" if is_image_file(path) else "_lane.mp4", used)
+        tasks.append((idx, path, out, args.headless))
+
+    workers, threads = plan_workers(len(tasks), args.workers, args.threads)
+    print(f"[BATCH] {len(tasks)} inputs, {workers} workers × {threads} threads")
+
+    engine_opts = {"color_mask_roi": args.color_mask_roi, "zero_copy": args.zero_copy,
+                   "fused_preprocess": args.fused_preprocess, "motion_gate": args.motion_gate,
+                   "motion_max_reuse": args.motion_max_reuse, "config_cache": args.config_cache}
+    merged = None
+    if args.headless and any(is_image_file(p) for p in paths):
+        merged = LaneRecordWriter(args.records or os.path.join(args.output_dir, "images_lanes.jsonl"),
+                                  compact=args.compact_records)
+
+    # TFLite/TF 런타임 스레드가 있는 부모를 fork하지 않도록 spawn 사용
+    ctx = mp.get_context("spawn")
+    manifest = []
+    t0 = time.perf_counter()
+    try:
+        with ctx.Pool(workers, initializer=_init_worker,
+                      initargs=(args.model_path, args.config_path, threads, args.ori_size,
+                                args.batch_size, args.compact_records, engine_opts)) as pool:
+            # imap: 완료 순서와 무관하게 입력 순서대로 결과를 받음
+            for res in pool.imap(_work, tasks):
+                if merged is not None and "coords" in res:
+                    # 병합 파일의 frame 번호 = 입력 순서 인덱스
+                    merged.write(res["index"], 0.0, res.pop("coords"), res.pop("lane_meta"))
+                    res["output"] = merged.path
+                status = res.get("error", "OK")
+                print(f"[BATCH] {res['index'] + 1}/{len(tasks)} {res['input']} -> {res['output']} "
+                      f"({res.get('frames', 0)} frames, {res['seconds']:.2f}s) {status}")
+                manifest.append(res)
+    finally:
+        if merged is not None:
+            merged.close()
+
+    wall = time.perf_counter() - t0
+    frames = sum(r.get("frames", 0) for r in manifest)
+    failed = sum(1 for r in manifest if "error" in r)
+    summary = {"workers": workers, "threads": threads, "inputs": len(tasks), "failed": failed,
+               "frames": frames, "wall_s": wall, "fps": frames / wall if wall > 0 else 0.0,
+               "results": manifest}
+    manifest_path = os.path.join(args.output_dir, "batch_manifest.json")
+    with open(manifest_path, "w", encoding="utf-8") as fp:
+        json.dump(summary, fp, indent=2, ensure_ascii=False)
+    print(f"[BATCH] {frames} frames in {wall:.2f}s ({summary['fps']:.2f} fps), failed={failed}")
+    print(f"[SAVE] manifest -> {manifest_path}")
+
+
+if __name__ == "__main__":
+    main()
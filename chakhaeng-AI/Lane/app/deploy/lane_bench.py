@@ -0,0 +1,329 @@
+# lane_bench.py
+# UFLDv2 레인 추론 핫패스 벤치마크 → JSON
+#  - 모델 × threads × 입력 소스별 스테이지 지연(p50/p95/p99)과 end-to-end FPS
+#  - 후처리 단독: LaneDecoder.pred2coords(numpy) / demo.pred2coords(torch, 설치된 경우)
+#  - 전처리 일치 검사: 기존 전처리 vs FusedPreprocessor
+#  - 색상 마스크: HSV/LAB 경로 vs ColorLUT(bits별) 지연과 불일치 픽셀 비율
+#  - peak RSS (프로세스 최고치, 측정 시점까지 누적)
+#
+# 예) python deploy/lane_bench.py --threads 1,2,4 --out bench.json
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import cv2
+import numpy as np
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LANE_ROOT = os.path.dirname(APP_ROOT)
+sys.path.append(APP_ROOT)
+
+from deploy.tensorflow_lite_infer import UFLDv2TFLite  # type: ignore
+from deploy.lane_decode import LaneDecoder  # type: ignore
+from deploy.lane_preprocess import FusedPreprocessor, legacy_preprocess  # type: ignore
+from deploy.lane_color_lut import ColorLUT  # type: ignore
+from deploy.lane_profiler import StageProfiler  # type: ignore
+from utils.config import Config  # type: ignore
+
+DEFAULT_MODELS = [
+    os.path.join(LANE_ROOT, "weights", "culane_res18_dynamic.tflite"),
+    os.path.join(LANE_ROOT, "weights", "culane_res18_sim_float32.tflite"),
+]
+DEFAULT_IMAGES = os.path.join(LANE_ROOT, "dataset", "test*.jpg")
+DEFAULT_VIDEOS = os.path.join(LANE_ROOT, "dataset", "middle_line*.mp4")
+DEFAULT_CONFIG = os.path.join(APP_ROOT, "configs", "culane_res18.py")
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: KiB, macOS: bytes
+    return rss / (1024.0 * 1024.0) if sys.platform == "darwin" else rss / 1024.0
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_ROOT,
+                             capture_output=True, text=True, timeout=10)
+        return out.stdout.strip() or None
+    except Exception:
+        return None
+
+
+def load_sources(image_glob: str, video_glob: str, max_frames: int):
+    """
+    반환: [(이름, [frame, ...]), ...]
+    소스별 지연을 해상도 단위로 비교할 수 있도록 이미지는 해상도별로 묶는다.
+    """
+    sources = []
+    by_size = {}
+    for p in sorted(glob.glob(image_glob)):
+        img = cv2.imread(p)
+        if img is None:
+            continue
+        by_size.setdefault((img.shape[1], img.shape[0]), []).append(img)
+    for (w, h), imgs in sorted(by_size.items()):
+        sources.append((f"images_{w}x{h}", imgs))
+
+    for p in sorted(glob.glob(video_glob)):
+        cap = cv2.VideoCapture(p)
+        frames = []
+        while len(frames) < max_frames:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            frames.append(frame)
+        cap.release()
+        if frames:
+            sources.append((os.path.basename(p), frames))
+        else:
+            print(f"[WARN] 비디오를 읽을 수 없습니다(LFS 포인터?): {p}", file=sys.stderr)
+    return sources
+
+
+def bench_model(model_path, config_path, frames, threads, warmup, repeat, engine_opts):
+    """
+    한 (모델, threads, 입력 소스) 조합: infer + render + encode(imencode)를 프레임마다 실행
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        isnet = UFLDv2TFLite(model_path=model_path, config_path=config_path, debug=False,
+                             num_threads=threads, **engine_opts)
+        for frame in frames[:warmup]:
+            isnet.infer(frame)
+
+        prof = StageProfiler()
+        isnet.profiler = prof
+        n = 0
+        t0 = time.perf_counter()
+        for _ in range(repeat):
+            for frame in frames:
+                with prof.frame(n):
+                    coords, lane_meta = isnet.infer(frame)
+                    with prof.stage("render"):
+                        drawn = isnet.render(frame, coords, lane_meta)
+                    with prof.stage("encode"):
+                        cv2.imencode(".jpg", drawn)
+                n += 1
+        wall = time.perf_counter() - t0
+
+    return {
+        "frames": n,
+        "wall_s": wall,
+        "fps": n / wall if wall > 0 else 0.0,
+        "stages": prof.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _random_preds(rng, batch=1):
+    return {
+        "loc_row": rng.standard_normal((batch, 200, 72, 4)).astype(np.float32),
+        "loc_col": rng.standard_normal((batch, 100, 81, 4)).astype(np.float32),
+        "exist_row": rng.standard_normal((batch, 2, 72, 4)).astype(np.float32),
+        "exist_col": rng.standard_normal((batch, 2, 81, 4)).astype(np.float32),
+    }
+
+
+def _time_calls(fn, iters):
+    ts = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        ts.append((time.perf_counter() - t0) * 1000.0)
+    p50, p95 = np.percentile(ts, [50, 95])
+    return {"iters": iters, "mean_ms": float(np.mean(ts)), "p50_ms": float(p50), "p95_ms": float(p95)}
+
+
+def is_lfs_pointer(path) -> bool:
+    # git-lfs를 받지 않은 체크아웃이면 모델/비디오 자리에 텍스트 포인터만 있음
+    try:
+        with open(path, "rb") as fp:
+            return fp.read(64).startswith(b"version https://git-lfs")
+    except OSError:
+        return False
+
+
+def decode_inputs(config_path, seed=0):
+    """
+    후처리 단독 측정용: config로 만든 LaneDecoder(인터프리터 없음)와 존재 확률을 높인 랜덤 로짓
+    """
+    cfg = Config.fromfile(config_path)
+    preds = _random_preds(np.random.default_rng(seed))
+    preds["exist_row"][:, 1] += 1.0
+    preds["exist_col"][:, 1] += 1.0
+    return cfg, LaneDecoder.from_config(cfg), preds
+
+
+def bench_decode(config_path, iters, torch_decode=False, seed=0):
+    """
+    후처리 단독: 존재 확률을 높인 랜덤 로짓으로 pred2coords 비교
+    torch_decode: demo.pred2coords도 측정 (demo가 학습 스택을 import하므로 선택)
+    """
+    cfg, decoder, preds = decode_inputs(config_path, seed)
+    out = {}
+
+    # numpy (TFLite 배포 경로) — 인터프리터 없이 디코더만 사용
+    out["tflite_pred2coords"] = _time_calls(lambda: decoder.pred2coords(preds, ori_w=1640, ori_h=590), iters)
+
+    if not torch_decode:
+        return out
+
+    # torch (demo.py) — torch/학습 의존성이 없으면 건너뜀
+    try:
+        import torch
+        import demo
+    except Exception as e:
+        out["demo_pred2coords"] = {"skipped": f"{type(e).__name__}: {e}"}
+        return out
+
+    row_anchor = np.linspace(1.0 - cfg.crop_ratio, 1.0, int(cfg.num_row))
+    col_anchor = np.linspace(0.0, 1.0, int(cfg.num_col))
+    tpreds = {k: torch.from_numpy(v) for k, v in preds.items()}
+    out["demo_pred2coords"] = _time_calls(
+        lambda: demo.pred2coords(dict(tpreds), row_anchor, col_anchor,
+                                 original_image_width=1640, original_image_height=590), iters)
+    return out
+
+
+def check_preprocess_parity(config_path, sources, sizes=((640, 360), (1280, 720), (1920, 1080))):
+    """
+    FusedPreprocessor vs 기존 전처리
+      lut_exact : 같은 uint8 픽셀에 대해 LUT 정규화가 기존 float 연산과 비트 단위로 같은지
+      diff_lsb  : 최종 입력 차이를 uint8 단계(1/255/std) 기준으로 환산한 mean / p99 / max
+    """
+    cfg = Config.fromfile(config_path)
+    W, H, crop = int(cfg.train_width), int(cfg.train_height), float(cfg.crop_ratio)
+    fused = FusedPreprocessor(W, H, crop)
+    std = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+    v = np.arange(256, dtype=np.uint8).reshape(16, 16, 1).repeat(3, axis=2)
+    ref = (v.astype(np.float32) / 255.0 - np.array([0.485, 0.456, 0.406], dtype=np.float32)) / std
+    lut_exact = bool(np.array_equal(cv2.LUT(v, fused.lut), ref))
+
+    results = []
+    for name, frames in sources:
+        src = frames[0]
+        for w, h in sizes:
+            img = cv2.resize(src, (w, h), interpolation=cv2.INTER_AREA)
+            diff = np.abs(fused(img) - legacy_preprocess(img, W, H, crop)) * std * 255.0
+            results.append({"source": name, "size": [w, h],
+                            "mean_lsb": float(diff.mean()),
+                            "p99_lsb": float(np.percentile(diff, 99)),
+                            "max_lsb": float(diff.max())})
+    return {"lut_exact": lut_exact, "images": results}
+
+
+def bench_color_masks(sources, bits_list, iters):
+    """
+    픽셀 분류(모폴로지 전) 단독: 기존 HSV/LAB 임계식 vs ColorLUT
+      mismatch_* : 기존 판정과 다른 픽셀 비율 (bits=8이면 0이어야 함)
+    """
+    classify = UFLDv2TFLite._lane_color_classes
+    out = {"legacy": {}, "lut": []}
+    for name, frames in sources:
+        out["legacy"][name] = _time_calls(lambda: classify(frames[0]), iters)
+    for bits in bits_list:
+        t0 = time.perf_counter()
+        lut = ColorLUT.build(classify, bits)
+        entry = {"bits": bits, "build_s": time.perf_counter() - t0, "table_bytes": int(lut.table.nbytes),
+                 "sources": {}}
+        for name, frames in sources:
+            ref_w, ref_y = classify(frames[0])
+            w, y = lut(frames[0])
+            res = _time_calls(lambda: lut(frames[0]), iters)
+            res["mismatch_white"] = float(np.mean(w != ref_w))
+            res["mismatch_yellow"] = float(np.mean(y != ref_y))
+            entry["sources"][name] = res
+        out["lut"].append(entry)
+    return out
+
+
+def get_args():
+    p = argparse.ArgumentParser(description="UFLDv2 레인 추론 벤치마크 (JSON 출력)")
+    p.add_argument("--models", nargs="+", default=DEFAULT_MODELS)
+    p.add_argument("--config_path", default=DEFAULT_CONFIG, type=str)
+    p.add_argument("--images", default=DEFAULT_IMAGES, type=str, help="이미지 glob")
+    p.add_argument("--videos", default=DEFAULT_VIDEOS, type=str, help="비디오 glob")
+    p.add_argument("--threads", default="1,2,4", type=str, help="콤마로 구분한 num_threads 목록")
+    p.add_argument("--max_frames", type=int, default=100, help="비디오별 최대 프레임 수")
+    p.add_argument("--warmup", type=int, default=2)
+    p.add_argument("--repeat", type=int, default=3, help="소스별 반복 횟수")
+    p.add_argument("--decode_iters", type=int, default=200)
+    p.add_argument("--torch_decode", action="store_true",
+                   help="demo.pred2coords(torch)도 측정. 전체 tensorflow와 같은 프로세스에서는 충돌할 수 있음")
+    p.add_argument("--zero_copy", action="store_true")
+    p.add_argument("--fused_preprocess", action="store_true")
+    p.add_argument("--color_mask_roi", action="store_true")
+    p.add_argument("--color_lut", type=int, default=0, help="infer 경로에서 ColorLUT 사용(bits, 0: 끔)")
+    p.add_argument("--color_lut_bits", default="5,6,8", type=str,
+                   help="색상 마스크 벤치마크할 ColorLUT bits 목록(콤마 구분, 빈 문자열이면 생략)")
+    p.add_argument("--color_iters", type=int, default=20)
+    p.add_argument("--out", default=None, type=str, help="결과 JSON 경로(없으면 stdout)")
+    return p.parse_args()
+
+
+def main():
+    args = get_args()
+    threads = [int(t) for t in args.threads.split(",") if t.strip()]
+    engine_opts = {"zero_copy": args.zero_copy, "fused_preprocess": args.fused_preprocess,
+                   "color_mask_roi": args.color_mask_roi, "color_lut_bits": args.color_lut}
+
+    sources = load_sources(args.images, args.videos, args.max_frames)
+    if not sources:
+        raise RuntimeError("벤치마크 입력이 없습니다. --images / --videos 를 확인하세요.")
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "opencv": cv2.__version__,
+            "engine_opts": engine_opts,
+        },
+        "runs": [],
+    }
+
+    for model_path in args.models:
+        for t in threads:
+            for name, frames in sources:
+                entry = {"model": os.path.basename(model_path), "threads": t, "source": name}
+                try:
+                    entry.update(bench_model(model_path, args.config_path, frames, t,
+                                             args.warmup, args.repeat, engine_opts))
+                    print(f"[BENCH] {entry['model']} threads={t} {name}: {entry['fps']:.2f} fps",
+                          file=sys.stderr)
+                except Exception as e:
+                    # 모델 파일이 LFS 포인터인 경우 등: 기록만 하고 계속
+                    entry["error"] = f"{type(e).__name__}: {e}"
+                    print(f"[BENCH] {entry['model']} threads={t} {name}: {entry['error']}", file=sys.stderr)
+                report["runs"].append(entry)
+
+    report["decode"] = bench_decode(args.config_path, args.decode_iters, args.torch_decode)
+    report["preprocess_parity"] = check_preprocess_parity(args.config_path, sources)
+    lut_bits = [int(b) for b in args.color_lut_bits.split(",") if b.strip()]
+    if lut_bits:
+        report["color_masks"] = bench_color_masks(sources, lut_bits, args.color_iters)
+    report["peak_rss_mb"] = peak_rss_mb()
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fp:
+            fp.write(text)
+        print(f"[SAVE] bench -> {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
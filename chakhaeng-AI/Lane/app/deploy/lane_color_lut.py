@@ -0,0 +1,75 @@
+# lane_color_lut.py
+# BGR → {none, white, yellow} 3D 룩업 테이블
+#  - 기존 HSV/LAB 임계식(classify 함수)을 2^24개 BGR 색 전체에 한 번 적용해 만든다
+#  - bits<8이면 채널당 2^bits 단계로 양자화하고, 셀 안 색들의 다수결로 판정 (bits=8이면 기존과 동일)
+#  - 프레임 분류: 채널 분리 → 시프트/OR로 인덱스 → 한 번의 gather (색공간 변환 없음)
+import cv2
+import numpy as np
+
+_CACHE = {}
+
+
+def _classify_all_colors(classify, chunk: int = 16):
+    """
+    classify(img_bgr) -> (white, yellow) 0/255 를 모든 BGR 색에 적용
+    반환: white, yellow bool [256, 256, 256] (b, g, r 순)
+    """
+    white = np.empty((256, 256, 256), dtype=bool)
+    yellow = np.empty((256, 256, 256), dtype=bool)
+    v = np.arange(256, dtype=np.uint8)
+    for b0 in range(0, 256, chunk):
+        img = np.empty((chunk, 256, 256, 3), dtype=np.uint8)
+        img[..., 0] = v[b0:b0 + chunk, None, None]
+        img[..., 1] = v[None, :, None]
+        img[..., 2] = v[None, None, :]
+        w, y = classify(img.reshape(chunk * 256, 256, 3))
+        white[b0:b0 + chunk] = w.reshape(chunk, 256, 256) > 0
+        yellow[b0:b0 + chunk] = y.reshape(chunk, 256, 256) > 0
+    return white, yellow
+
+
+class ColorLUT:
+    """
+    lut = ColorLUT.build(classify, bits=5)   # classify: 모폴로지 전 (white, yellow) 마스크 함수
+    white, yellow = lut(img_bgr)             # 0/255 uint8
+    테이블 원소(uint16)의 하위 바이트 = white, 상위 바이트 = yellow → gather 결과를 그대로 두 마스크로 분리
+    """
+
+    def __init__(self, table: np.ndarray, bits: int):
+        self.bits = int(bits)
+        self.shift = 8 - self.bits
+        self.table = table
+        # 인덱스 최대값이 uint16에 들어가면(bits<=5) uint16 연산
+        self._idx_dtype = np.uint16 if 3 * self.bits <= 16 else np.uint32
+
+    @classmethod
+    def build(cls, classify, bits: int = 5):
+        """
+        같은 (classify, bits)면 프로세스 안에서 한 번만 만든다
+        """
+        if not 1 <= bits <= 8:
+            raise ValueError(f"bits는 1~8 이어야 합니다: {bits}")
+        key = (classify, bits)
+        if key not in _CACHE:
+            white, yellow = _classify_all_colors(classify)
+            if bits < 8:
+                n, k = 1 << bits, 1 << (8 - bits)
+                cell = (n, k, n, k, n, k)
+                half = (k ** 3) // 2    # 셀당 색 수 k^3은 bits=1이면 2^21 → uint32로 합산
+                white = white.reshape(cell).sum(axis=(1, 3, 5), dtype=np.uint32) > half
+                yellow = yellow.reshape(cell).sum(axis=(1, 3, 5), dtype=np.uint32) > half
+            table = (white.ravel().astype(np.uint16) * 0x00FF | yellow.ravel().astype(np.uint16) * 0xFF00)
+            _CACHE[key] = cls(table.astype("<u2"), bits)
+        return _CACHE[key]
+
+    def index(self, img_bgr: np.ndarray) -> np.ndarray:
+        b, g, r = cv2.split(img_bgr)
+        dt, s, bits = self._idx_dtype, self.shift, self.bits
+        if s:
+            b, g, r = b >> s, g >> s, r >> s
+        return (b.astype(dt) << (2 * bits)) | (g.astype(dt) << bits) | r
+
+    def __call__(self, img_bgr: np.ndarray):
+        packed = np.take(self.table, self.index(img_bgr))
+        white, yellow = cv2.split(packed.view(np.uint8).reshape(packed.shape + (2,)))
+        return white, yellow
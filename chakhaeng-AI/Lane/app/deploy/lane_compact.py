@@ -0,0 +1,144 @@
+# lane_compact.py
+# 레인 좌표 시퀀스((x, y) 튜플 수십~수백 개)를 2차 다항식 계수 몇 개로 압축한 NumPy 구조화 레코드
+#   axis=0: x = f(t), t = (y - lo) / (hi - lo)   세로로 뻗은 레인 (row 앵커 레인)
+#   axis=1: y = f(t), t = (x - lo) / (hi - lo)   가로로 누운 레인 (측면 col 앵커 레인)
+# 계수/범위는 원본 픽셀 단위라 해상도 정보 없이 복원 가능
+import numpy as np
+
+DEGREE = 2
+# 레인 종류/색 코드표 (compact 레코드와 lane_records 바이너리가 공용, 인덱스가 곧 u8 코드)
+LABELS = ("ambiguous", "solid", "dashed")
+COLORS = ("unknown", "white", "yellow")
+
+LANE_DTYPE = np.dtype([
+    ("label", np.uint8),
+    ("color", np.uint8),
+    ("axis", np.uint8),
+    ("num_points", np.uint16),
+    ("confidence", np.float32),   # 레인 존재 확률 평균 (없으면 0)
+    ("coverage", np.float32),
+    ("lo", np.float32),           # 독립축 범위(px)
+    ("hi", np.float32),
+    ("coeffs", np.float32, (DEGREE + 1,)),  # np.polyval 순서(최고차항 먼저), 종속축 px
+    ("residual", np.float32),     # 적합 RMS 오차(px)
+])
+
+
+def fit_poly(u: np.ndarray, v: np.ndarray, degree: int = DEGREE):
+    """
+    v ≈ polyval(coeffs, u). 점이 적으면 차수를 낮추고 앞쪽을 0으로 채워 항상 degree+1개 반환
+    반환: (coeffs, rms_residual)
+    """
+    deg = min(degree, u.size - 1)
+    coeffs = np.zeros(degree + 1)
+    if deg > 0:
+        coeffs[degree - deg:] = np.polyfit(u, v, deg)
+    else:
+        coeffs[-1] = v.mean()
+    residual = float(np.sqrt(np.mean((np.polyval(coeffs, u) - v) ** 2)))
+    return coeffs, residual
+
+
+def lane_axis(pts: np.ndarray) -> int:
+    """
+    pts [n, 2] (x, y) -> 독립축. 세로로 더 길게 뻗었으면 0 (x = f(y)), 가로로 누웠으면 1 (y = f(x))
+    """
+    span = pts.max(axis=0) - pts.min(axis=0)
+    return 0 if span[1] >= span[0] else 1
+
+
+def fit_lane(points, axis: int = None):
+    """
+    points: [(x, y), ...] -> (axis, lo, hi, coeffs, residual)
+    axis가 None이면 더 길게 뻗은 축을 독립축으로 선택
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if axis is None:
+        axis = lane_axis(pts)
+    ind, dep = (pts[:, 1], pts[:, 0]) if axis == 0 else (pts[:, 0], pts[:, 1])
+    lo, hi = float(ind.min()), float(ind.max())
+    t = (ind - lo) / ((hi - lo) or 1.0)
+    coeffs, residual = fit_poly(t, dep)
+    return axis, lo, hi, coeffs, residual
+
+
+def enum_code(table, name):
+    # LABELS / COLORS 이름 -> u8 코드 (모르는 이름은 0: ambiguous / unknown)
+    return table.index(name) if name in table else 0
+
+
+def compact_lanes(coords, lane_meta=None) -> np.ndarray:
+    """
+    infer() 결과 (coords, lane_meta) -> LANE_DTYPE 배열 [레인 수]
+    """
+    recs = np.zeros(len(coords), dtype=LANE_DTYPE)
+    for i, lane in enumerate(coords):
+        if not len(lane):
+            continue
+        axis, lo, hi, coeffs, residual = fit_lane(lane)
+        r = recs[i]
+        r["axis"], r["num_points"] = axis, len(lane)
+        r["lo"], r["hi"], r["coeffs"], r["residual"] = lo, hi, coeffs, residual
+        if lane_meta is not None and i < len(lane_meta):
+            meta = lane_meta[i]
+            r["label"] = enum_code(LABELS, meta.get("label"))
+            r["color"] = enum_code(COLORS, meta.get("color"))
+            r["coverage"] = meta.get("coverage", 0.0)
+            r["confidence"] = meta.get("confidence", 0.0)
+    return recs
+
+
+def resample_lanes(recs: np.ndarray, num: int = 32) -> np.ndarray:
+    """
+    LANE_DTYPE 배열 -> 독립축 균등 간격 num개 점 [레인 수, num, 2] (x, y) float32
+    """
+    t = np.linspace(0.0, 1.0, num)
+    c = recs["coeffs"].astype(np.float64)                                  # [n, D+1]
+    dep = np.stack([t ** p for p in range(DEGREE, -1, -1)], axis=0)        # [D+1, num]
+    dep = c @ dep                                                          # [n, num]
+    lo, hi = recs["lo"][:, None].astype(np.float64), recs["hi"][:, None].astype(np.float64)
+    ind = lo + t[None, :] * (hi - lo)
+    vertical = (recs["axis"] == 0)[:, None]
+    xs = np.where(vertical, dep, ind)
+    ys = np.where(vertical, ind, dep)
+    return np.stack([xs, ys], axis=-1).astype(np.float32)
+
+
+def lane_points(rec, num: int = None):
+    """
+    레코드 1개 -> 정수 좌표 리스트 (그리기/기존 coords 소비자용). num이 없으면 원래 점 개수
+    """
+    n = max(2, int(num or rec["num_points"]))
+    pts = resample_lanes(np.asarray(rec, dtype=LANE_DTYPE).reshape(1), n)[0]
+    return [(int(x), int(y)) for x, y in np.rint(pts)]
+
+
+def to_dicts(recs: np.ndarray):
+    """
+    JSON 직렬화용 레인 dict 리스트 (레인당 float 몇 개)
+    """
+    return [{
+        "label": LABELS[r["label"]] if r["label"] < len(LABELS) else LABELS[0],
+        "color": COLORS[r["color"]] if r["color"] < len(COLORS) else COLORS[0],
+        "axis": int(r["axis"]),
+        "range": [round(float(r["lo"]), 2), round(float(r["hi"]), 2)],
+        "coeffs": [round(float(c), 3) for c in r["coeffs"]],
+        "num_points": int(r["num_points"]),
+        "confidence": round(float(r["confidence"]), 4),
+        "coverage": round(float(r["coverage"]), 4),
+        "residual": round(float(r["residual"]), 3),
+    } for r in recs]
+
+
+def from_dicts(lanes) -> np.ndarray:
+    """
+    to_dicts() 결과 -> LANE_DTYPE 배열
+    """
+    recs = np.zeros(len(lanes), dtype=LANE_DTYPE)
+    for r, d in zip(recs, lanes):
+        r["label"], r["color"] = enum_code(LABELS, d["label"]), enum_code(COLORS, d["color"])
+        r["axis"], r["num_points"] = d["axis"], d["num_points"]
+        r["lo"], r["hi"] = d["range"]
+        r["coeffs"] = d["coeffs"]
+        r["confidence"], r["coverage"], r["residual"] = d["confidence"], d["coverage"], d["residual"]
+    return recs
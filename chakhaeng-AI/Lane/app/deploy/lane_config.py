@@ -0,0 +1,82 @@
+# lane_config.py
+# 배포용 설정 로더: Config.fromfile(임시 디렉터리 복사 → 모듈 import → 삭제) 결과를 JSON 스냅샷으로 캐시
+#  - 키: 설정 파일 절대 경로, 검증: (mtime_ns, size)가 같으면 바로 사용, 다르면 내용 해시로 재확인
+#  - _base_ 상속 설정이나 JSON으로 표현할 수 없는 값이 있으면 캐시하지 않고 매번 fromfile
+import hashlib
+import json
+import os
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "chakhaeng", "lane_config.json")
+
+
+def _file_hash(path: str) -> str:
+    with open(path, "rb") as fp:
+        return hashlib.sha256(fp.read()).hexdigest()[:16]
+
+
+def _load_cache(path):
+    try:
+        with open(path, "r", encoding="utf-8") as fp:
+            return json.load(fp)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path, cache):
+    d = os.path.dirname(path)
+    if d:
+        os.makedirs(d, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"  # 배치 워커들이 동시에 써도 깨지지 않도록 프로세스별 임시 파일
+    with open(tmp, "w", encoding="utf-8") as fp:
+        json.dump(cache, fp, indent=2)
+    os.replace(tmp, path)
+
+
+def _snapshot(config_path: str):
+    """
+    Config.fromfile 결과 -> JSON 직렬화 가능한 dict (불가능하면 None)
+    """
+    from utils.config import Config  # type: ignore
+
+    cfg = Config.fromfile(config_path)
+    try:
+        return json.loads(json.dumps(cfg._cfg_dict.to_dict()))
+    except (TypeError, ValueError):
+        return None
+
+
+def load_config(config_path: str, cache_path: str = DEFAULT_CACHE):
+    """
+    Config.fromfile과 같은 Config 객체 반환 (cache_path=None이면 캐시 없이 fromfile)
+    스냅샷은 JSON을 거치므로 tuple 값은 list로 돌아온다 (배포 경로는 스칼라 값만 사용)
+    """
+    from utils.config import Config  # type: ignore
+
+    path = os.path.abspath(os.path.expanduser(config_path))
+    if cache_path is None:
+        return Config.fromfile(path)
+
+    st = os.stat(path)
+    cache = _load_cache(cache_path)
+    entry = cache.get(path)
+    if entry is not None and entry.get("mtime_ns") == st.st_mtime_ns and entry.get("size") == st.st_size:
+        return Config(entry["values"], filename=path)
+
+    digest = _file_hash(path)
+    if entry is not None and entry.get("sha256") == digest:
+        # 내용은 그대로이고 mtime만 바뀜(checkout/복사) → 스냅샷 재사용, 검증 키만 갱신
+        values = entry["values"]
+    else:
+        with open(path, "r", encoding="utf-8") as fp:
+            if "_base_" in fp.read():
+                return Config.fromfile(path)
+        values = _snapshot(path)
+        if values is None:
+            return Config.fromfile(path)
+
+    cache[path] = {"mtime_ns": st.st_mtime_ns, "size": st.st_size, "sha256": digest, "values": values}
+    try:
+        _save_cache(cache_path, cache)
+    except OSError:
+        pass  # 읽기 전용 홈 등: 캐시 없이 계속
+    return Config(values, filename=path)
@@ -0,0 +1,234 @@
+# lane_decode.py
+# UFLDv2 TFLite 출력 후처리(좌표 복원): 벡터화 유틸과 인터프리터 없이 쓰는 LaneDecoder
+from collections import OrderedDict
+
+import numpy as np
+
+# 디코더가 읽는 레인: row 앵커 레인(자차 좌/우), col 앵커 레인(측면)
+ROW_LANE_IDX = (1, 2)
+COL_LANE_IDX = (0, 3)
+
+
+def lane_slots(num_lanes: int, lane_idx):
+    """
+    출력 텐서의 레인 축 크기 -> lane_idx 각 레인의 텐서 인덱스
+    parsingNet.slice_head()로 사용 레인만 남긴 모델은 레인 축이 len(lane_idx)이고 lane_idx 순서로 들어 있음
+    """
+    lane_idx = list(lane_idx)
+    if num_lanes > max(lane_idx):
+        return lane_idx
+    if num_lanes == len(lane_idx):
+        return list(range(num_lanes))
+    raise ValueError(f"레인 축 크기 {num_lanes}로 레인 {lane_idx}를 읽을 수 없습니다.")
+
+
+def local_expectation(loc: np.ndarray, local_width: int) -> np.ndarray:
+    """
+    loc: [grid, num_cls, num_lanes] 또는 배치 [N, grid, num_cls, num_lanes] 위치 로짓
+    각 (anchor, lane)의 argmax 주변 ±local_width 윈도우를 fancy indexing으로 한 번에 모아
+    softmax 가중 평균(서브셀 보정, +0.5 포함)을 계산. 반환: [num_cls, num_lanes] / [N, num_cls, num_lanes] float32
+
+    경계에서 잘린 윈도우는 길이별로 묶어 처리(보통 1~3 그룹)해서
+    기존 per-point 루프(softmax_np(loc[L:R+1]))와 합산 순서까지 동일한 값을 낸다.
+    배치 입력도 윈도우 단위 연산이라 프레임별 호출 결과와 같다.
+    """
+    if loc.ndim == 3:
+        return local_expectation(loc[np.newaxis], local_width)[0]
+
+    grid = loc.shape[1]
+    center = np.argmax(loc, axis=1)                   # [N, cls, lanes]
+    left = np.maximum(center - local_width, 0)
+    right = np.minimum(center + local_width, grid - 1)
+    lengths = right - left + 1
+
+    out = np.empty(center.shape, dtype=np.float32)
+    for n in np.unique(lengths):
+        b_idx, cls_idx, lane_idx = np.nonzero(lengths == n)
+        inds = left[b_idx, cls_idx, lane_idx][:, None] + np.arange(n)   # [m, n]
+        logits = loc[b_idx[:, None], inds, cls_idx[:, None], lane_idx[:, None]].astype(np.float32)
+        logits = logits - np.max(logits, axis=1, keepdims=True)
+        e = np.exp(logits)
+        probs = e / np.sum(e, axis=1, keepdims=True)
+        out[b_idx, cls_idx, lane_idx] = np.sum(probs * inds.astype(np.float32), axis=1) + 0.5
+    return out
+
+
+def points_sorted_by_y(xs: np.ndarray, ys: np.ndarray):
+    """
+    px 좌표 배열 -> y 오름차순(안정 정렬) (int, int) 튜플 리스트
+    """
+    xs = xs.astype(np.int64)
+    ys = ys.astype(np.int64)
+    order = np.argsort(ys, kind="stable")
+    return list(zip(xs[order].tolist(), ys[order].tolist()))
+
+
+def softmax_np(x, axis=None):
+    x = x - np.max(x, axis=axis, keepdims=True)
+    e = np.exp(x)
+    return e / np.sum(e, axis=axis, keepdims=True)
+
+
+class SourceGeometry:
+    """
+    원본 해상도별로 한 번만 계산하는 값: 앵커→픽셀 LUT, 스트립 폭, 스냅 반경
+    """
+    __slots__ = ("width", "height", "row_y_px", "col_x_px", "strip_half", "snap_r")
+
+    def __init__(self, width: int, height: int, row_anchor: np.ndarray, col_anchor: np.ndarray):
+        self.width, self.height = width, height
+        self.row_y_px = row_anchor * height   # [num_row] row 앵커의 원본 y(px)
+        self.col_x_px = col_anchor * width    # [num_col] col 앵커의 원본 x(px)
+        self.strip_half = max(4, int(width * 0.004))
+        self.snap_r = max(3, int(width * 0.0035))
+
+
+class LaneDecoder:
+    """
+    UFLDv2 출력 -> 원본 좌표 레인 (인터프리터 없이 config 값만으로 생성)
+    앵커와 해상도별 SourceGeometry LRU를 들고 있음
+    """
+    # 원본 해상도별 SourceGeometry LRU 크기
+    GEOMETRY_CACHE_SIZE = 8
+
+    def __init__(self, crop_ratio: float, num_row: int, num_col: int):
+        self.crop_ratio = float(crop_ratio)
+        self.num_row = int(num_row)
+        self.num_col = int(num_col)
+        # 원본 높이 기준 앵커
+        self.row_anchor = np.linspace(1.0 - self.crop_ratio, 1.0, self.num_row, dtype=np.float32)  # 0.4~1.0
+        self.col_anchor = np.linspace(0.0, 1.0, self.num_col, dtype=np.float32)                    # 0.0~1.0
+        self._geometry_cache = OrderedDict()
+
+    @classmethod
+    def from_config(cls, cfg):
+        return cls(cfg.crop_ratio, cfg.num_row, cfg.num_col)
+
+    def geometry(self, width: int, height: int) -> SourceGeometry:
+        cache = self._geometry_cache
+        key = (int(width), int(height))
+        geo = cache.get(key)
+        if geo is None:
+            geo = cache[key] = SourceGeometry(key[0], key[1], self.row_anchor, self.col_anchor)
+            if len(cache) > self.GEOMETRY_CACHE_SIZE:
+                cache.popitem(last=False)
+        else:
+            cache.move_to_end(key)
+        return geo
+
+    def pred2coords(self, pred: dict, ori_w: int, ori_h: int, **kwargs):
+        """
+        UFLD 계열 출력으로부터 (x,y) 좌표 시퀀스 리스트 생성 (배치의 첫 프레임만)
+        """
+        return self.pred2coords_batch({k: v[:1] for k, v in pred.items()}, ori_w, ori_h, **kwargs)[0]
+
+    def pred2coords_batch(
+        self,
+        pred: dict,
+        ori_w: int,
+        ori_h: int,
+        *,
+        tau_row: float = 0.90,
+        tau_col: float = 0.90,
+        min_pts_row: int = 10,
+        min_pts_col: int = 10,
+        local_width: int = 2,
+        row_lane_idx: tuple = ROW_LANE_IDX,
+        col_lane_idx: tuple = COL_LANE_IDX,
+        sort_left_to_right: bool = True,
+        return_conf: bool = False,
+    ):
+        """
+        배치 출력 [N, ...] -> 프레임별 좌표 시퀀스 리스트 N개
+        softmax/argmax/윈도우 기대값은 배치 전체를 한 번에 계산하고, 레인 조립만 프레임별로 수행
+        ori_w / ori_h: 공통 크기(int) 또는 프레임별 크기 시퀀스(해상도가 섞인 배치)
+        return_conf=True면 프레임별 (coords, 레인별 존재 확률 평균) 반환
+        slice_head() 모델(레인 축이 사용 레인만)이면 row_lane_idx / col_lane_idx는 원래 레인 번호로만 쓰임
+        """
+        loc_row = pred["loc_row"]      # [N, 200, 72, 4]
+        loc_col = pred["loc_col"]      # [N, 100, 81, 4]
+        exist_row = pred["exist_row"]  # [N, 2, 72, 4]
+        exist_col = pred["exist_col"]  # [N, 2, 81, 4]
+
+        exist_row_prob_all = softmax_np(exist_row.astype(np.float32), axis=1)[:, 1]  # [N, num_row, 4]
+        exist_col_prob_all = softmax_np(exist_col.astype(np.float32), axis=1)[:, 1]  # [N, num_col, 4]
+
+        batch, grid_row, num_row, _ = loc_row.shape
+        _, grid_col, num_col, _     = loc_col.shape
+        # (텐서 레인 인덱스, 원래 레인 번호)
+        row_lanes = list(zip(lane_slots(loc_row.shape[3], row_lane_idx), row_lane_idx))
+        col_lanes = list(zip(lane_slots(loc_col.shape[3], col_lane_idx), col_lane_idx))
+
+        valid_row_all = np.argmax(exist_row, axis=1)  # [N, num_row, 4]
+        valid_col_all = np.argmax(exist_col, axis=1)  # [N, num_col, 4]
+
+        # 모든 프레임/anchor/lane의 ±local_width 윈도우 기대값을 한 번에 계산
+        out_row_all = local_expectation(loc_row, local_width)  # [N, num_row, 4]
+        out_col_all = local_expectation(loc_col, local_width)  # [N, num_col, 4]
+
+        ori_ws = [ori_w] * batch if np.isscalar(ori_w) else list(ori_w)
+        ori_hs = [ori_h] * batch if np.isscalar(ori_h) else list(ori_h)
+
+        def longest_run(indices: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
+            if indices.size == 0:
+                return indices
+            splits = np.where(np.diff(indices) > 2)[0] + 1
+            groups = np.split(indices, splits)
+            if weights is None:
+                groups.sort(key=lambda g: len(g), reverse=True)
+            else:
+                groups.sort(key=lambda g: (len(g), float(weights[g].sum())), reverse=True)
+            return groups[0]
+
+        def lane_key(pts):
+            ys = [p[1] for p in pts]
+            y_cut = np.percentile(ys, 80)
+            xs_bottom = [p[0] for p in pts if p[1] >= y_cut] or [p[0] for p in pts]
+            xs_bottom.sort()
+            return xs_bottom[len(xs_bottom) // 2]
+
+        results = []
+        for b in range(batch):
+            exist_row_prob, exist_col_prob = exist_row_prob_all[b], exist_col_prob_all[b]
+            valid_row, valid_col = valid_row_all[b], valid_col_all[b]
+            out_row, out_col = out_row_all[b], out_col_all[b]
+            geo = self.geometry(ori_ws[b], ori_hs[b])
+            lanes = {}
+            confs = {}
+
+            # ROW 기반 (y 고정, x 예측)
+            for t, i in row_lanes:
+                mask = (exist_row_prob[:, t] > tau_row) & (valid_row[:, t] == 1)
+                active = np.where(mask)[0]
+                if active.size < min_pts_row:
+                    continue
+                active = longest_run(active, weights=exist_row_prob[:, t])
+                if active.size < min_pts_row:
+                    continue
+
+                x_px = (out_row[active, t].astype(np.float64) / (grid_row - 1)) * geo.width
+                y_px = geo.row_y_px[active]
+                lanes[i] = points_sorted_by_y(x_px, y_px)
+                confs[i] = float(exist_row_prob[active, t].mean())
+
+            # COL 기반 (x 고정, y 예측)
+            for t, i in col_lanes:
+                mask = (exist_col_prob[:, t] > tau_col) & (valid_col[:, t] == 1)
+                active = np.where(mask)[0]
+                if active.size < min_pts_col:
+                    continue
+                active = longest_run(active, weights=exist_col_prob[:, t])
+                if active.size < min_pts_col:
+                    continue
+
+                y_px = (out_col[active, t].astype(np.float64) / (grid_col - 1)) * geo.height
+                x_px = geo.col_x_px[active]
+                lanes[i] = points_sorted_by_y(x_px, y_px)
+                confs[i] = float(exist_col_prob[active, t].mean())
+
+            order = sorted(i for i in lanes if lanes[i])
+            if sort_left_to_right:
+                order.sort(key=lambda i: lane_key(lanes[i]))
+            coords = [lanes[i] for i in order]
+            results.append((coords, [confs[i] for i in order]) if return_conf else coords)
+        return results
@@ -0,0 +1,68 @@
+# lane_motion.py
+# 정지 장면(신호 대기 등) 모션 게이트: 크롭 ROI를 작게 줄인 회색조 프레임 차이가 작으면
+# 전처리 / invoke / classify_lane을 건너뛰고 직전 결과(coords, lane_meta)를 재사용
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    gate = MotionGate(roi_top=0.4)
+    result = gate.lookup(frame)          # 재사용 가능하면 직전 결과, 아니면 None (새 기준 프레임으로 등록)
+    if result is None:
+        result = full_infer(frame)
+        gate.store(result)
+    비교 기준은 마지막으로 전체 추론한 프레임이라, 느린 변화도 누적되면 다시 추론한다.
+    """
+
+    def __init__(self, roi_top: float, threshold: float = 0.01, max_reuse: int = 15,
+                 size=(160, 48), pixel_threshold: int = 12):
+        self.roi_top = float(roi_top)             # 원본 높이 대비 ROI 시작 비율 (= 1 - crop_ratio)
+        self.threshold = float(threshold)         # 변화 픽셀 비율이 이 값 이하면 재사용
+        self.max_reuse = int(max_reuse)           # 연속 재사용 상한 (이후 강제 추론)
+        self.size = tuple(size)                   # 비교용 축소 크기 (W, H)
+        self.pixel_threshold = int(pixel_threshold)
+        self.frames = 0
+        self.reused = 0
+        self.last_score = None
+        self.reset()
+
+    def reset(self):
+        """
+        기준 프레임/결과를 버림 (입력 소스가 바뀔 때)
+        """
+        self._ref = None
+        self._shape = None
+        self._result = None
+        self._streak = 0
+
+    def _thumb(self, img_bgr):
+        y0 = int(round(img_bgr.shape[0] * self.roi_top))
+        small = cv2.resize(img_bgr[y0:], self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+    def lookup(self, img_bgr):
+        self.frames += 1
+        thumb = self._thumb(img_bgr)
+        # 해상도가 다른 프레임에는 좌표 스케일이 달라 재사용하지 않음
+        if self._result is not None and self._streak < self.max_reuse and img_bgr.shape == self._shape:
+            diff = cv2.absdiff(thumb, self._ref)
+            self.last_score = float(np.count_nonzero(diff > self.pixel_threshold)) / diff.size
+            if self.last_score <= self.threshold:
+                self._streak += 1
+                self.reused += 1
+                return self._result
+        else:
+            self.last_score = None
+        self._ref = thumb
+        self._shape = img_bgr.shape
+        self._result = None
+        self._streak = 0
+        return None
+
+    def store(self, result):
+        self._result = result
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "reused": self.reused, "invoked": self.frames - self.reused,
+                "reuse_ratio": self.reused / self.frames if self.frames else 0.0}
@@ -0,0 +1,64 @@
+# lane_preprocess.py
+# UFLDv2 TFLite 입력 전처리: 크롭 먼저 → 남는 영역만 리사이즈 → LUT 정규화
+import cv2
+import numpy as np
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+def legacy_preprocess(img_bgr, input_width, input_height, crop_ratio):
+    """
+    기존 전처리(UFLDv2TFLite.infer 기본 경로와 동일): 전체 리사이즈 → 상단 버림 → RGB → /255 → mean/std
+    -> [input_height, input_width, 3] float32. 비교/검증 기준으로 사용
+    """
+    h_full = int(input_height / crop_ratio)
+    img_resized = cv2.resize(img_bgr, (input_width, h_full), cv2.INTER_CUBIC)[h_full - input_height:]
+    img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
+    mean = np.array(IMAGENET_MEAN, dtype=np.float32).reshape(1, 1, 3)
+    std = np.array(IMAGENET_STD, dtype=np.float32).reshape(1, 1, 3)
+    return (img_rgb - mean) / std
+
+
+class FusedPreprocessor:
+    """
+    기존 전처리(전체 리사이즈 → 상단 (1-crop_ratio) 버림 → BGR->RGB → /255 → mean/std)를
+    1) 원본에서 버려질 행을 먼저 잘라내고 남는 영역만 (input_width, input_height)로 리사이즈
+    2) uint8 BGR->RGB 후 채널별 256-entry float32 LUT(cv2.LUT) 한 번으로 정규화
+    로 대체. 크롭 시작 행을 정수로 반올림하므로 기존 대비 세로 방향으로 0.5px(원본) 이내의 차이가 있다.
+    """
+
+    def __init__(self, input_width: int, input_height: int, crop_ratio: float,
+                 mean=IMAGENET_MEAN, std=IMAGENET_STD):
+        self.input_width = int(input_width)
+        self.input_height = int(input_height)
+        self.h_full = int(self.input_height / crop_ratio)      # 320/0.6 ≈ 533
+        self.cut_offset = self.h_full - self.input_height      # ≈ 213
+
+        # 기존 경로와 같은 float32 연산 순서로 만든 테이블 → 같은 uint8 입력이면 비트 단위로 동일
+        v = np.arange(256, dtype=np.float32)[:, None] / np.float32(255.0)
+        lut = (v - np.array(mean, dtype=np.float32)) / np.array(std, dtype=np.float32)  # [256, 3] RGB
+        self.lut = np.ascontiguousarray(lut.reshape(256, 1, 3))
+
+        self._resized = np.empty((self.input_height, self.input_width, 3), dtype=np.uint8)
+        self._rgb = np.empty_like(self._resized)
+
+    def crop_top(self, src_h: int) -> int:
+        """
+        원본 높이 src_h에서 버려지는 상단 행 수
+        """
+        return int(round(self.cut_offset * src_h / self.h_full))
+
+    def __call__(self, img_bgr: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+        """
+        img_bgr: 원본 BGR uint8 -> [input_height, input_width, 3] float32 (out이 있으면 그 버퍼에 기록)
+        """
+        y0 = self.crop_top(img_bgr.shape[0])
+        cv2.resize(img_bgr[y0:], (self.input_width, self.input_height), dst=self._resized)
+        cv2.cvtColor(self._resized, cv2.COLOR_BGR2RGB, dst=self._rgb)
+        if out is None:
+            out = np.empty((self.input_height, self.input_width, 3), dtype=np.float32)
+        res = cv2.LUT(self._rgb, self.lut, dst=out)
+        if res is not out:  # dst를 그대로 쓰지 못한 경우(비연속 뷰 등)
+            out[...] = res
+        return out
@@ -0,0 +1,134 @@
+# lane_profiler.py
+# 배포 경로 스테이지별 지연시간 계측 (preprocess / invoke / collect_outputs / pred2coords / classify_lane / render / encode)
+import contextlib
+import functools
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+_NULL = contextlib.nullcontext()
+
+
+class NullProfiler:
+    """
+    계측 비활성 상태. stage()/frame()은 미리 만든 nullcontext를 그대로 돌려주므로 추가 비용이 없다.
+    """
+    enabled = False
+
+    def stage(self, name):
+        return _NULL
+
+    def frame(self, idx):
+        return _NULL
+
+    def record(self, name, seconds):
+        pass
+
+
+class StageProfiler:
+    """
+    with prof.frame(idx):            # 이후 기록을 idx 프레임에 귀속 (스레드별)
+        with prof.stage("invoke"):
+            ...
+    스테이지별 최근 window개 샘플로 p50/p95/p99, 전체 누적으로 mean/max를 보관.
+    max_frames > 0이면 최근 max_frames개 프레임의 스테이지별 합계도 보관(dump용, 오래된 프레임부터 버림).
+    같은 프레임에서 같은 스테이지가 여러 번 불리면(classify_lane 등) 합산한다.
+    """
+    enabled = True
+
+    def __init__(self, window: int = 1000, max_frames: int = 0):
+        self.window = int(window)
+        self.max_frames = int(max_frames or 0)
+        self._recent = {}               # name -> deque[ms]
+        self._totals = {}               # name -> [count, sum_ms, max_ms]
+        self._frames = OrderedDict()    # frame idx -> {name: ms} (max_frames > 0일 때만)
+        self._dropped_frames = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def frame(self, idx):
+        prev = getattr(self._local, "frame", None)
+        self._local.frame = idx
+        try:
+            yield
+        finally:
+            self._local.frame = prev
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - t0)
+
+    def record(self, name, seconds):
+        ms = seconds * 1000.0
+        idx = getattr(self._local, "frame", None)
+        with self._lock:
+            recent = self._recent.get(name)
+            if recent is None:
+                recent = self._recent[name] = deque(maxlen=self.window)
+                self._totals[name] = [0, 0.0, 0.0]
+            recent.append(ms)
+            tot = self._totals[name]
+            tot[0] += 1
+            tot[1] += ms
+            tot[2] = max(tot[2], ms)
+            if idx is not None and self.max_frames:
+                per_frame = self._frames.get(idx)
+                if per_frame is None:
+                    per_frame = self._frames[idx] = {}
+                    if len(self._frames) > self.max_frames:
+                        self._frames.popitem(last=False)
+                        self._dropped_frames += 1
+                per_frame[name] = per_frame.get(name, 0.0) + ms
+
+    def summary(self) -> dict:
+        """
+        스테이지별 {count, mean_ms, max_ms, p50_ms, p95_ms, p99_ms} (백분위는 최근 window개 기준)
+        """
+        with self._lock:
+            out = {}
+            for name, recent in self._recent.items():
+                count, sum_ms, max_ms = self._totals[name]
+                p50, p95, p99 = np.percentile(np.fromiter(recent, dtype=np.float64), [50, 95, 99])
+                out[name] = {"count": count, "mean_ms": sum_ms / count, "max_ms": max_ms,
+                             "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+            return out
+
+    def report(self):
+        for name, st in self.summary().items():
+            print(f"[PROF] {name:16s} n={st['count']:6d} mean={st['mean_ms']:8.2f} "
+                  f"p50={st['p50_ms']:8.2f} p95={st['p95_ms']:8.2f} p99={st['p99_ms']:8.2f} "
+                  f"max={st['max_ms']:8.2f} ms")
+
+    def dump(self, path: str):
+        with self._lock:
+            frames = [{"frame": idx, **{k: round(v, 4) for k, v in st.items()}}
+                      for idx, st in sorted(self._frames.items(), key=lambda kv: kv[0])]
+            dropped = self._dropped_frames
+        data = {"window": self.window, "aggregate": self.summary(),
+                "max_frames": self.max_frames, "dropped_frames": dropped, "frames": frames}
+        with open(path, "w", encoding="utf-8") as fp:
+            json.dump(data, fp, indent=2)
+
+
+def timed(name):
+    """
+    메서드 데코레이터: self.profiler가 활성일 때만 스테이지로 계측
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            prof = getattr(self, "profiler", None)
+            if prof is None or not prof.enabled:
+                return fn(self, *args, **kwargs)
+            with prof.stage(name):
+                return fn(self, *args, **kwargs)
+        return wrapper
+    return deco
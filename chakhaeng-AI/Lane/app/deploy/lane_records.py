@@ -0,0 +1,134 @@
+# lane_records.py
+# 헤드리스 모드용 프레임 단위 레인 결과 스트림 (JSON Lines / 고정 레이아웃 바이너리)
+import json
+import os
+import struct
+
+import numpy as np
+
+from deploy.lane_compact import COLORS, LABELS, LANE_DTYPE, compact_lanes, enum_code, to_dicts  # type: ignore
+
+# 바이너리 레이아웃 (little-endian)
+#   파일 헤더 : magic "LANE" + u16 version
+#   프레임    : u32 frame_idx, f64 timestamp(s), u8 num_lanes
+#   레인(v1)  : u8 label, u8 color, f32 coverage, u16 num_points, num_points × (i16 x, i16 y)
+#   레인(v2)  : compact 모드, LANE_DTYPE 레코드 그대로 (레인당 고정 크기)
+_MAGIC = b"LANE"
+_VERSION = 1
+_VERSION_COMPACT = 2
+_FILE_HEAD = struct.Struct("<4sH")
+_FRAME_HEAD = struct.Struct("<IdB")
+_LANE_HEAD = struct.Struct("<BBfH")
+_POINT = struct.Struct("<hh")
+
+
+def lane_record(frame_idx, timestamp, coords, lane_meta):
+    """
+    infer() 결과 -> 직렬화용 dict (그리기/진단용 signal, gaps 등은 제외)
+    """
+    lanes = []
+    for lane, meta in zip(coords, lane_meta):
+        lanes.append({
+            "points": [[int(x), int(y)] for x, y in lane],
+            "label": meta["label"],
+            "color": meta["color"],
+            "coverage": round(float(meta["coverage"]), 4),
+        })
+    return {"frame": int(frame_idx), "t": round(float(timestamp), 6), "lanes": lanes}
+
+
+class LaneRecordWriter:
+    """
+    fmt: "jsonl" | "bin" (None이면 확장자로 결정: .bin -> bin, 그 외 jsonl)
+    compact=True면 점 목록 대신 lane_compact 다항식 레코드(레인당 float 몇 개)로 기록
+    """
+
+    def __init__(self, path: str, fmt: str = None, compact: bool = False):
+        if fmt is None:
+            fmt = "bin" if os.path.splitext(path)[1].lower() == ".bin" else "jsonl"
+        if fmt not in ("jsonl", "bin"):
+            raise ValueError(f"지원하지 않는 레코드 포맷: {fmt}")
+        self.path = path
+        self.fmt = fmt
+        self.compact = compact
+        self.count = 0
+        if fmt == "bin":
+            self._fp = open(path, "wb")
+            self._fp.write(_FILE_HEAD.pack(_MAGIC, _VERSION_COMPACT if compact else _VERSION))
+        else:
+            self._fp = open(path, "w", encoding="utf-8")
+
+    def write(self, frame_idx, timestamp, coords, lane_meta):
+        if self.compact:
+            lanes = compact_lanes(coords, lane_meta)
+            if self.fmt == "bin":
+                self._fp.write(_FRAME_HEAD.pack(int(frame_idx), float(timestamp), len(lanes)) + lanes.tobytes())
+            else:
+                rec = {"frame": int(frame_idx), "t": round(float(timestamp), 6), "lanes": to_dicts(lanes)}
+                self._fp.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+            self.count += 1
+            return
+        rec = lane_record(frame_idx, timestamp, coords, lane_meta)
+        if self.fmt == "bin":
+            self._fp.write(self._pack(rec))
+        else:
+            self._fp.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self.count += 1
+
+    @staticmethod
+    def _pack(rec) -> bytes:
+        parts = [_FRAME_HEAD.pack(rec["frame"], rec["t"], len(rec["lanes"]))]
+        for lane in rec["lanes"]:
+            pts = lane["points"]
+            parts.append(_LANE_HEAD.pack(enum_code(LABELS, lane["label"]), enum_code(COLORS, lane["color"]),
+                                         lane["coverage"], len(pts)))
+            parts.extend(_POINT.pack(x, y) for x, y in pts)
+        return b"".join(parts)
+
+    def close(self):
+        if self._fp is not None:
+            self._fp.close()
+            self._fp = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_records(path: str):
+    """
+    LaneRecordWriter가 만든 파일(.jsonl / .bin)을 프레임 dict 단위로 순회
+    compact 파일의 레인은 lane_compact.to_dicts() 형식 (from_dicts로 LANE_DTYPE 배열 복원)
+    """
+    if os.path.splitext(path)[1].lower() != ".bin":
+        with open(path, "r", encoding="utf-8") as fp:
+            for line in fp:
+                if line.strip():
+                    yield json.loads(line)
+        return
+
+    with open(path, "rb") as fp:
+        data = fp.read()
+    magic, version = _FILE_HEAD.unpack_from(data, 0)
+    if magic != _MAGIC or version not in (_VERSION, _VERSION_COMPACT):
+        raise ValueError(f"레인 레코드 파일이 아닙니다: {path}")
+    off = _FILE_HEAD.size
+    while off < len(data):
+        frame_idx, timestamp, num_lanes = _FRAME_HEAD.unpack_from(data, off)
+        off += _FRAME_HEAD.size
+        if version == _VERSION_COMPACT:
+            recs = np.frombuffer(data, dtype=LANE_DTYPE, count=num_lanes, offset=off)
+            off += num_lanes * LANE_DTYPE.itemsize
+            yield {"frame": frame_idx, "t": timestamp, "lanes": to_dicts(recs)}
+            continue
+        lanes = []
+        for _ in range(num_lanes):
+            label, color, coverage, num_points = _LANE_HEAD.unpack_from(data, off)
+            off += _LANE_HEAD.size
+            pts = [list(_POINT.unpack_from(data, off + i * _POINT.size)) for i in range(num_points)]
+            off += num_points * _POINT.size
+            lanes.append({"points": pts, "label": LABELS[label], "color": COLORS[color],
+                          "coverage": coverage})
+        yield {"frame": frame_idx, "t": timestamp, "lanes": lanes}
@@ -0,0 +1,185 @@
+# lane_torch_bench.py
+# CPU에서 PyTorch parsingNet vs TFLite 비교 → JSON
+#  - 같은 프레임을 같은 전처리(UFLDv2TFLite 기존 경로)로 만든 입력에 대해 네트워크 지연(p50/p95)만 측정
+#  - torch 변형: fp32(NCHW) / channels_last / channels_last + bf16 autocast, threads별
+#  - 출력 비교: torch fp32 대비 변형별 loc 로짓 최대 오차와 argmax 일치율,
+#    TFLite가 같은 체크포인트에서 export된 경우 TFLite 대비 값도 의미가 있음
+#
+# 예) python deploy/lane_torch_bench.py --checkpoint weights/culane_res18.pth \
+#         --tflite_model weights/culane_res18_dynamic.tflite --threads 1,4 --out torch_vs_tflite.json
+# 주의: torch와 전체 tensorflow를 한 프로세스에서 import하면 충돌할 수 있어 tflite-runtime 설치를 권장
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import time
+
+import torch  # tensorflow보다 먼저 import
+import numpy as np
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_ROOT)
+
+from deploy.lane_bench import DEFAULT_CONFIG, DEFAULT_IMAGES, DEFAULT_MODELS, DEFAULT_VIDEOS, \
+    load_sources, peak_rss_mb, git_commit  # type: ignore
+from deploy.lane_config import load_config  # type: ignore
+from deploy.lane_preprocess import legacy_preprocess  # type: ignore
+from deploy.tensorflow_lite_infer import UFLDv2TFLite  # type: ignore
+from utils.infer_utils import build_model, configure_threads, forward, prepare_model, set_anchors  # type: ignore
+
+VARIANTS = {
+    # 이름: (channels_last, bf16 autocast)
+    "fp32": (False, False),
+    "channels_last": (True, False),
+    "channels_last_bf16": (True, True),
+}
+
+
+def _percentiles(ts):
+    p50, p95 = np.percentile(ts, [50, 95])
+    return {"iters": len(ts), "mean_ms": float(np.mean(ts)), "p50_ms": float(p50), "p95_ms": float(p95)}
+
+
+def make_inputs(cfg, frames):
+    # TFLite 기존 전처리 결과 [320, 1600, 3] → 두 백엔드에 같은 입력을 사용
+    W, H, crop = int(cfg.train_width), int(cfg.train_height), float(cfg.crop_ratio)
+    return [legacy_preprocess(f, W, H, crop) for f in frames]
+
+
+def bench_tflite(isnet, inputs, warmup, repeat):
+    batch = [x[np.newaxis] for x in inputs]
+    for x in batch[:warmup]:
+        isnet.invoke_raw(x)
+    ts, outs = [], []
+    for r in range(repeat):
+        for x in batch:
+            t0 = time.perf_counter()
+            preds = isnet.invoke_raw(x)
+            ts.append((time.perf_counter() - t0) * 1000.0)
+            if r == 0:
+                outs.append({k: v.copy() for k, v in preds.items()})
+    return _percentiles(ts), outs
+
+
+def bench_torch(net, inputs, warmup, repeat, amp):
+    batch = [torch.from_numpy(np.ascontiguousarray(x.transpose(2, 0, 1)))[None] for x in inputs]
+    for x in batch[:warmup]:
+        forward(net, x, amp=amp)
+    ts, outs = [], []
+    for r in range(repeat):
+        for x in batch:
+            t0 = time.perf_counter()
+            pred = forward(net, x, amp=amp)
+            ts.append((time.perf_counter() - t0) * 1000.0)
+            if r == 0:
+                outs.append({k: v.numpy() for k, v in pred.items()})
+    return _percentiles(ts), outs
+
+
+def compare_outputs(outs, ref):
+    """
+    loc_row/loc_col 로짓: 최대 절대 오차, grid argmax 일치율 (프레임 평균)
+    """
+    res = {}
+    for key in ("loc_row", "loc_col"):
+        if key not in ref[0] or key not in outs[0]:
+            continue
+        diff = [float(np.abs(o[key] - r[key]).max()) for o, r in zip(outs, ref)]
+        agree = [float(np.mean(o[key].argmax(1) == r[key].argmax(1))) for o, r in zip(outs, ref)]
+        res[key] = {"max_abs": max(diff), "argmax_agree": float(np.mean(agree))}
+    return res
+
+
+def get_args():
+    p = argparse.ArgumentParser(description="PyTorch(CPU) vs TFLite 레인 네트워크 벤치마크 (JSON 출력)")
+    p.add_argument("--config_path", default=DEFAULT_CONFIG, type=str)
+    p.add_argument("--checkpoint", default=None, type=str, help="parsingNet .pth (없으면 무작위 가중치, 지연만 의미)")
+    p.add_argument("--tflite_model", default=DEFAULT_MODELS[0], type=str)
+    p.add_argument("--images", default=DEFAULT_IMAGES, type=str, help="이미지 glob")
+    p.add_argument("--videos", default=DEFAULT_VIDEOS, type=str, help="비디오 glob")
+    p.add_argument("--max_frames", type=int, default=20, help="비디오별 최대 프레임 수")
+    p.add_argument("--threads", default="1,2,4", type=str, help="콤마로 구분한 스레드 수 목록")
+    p.add_argument("--variants", default=",".join(VARIANTS), type=str, help=f"torch 변형 ({', '.join(VARIANTS)})")
+    p.add_argument("--warmup", type=int, default=2)
+    p.add_argument("--repeat", type=int, default=2, help="프레임 반복 횟수")
+    p.add_argument("--out", default=None, type=str, help="결과 JSON 경로(없으면 stdout)")
+    return p.parse_args()
+
+
+def main():
+    args = get_args()
+    threads = [int(t) for t in args.threads.split(",") if t.strip()]
+    variants = [v for v in args.variants.split(",") if v.strip()]
+    unknown = set(variants) - set(VARIANTS)
+    if unknown:
+        raise ValueError(f"알 수 없는 변형: {sorted(unknown)}")
+
+    sources = load_sources(args.images, args.videos, args.max_frames)
+    if not sources:
+        raise RuntimeError("벤치마크 입력이 없습니다. --images / --videos 를 확인하세요.")
+    frames = [f for _, fs in sources for f in fs]
+    cfg = set_anchors(load_config(args.config_path))  # merge_config와 같은 앵커
+    inputs = make_inputs(cfg, frames)
+
+    net = build_model(cfg, checkpoint=args.checkpoint, device="cpu", channels_last=False)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "torch": torch.__version__,
+            "checkpoint": args.checkpoint,
+            "tflite_model": os.path.basename(args.tflite_model),
+            "frames": len(frames),
+        },
+        "runs": [],
+    }
+
+    for t in threads:
+        configure_threads(t)
+        entry = {"threads": t}
+        tflite_outs = None
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                isnet = UFLDv2TFLite(model_path=args.tflite_model, config_path=args.config_path,
+                                     debug=False, num_threads=t)
+            entry["tflite"], tflite_outs = bench_tflite(isnet, inputs, args.warmup, args.repeat)
+        except Exception as e:
+            # 모델 파일이 LFS 포인터인 경우 등: torch만 측정
+            entry["tflite"] = {"error": f"{type(e).__name__}: {e}"}
+
+        fp32_outs = None
+        for name in variants:
+            channels_last, amp = VARIANTS[name]
+            net = prepare_model(net, "cpu", channels_last=channels_last)
+            res, outs = bench_torch(net, inputs, args.warmup, args.repeat, amp)
+            if name == "fp32":
+                fp32_outs = outs
+            if fp32_outs is not None and name != "fp32":
+                res["vs_fp32"] = compare_outputs(outs, fp32_outs)
+            if tflite_outs is not None:
+                res["vs_tflite"] = compare_outputs(outs, tflite_outs)
+            entry[f"torch_{name}"] = res
+            print(f"[BENCH] threads={t} torch_{name}: {res['p50_ms']:.1f} ms", file=sys.stderr)
+        if "p50_ms" in entry["tflite"]:
+            print(f"[BENCH] threads={t} tflite: {entry['tflite']['p50_ms']:.1f} ms", file=sys.stderr)
+        report["runs"].append(entry)
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fp:
+            fp.write(text)
+        print(f"[SAVE] bench -> {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
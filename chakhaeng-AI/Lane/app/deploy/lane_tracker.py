@@ -0,0 +1,243 @@
+# lane_tracker.py
+# 프레임 간 레인 추적: 레인별 2차 다항식 계수를 등속 칼만 필터로 추적
+#  - 독립축은 lane_compact와 같이 레인마다 선택: 세로 레인 x = f(y), 가로로 누운 측면(col 앵커) 레인 y = f(x)
+#  - N 프레임마다(또는 추적 신뢰도가 떨어지면) 네트워크를 돌리고, 그 사이 프레임만 예측값으로 대체
+#    (추론한 프레임은 네트워크 좌표를 그대로 내보내고 판정/순서만 평활화)
+#  - solid/dashed, white/yellow 판정은 최근 판정들의 다수결로 평활화
+import copy
+from collections import Counter, deque
+
+import numpy as np
+
+from deploy.lane_compact import DEGREE, fit_poly, lane_axis  # type: ignore
+
+
+class LaneTrack:
+    """
+    정규화 좌표(x/W, y/H)에서 dep = c0*u^2 + c1*u + c2 의 계수 [c0, c1, c2]와 그 속도를 추적
+      axis=0: u = y, dep = x (세로 레인) / axis=1: u = x, dep = y (측면 레인)
+    """
+
+    def __init__(self, track_id, axis, coeffs, us, meta, history: int,
+                 process_noise: float, measure_noise: float):
+        self.id = track_id
+        self.axis = axis
+        n = coeffs.size
+        self.x = np.zeros((n, 2))                 # 계수별 [값, 프레임당 변화량]
+        self.x[:, 0] = coeffs
+        self.P = np.tile(np.diag([measure_noise, 1e-2]), (n, 1, 1))
+        self.q = process_noise
+        self.r = measure_noise
+        self.us = us                              # 마지막 검출의 독립축 샘플 위치(정규화)
+        self.meta = meta
+        self.labels = deque(maxlen=history)
+        self.colors = deque(maxlen=history)
+        self.since_detect = 0
+        self.misses = 0
+        self.residual = 0.0
+        self._push_labels(meta)
+
+    @property
+    def coeffs(self):
+        return self.x[:, 0]
+
+    def predict(self):
+        # 등속 모델: 값 += 변화량
+        F = np.array([[1.0, 1.0], [0.0, 1.0]])
+        Q = self.q * np.array([[0.25, 0.5], [0.5, 1.0]])
+        self.x = self.x @ F.T
+        self.P = F @ self.P @ F.T + Q
+        self.since_detect += 1
+
+    def update(self, coeffs, us, meta, residual):
+        H = np.array([1.0, 0.0])
+        S = self.P[:, 0, 0] + self.r                      # [n]
+        K = self.P[:, :, 0] / S[:, None]                  # [n, 2]
+        innov = coeffs - self.x[:, 0]
+        self.x = self.x + K * innov[:, None]
+        self.P = self.P - K[:, :, None] * (H @ self.P)[:, None, :]
+        self.us = us
+        self.meta = meta
+        self.residual = residual
+        self.since_detect = 0
+        self.misses = 0
+        self._push_labels(meta)
+
+    def _push_labels(self, meta):
+        self.labels.append(meta.get("label", "ambiguous"))
+        self.colors.append(meta.get("color", "unknown"))
+
+    def smoothed_label(self):
+        # ambiguous 보다 확정 판정을 우선한 다수결
+        votes = Counter(l for l in self.labels if l != "ambiguous")
+        return votes.most_common(1)[0][0] if votes else "ambiguous"
+
+    def smoothed_color(self):
+        votes = Counter(c for c in self.colors if c != "unknown")
+        return votes.most_common(1)[0][0] if votes else "unknown"
+
+    def confidence(self, decay: float, residual_scale: float) -> float:
+        # 검출 이후 경과 프레임과 다항식 적합 오차(px)에 따라 감소
+        return float(np.exp(-self.since_detect / decay) / (1.0 + self.residual / residual_scale))
+
+    def dep_at(self, us):
+        return np.polyval(self.coeffs, us)
+
+
+class LaneTracker:
+    """
+    tracker = LaneTracker(width, height, detect_every=3)
+    if tracker.should_detect():
+        coords, lane_meta = tracker.update(*isnet.infer(frame))
+    else:
+        coords, lane_meta = tracker.predict()
+    반환 형식은 infer()와 같고, lane_meta에 track_id / tracked(예측 여부) / track_confidence가 추가된다.
+    update()는 검출 좌표를 그대로 두고 판정(label/color)만 다수결로, 순서만 왼쪽 → 오른쪽으로 바꾼다.
+    """
+
+    def __init__(self, width: int, height: int, detect_every: int = 3, min_confidence: float = 0.5,
+                 max_misses: int = 2, gate: float = 0.08, history: int = 9,
+                 process_noise: float = 1e-5, measure_noise: float = 1e-4, decay: float = 10.0,
+                 residual_scale: float = 20.0):
+        self.W, self.H = float(width), float(height)
+        self.detect_every = max(1, int(detect_every))
+        self.min_confidence = min_confidence
+        self.max_misses = max_misses
+        self.gate = gate                      # 매칭 허용 거리(정규화 종속축 평균 차이)
+        self.history = history
+        self.process_noise = process_noise
+        self.measure_noise = measure_noise
+        self.decay = decay
+        self.residual_scale = residual_scale  # 적합 오차가 이 값(px)이면 신뢰도 절반
+        self.tracks = []
+        self._next_id = 0
+        self.frames = 0
+        self.detections = 0
+
+    def should_detect(self) -> bool:
+        if not self.tracks:
+            return True
+        since = min(t.since_detect for t in self.tracks)
+        if since + 1 >= self.detect_every:
+            return True
+        return min(t.confidence(self.decay, self.residual_scale) for t in self.tracks) < self.min_confidence
+
+    def _fit(self, lane):
+        pts = np.asarray(lane, dtype=np.float64).reshape(-1, 2)
+        axis = lane_axis(pts)
+        scale = (self.H, self.W) if axis == 0 else (self.W, self.H)   # (독립축, 종속축)
+        us, dep = pts[:, 1 - axis] / scale[0], pts[:, axis] / scale[1]
+        coeffs, residual = fit_poly(us, dep, DEGREE)
+        return axis, coeffs, us, residual * scale[1]
+
+    @staticmethod
+    def _distance(t, axis, coeffs, us):
+        # 같은 독립축 레인끼리만: 검출 샘플 위치에서 두 곡선의 평균 종속축 차이(정규화)
+        if t.axis != axis:
+            return np.inf
+        return float(np.mean(np.abs(t.dep_at(us) - np.polyval(coeffs, us))))
+
+    def _points(self, t):
+        # 트랙 곡선을 마지막 검출의 독립축 위치에서 다시 샘플 → 정수 (x, y), 독립축 오름차순
+        us = np.sort(t.us)
+        dep = t.dep_at(us)
+        if t.axis == 0:
+            xs, ys = np.clip(dep * self.W, 0, self.W - 1), us * self.H
+        else:
+            xs, ys = us * self.W, np.clip(dep * self.H, 0, self.H - 1)
+        return list(zip(xs.astype(np.int64).tolist(), ys.astype(np.int64).tolist()))
+
+    @staticmethod
+    def _order_key(lane):
+        # 왼쪽 → 오른쪽: 가장 아래(이미지 하단 쪽) 점의 x
+        if not len(lane):
+            return np.inf
+        pts = np.asarray(lane, dtype=np.float64).reshape(-1, 2)
+        return float(pts[np.argmax(pts[:, 1]), 0])
+
+    def _meta(self, t, meta, tracked: bool):
+        meta = copy.copy(meta)
+        meta.update({"label": t.smoothed_label(), "color": t.smoothed_color(), "track_id": t.id,
+                     "tracked": tracked, "track_confidence": t.confidence(self.decay, self.residual_scale)})
+        return meta
+
+    @staticmethod
+    def _sorted(out):
+        out.sort(key=lambda r: r[0])
+        return [lane for _, lane, _ in out], [meta for _, _, meta in out]
+
+    def update(self, coords, lane_meta):
+        """
+        네트워크 결과로 트랙 갱신. 반환: 검출 좌표 그대로 + 평활화된 판정, 왼쪽 → 오른쪽 순서
+        """
+        self.frames += 1
+        self.detections += 1
+        for t in self.tracks:
+            t.predict()
+
+        dets = []   # (lane index, axis, coeffs, us, residual)
+        for i, lane in enumerate(coords):
+            if len(lane) >= 2:
+                dets.append((i, *self._fit(lane)))
+
+        # 곡선 거리 기준 greedy 매칭 (레인 수가 적어 충분)
+        pairs = []
+        for ti, t in enumerate(self.tracks):
+            for di, (_, axis, coeffs, us, _) in enumerate(dets):
+                d = self._distance(t, axis, coeffs, us)
+                if d <= self.gate:
+                    pairs.append((d, ti, di))
+        assigned = {}   # lane index -> track
+        used_t, used_d = set(), set()
+        for _, ti, di in sorted(pairs):
+            if ti in used_t or di in used_d:
+                continue
+            used_t.add(ti)
+            used_d.add(di)
+            i, _, coeffs, us, residual = dets[di]
+            self.tracks[ti].update(coeffs, us, lane_meta[i], residual)
+            assigned[i] = self.tracks[ti]
+
+        for ti, t in enumerate(self.tracks):
+            if ti not in used_t:
+                t.misses += 1
+        self.tracks = [t for t in self.tracks if t.misses <= self.max_misses]
+
+        for di, (i, axis, coeffs, us, residual) in enumerate(dets):
+            if di not in used_d:
+                t = LaneTrack(self._next_id, axis, coeffs, us, lane_meta[i], self.history,
+                              self.process_noise, self.measure_noise)
+                t.residual = residual
+                self._next_id += 1
+                self.tracks.append(t)
+                assigned[i] = t
+
+        out = []
+        for i, (lane, meta) in enumerate(zip(coords, lane_meta)):
+            t = assigned.get(i)
+            if t is not None:
+                meta = self._meta(t, meta, tracked=False)
+            else:   # 점이 부족해 추적하지 않는 레인도 그대로 전달
+                meta = {**meta, "track_id": None, "tracked": False, "track_confidence": 0.0}
+            out.append((self._order_key(lane), lane, meta))
+        return self._sorted(out)
+
+    def predict(self):
+        """
+        네트워크 없이 트랙 예측값으로 (coords, lane_meta) 생성
+        """
+        self.frames += 1
+        for t in self.tracks:
+            t.predict()
+        out = []
+        for t in self.tracks:
+            if t.misses > 0:
+                continue
+            lane = self._points(t)
+            out.append((self._order_key(lane), lane, self._meta(t, t.meta, tracked=True)))
+        return self._sorted(out)
+
+    def stats(self) -> dict:
+        return {"frames": self.frames, "detections": self.detections,
+                "skipped": self.frames - self.detections,
+                "detect_ratio": self.detections / self.frames if self.frames else 0.0}
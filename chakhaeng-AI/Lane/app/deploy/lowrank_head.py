@@ -0,0 +1,209 @@
+# lowrank_head.py
+# parsingNet cls head 학습 후 SVD 저랭크 분해 도구 → JSON 리포트 (+ 선택 rank로 ONNX/TFLite export)
+#  - rank별: head 파라미터/MAC, 특이값 에너지, CPU 지연(전체 forward / head 단독 p50),
+#    held-out 목록에서 원래(full-rank) 모델 대비 충실도(존재 판정 일치율, 레인 일치율, 디코드 좌표 오차 px)
+#  - --slice_head와 함께 쓰면 사용 레인만 남긴 head를 분해 (user 레인 외 출력은 계산하지 않음)
+#
+# 예) python deploy/lowrank_head.py --config_path configs/culane_res18.py --checkpoint weights/culane_res18.pth \
+#         --data_root /data/CULane --list list/val.txt --slice_head --ranks 128,256,512 \
+#         --export_rank 256 --tflite dynamic --out lowrank.json
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+import torch
+
+APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(APP_ROOT)
+
+from deploy.export_lane import export, head_stats, prepare_net  # type: ignore
+from deploy.lane_config import load_config  # type: ignore
+from deploy.lane_preprocess import legacy_preprocess  # type: ignore
+from model.lowrank import energy  # type: ignore
+from utils.infer_utils import configure_threads, forward, set_anchors  # type: ignore
+
+
+def load_list(list_path, data_root, max_images):
+    """
+    CULane 형식 목록(줄마다 첫 토큰이 이미지 경로) -> 절대 경로 리스트
+    """
+    paths = []
+    with open(list_path, "r", encoding="utf-8") as fp:
+        for line in fp:
+            tokens = line.split()
+            if not tokens:
+                continue
+            paths.append(os.path.join(data_root, tokens[0].lstrip("/")))
+            if max_images and len(paths) >= max_images:
+                break
+    return paths
+
+
+def load_inputs(cfg, paths):
+    # 배포(TFLite) 경로와 같은 전처리 → [1, 3, H, W], 원본 크기
+    W, H, crop = int(cfg.train_width), int(cfg.train_height), float(cfg.crop_ratio)
+    inputs, sizes = [], []
+    for p in paths:
+        img = cv2.imread(p)
+        if img is None:
+            print(f"[WARN] 이미지를 읽을 수 없습니다: {p}", file=sys.stderr)
+            continue
+        x = legacy_preprocess(img, W, H, crop)
+        inputs.append(torch.from_numpy(np.ascontiguousarray(x.transpose(2, 0, 1)))[None])
+        sizes.append((img.shape[1], img.shape[0]))
+    return inputs, sizes
+
+
+def run(net, inputs):
+    return [forward(net, x) for x in inputs]
+
+
+def _p50_ms(fn, iters, warmup=2):
+    for _ in range(warmup):
+        fn()
+    ts = []
+    for _ in range(iters):
+        t0 = time.perf_counter()
+        fn()
+        ts.append((time.perf_counter() - t0) * 1000.0)
+    return float(np.percentile(ts, 50))
+
+
+def latency(net, inputs, iters):
+    fea = torch.randn(1, net.input_dim)
+    with torch.inference_mode():
+        head = _p50_ms(lambda: net.cls(fea), iters * 5)
+    return {"forward_p50_ms": _p50_ms(lambda: forward(net, inputs[0]), iters), "head_p50_ms": head}
+
+
+def fidelity(outs, refs, sizes, row_anchor, col_anchor):
+    """
+    full-rank 출력(refs) 대비
+      exist_agree : (anchor, lane)별 존재 argmax 일치율
+      lane_agree  : 디코드 후 레인 유무 일치율
+      point_err_px: 양쪽 모두 유효한 점의 원본 해상도 좌표 오차 (mean / p95)
+    """
+    from demo import decode_lanes  # torch 디코더 (학습 스택 import)
+
+    exist, lanes, errs = [], [], []
+    for out, ref, (w, h) in zip(outs, refs, sizes):
+        for key in ("exist_row", "exist_col"):
+            exist.append(float((out[key].argmax(1) == ref[key].argmax(1)).float().mean()))
+        co, pm, lm = decode_lanes(out, row_anchor, col_anchor, original_image_width=w, original_image_height=h)
+        rco, rpm, rlm = decode_lanes(ref, row_anchor, col_anchor, original_image_width=w, original_image_height=h)
+        lanes.append(float((lm == rlm).float().mean()))
+        both = pm & rpm
+        if both.any():
+            errs.append((co[both] - rco[both]).norm(dim=-1).numpy())
+    errs = np.concatenate(errs) if errs else np.zeros(0)
+    return {
+        "exist_agree": float(np.mean(exist)),
+        "lane_agree": float(np.mean(lanes)),
+        "point_err_px": {"mean": float(errs.mean()) if errs.size else None,
+                         "p95": float(np.percentile(errs, 95)) if errs.size else None,
+                         "points": int(errs.size)},
+    }
+
+
+def _ranks(text):
+    # 콤마로 구분한 양의 정수 rank 목록 (0/음수는 분해를 건너뛰므로 거부)
+    try:
+        ranks = [int(r) for r in text.split(",") if r.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"정수 rank 목록이 아닙니다: {text!r}")
+    if not ranks or min(ranks) <= 0:
+        raise argparse.ArgumentTypeError(f"rank는 1 이상이어야 합니다: {text!r}")
+    return ranks
+
+
+def _non_negative(text):
+    v = int(text)
+    if v < 0:
+        raise argparse.ArgumentTypeError(f"0 이상이어야 합니다: {text!r}")
+    return v
+
+
+def get_args():
+    p = argparse.ArgumentParser(description="parsingNet cls head SVD 저랭크 분해: 정확도/지연 리포트 + export")
+    p.add_argument("--config_path", required=True, type=str)
+    p.add_argument("--checkpoint", required=True, type=str, help="parsingNet .pth")
+    p.add_argument("--data_root", default="", type=str)
+    p.add_argument("--list", required=True, type=str, help="held-out 이미지 목록(CULane list 형식)")
+    p.add_argument("--max_images", type=int, default=200)
+    p.add_argument("--ranks", default="64,128,256,512", type=_ranks, help="마지막 Linear(2048 -> out) rank 목록(1 이상)")
+    p.add_argument("--fc1_rank", type=_non_negative, default=0, help="첫 Linear(input_dim -> 2048) rank (0: 분해 안 함)")
+    p.add_argument("--slice_head", action="store_true", help="사용 레인만 남긴 뒤 분해 (export_lane과 동일)")
+    p.add_argument("--threads", type=int, default=None, help="CPU intra-op 스레드 수")
+    p.add_argument("--iters", type=int, default=10, help="지연 측정 반복 횟수")
+    p.add_argument("--export_rank", type=_non_negative, default=0, help="이 rank로 분해한 모델을 export (0: 안 함)")
+    p.add_argument("--out_dir", default="export", type=str)
+    p.add_argument("--name", default=None, type=str)
+    p.add_argument("--tflite", choices=["none", "dynamic", "fp16", "float32"], default="none")
+    p.add_argument("--opset", type=int, default=13)
+    p.add_argument("--verify_tol", type=float, default=None, help="TFLite 검증 허용치 (export_lane과 동일)")
+    p.add_argument("--out", default=None, type=str, help="결과 JSON 경로(없으면 stdout)")
+    return p.parse_args()
+
+
+def main():
+    args = get_args()
+    configure_threads(args.threads)
+    ranks = args.ranks
+
+    cfg, net, report = prepare_net(args)
+    anchors = set_anchors(load_config(args.config_path))  # merge_config와 같은 앵커
+    row_anchor, col_anchor = anchors.row_anchor, anchors.col_anchor
+
+    inputs, sizes = load_inputs(cfg, load_list(args.list, args.data_root, args.max_images))
+    if not inputs:
+        raise RuntimeError("held-out 입력이 없습니다. --data_root / --list 를 확인하세요.")
+    report["images"] = len(inputs)
+
+    refs = run(net, inputs)
+    report["base"] = {"head": head_stats(net), **latency(net, inputs, args.iters)}
+    print(f"[LOWRANK] base: head {report['base']['head']['params'] / 1e6:.1f}M params, "
+          f"forward {report['base']['forward_p50_ms']:.1f} ms", file=sys.stderr)
+
+    original = list(net.cls)
+    svd_cache = {}
+    t0 = time.perf_counter()
+    report["runs"] = []
+    for rank in ranks:
+        net.factorize_head(rank, args.fc1_rank, svd_cache=svd_cache)
+        entry = {"rank": rank, "fc1_rank": args.fc1_rank or None, "head": head_stats(net)}
+        S_last = svd_cache[len(original) - 1][1]
+        entry["energy"] = energy(S_last, rank)
+        if args.fc1_rank and len(original) - 3 in svd_cache:
+            entry["fc1_energy"] = energy(svd_cache[len(original) - 3][1], args.fc1_rank)
+        entry.update(latency(net, inputs, args.iters))
+        entry.update(fidelity(run(net, inputs), refs, sizes, row_anchor, col_anchor))
+        report["runs"].append(entry)
+        print(f"[LOWRANK] rank={rank}: head {entry['head']['params'] / 1e6:.1f}M params, "
+              f"forward {entry['forward_p50_ms']:.1f} ms, lane_agree {entry['lane_agree']:.3f}, "
+              f"point_err {entry['point_err_px']['mean']}", file=sys.stderr)
+        for i, m in enumerate(original):  # 다음 rank는 원래 가중치에서 다시 분해
+            net.cls[i] = m
+    report["svd_s"] = time.perf_counter() - t0
+
+    if args.export_rank:
+        net.factorize_head(args.export_rank, args.fc1_rank, svd_cache=svd_cache)
+        base = os.path.splitext(os.path.basename(args.config_path))[0]
+        args.name = args.name or f"{base}{'_sliced' if args.slice_head else ''}_r{args.export_rank}"
+        report["export"] = export(net, cfg, args, {"rank": args.export_rank, "fc1_rank": args.fc1_rank or None,
+                                                   "head": head_stats(net)})
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fp:
+            fp.write(text)
+        print(f"[SAVE] lowrank -> {args.out}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
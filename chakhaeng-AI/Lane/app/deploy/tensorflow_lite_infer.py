@@ -4,18 +4,21 @@ import sys
 import cv2
 import numpy as np
 import argparse
-import time
 
-# tflite-runtime 우선, 없으면 tensorflow 사용
-try:
-    from tflite_runtime.interpreter import Interpreter
-except Exception:
-    import tensorflow as tf
-    Interpreter = tf.lite.Interpreter  # type: ignore
-
-# 프로젝트 루트 기준 utils.config 사용
+# 프로젝트 루트 기준 deploy / utils 사용
 sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
-from utils.config import Config  # type: ignore
+from deploy.lane_config import DEFAULT_CACHE as DEFAULT_CONFIG_CACHE, load_config  # type: ignore
+from deploy.lane_decode import COL_LANE_IDX, ROW_LANE_IDX, LaneDecoder, SourceGeometry, softmax_np  # type: ignore
+from deploy.lane_preprocess import FusedPreprocessor  # type: ignore
+from deploy.video_pipeline import run_three_stage, print_stage_report  # type: ignore
+from deploy.lane_records import LaneRecordWriter  # type: ignore
+from deploy.lane_profiler import NullProfiler, StageProfiler, timed  # type: ignore
+from deploy.lane_async import AsyncLaneRunner  # type: ignore
+from deploy.lane_autotune import DEFAULT_CACHE, XnnpackToggleUnsupported, autotune  # type: ignore
+from deploy.lane_tracker import LaneTracker  # type: ignore
+from deploy.lane_motion import MotionGate  # type: ignore
+from deploy.lane_compact import compact_lanes  # type: ignore
+from deploy.lane_color_lut import ColorLUT  # type: ignore
 
 IMG_EXTS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
 VID_EXTS = {".mp4", ".avi", ".mov", ".mkv", ".webm", ".m4v"}
@@ -26,19 +29,81 @@ def is_image_file(path: str) -> bool:
 def is_video_file(path: str) -> bool:
     return os.path.splitext(path)[1].lower() in VID_EXTS
 
-def softmax_np(x, axis=None):
-    x = x - np.max(x, axis=axis, keepdims=True)
-    e = np.exp(x)
-    return e / np.sum(e, axis=axis, keepdims=True)
+_Interpreter = None
+
+
+def get_interpreter_class():
+    """
+    경량 런타임(tflite-runtime → ai-edge-litert) 우선, 둘 다 없을 때만 tensorflow를 import
+    (전체 TF import가 짧은 작업의 시작 시간 대부분을 차지하므로 처음 필요할 때 한 번만)
+    """
+    global _Interpreter
+    if _Interpreter is None:
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            try:
+                from ai_edge_litert.interpreter import Interpreter  # type: ignore
+            except ImportError:
+                import tensorflow as tf
+                Interpreter = tf.lite.Interpreter  # type: ignore
+        _Interpreter = Interpreter
+    return _Interpreter
+
+def make_interpreter(model_path: str, num_threads: int = 4, use_xnnpack: bool = True):
+    """
+    use_xnnpack=False면 기본 delegate(XNNPACK) 없이 builtin 커널만 사용
+    (런타임이 OpResolverType을 지원하지 않으면 XnnpackToggleUnsupported — XNNPACK이 켜진 채로 만들지 않음)
+    """
+    Interpreter = get_interpreter_class()
+    if use_xnnpack:
+        return Interpreter(model_path=model_path, num_threads=num_threads)
+    resolver = getattr(sys.modules[Interpreter.__module__], "OpResolverType", None)
+    if resolver is None:
+        raise XnnpackToggleUnsupported("이 런타임은 OpResolverType을 지원하지 않아 XNNPACK을 끌 수 없습니다.")
+    return Interpreter(model_path=model_path, num_threads=num_threads,
+                       experimental_op_resolver_type=resolver.BUILTIN_WITHOUT_DEFAULT_DELEGATES)
+
+def map_output_indices(output_details, num_cell_row, num_row, num_cell_col, num_col, num_lanes, debug=False):
+    """
+    출력 shape [N, grid, cls, lanes]로 loc_row / loc_col / exist_row / exist_col 텐서 인덱스를 찾음
+    (export_lane의 변환 검증도 같은 규칙 사용)
+    """
+    index = {}
+    # 레인 축: 전체(num_lanes) 또는 slice_head()로 사용 레인(row 2개 / col 2개)만 남긴 모델
+    lanes = {num_lanes, len(ROW_LANE_IDX), len(COL_LANE_IDX)}
+    for od in output_details:
+        name = od["name"]
+        s = tuple(int(v) for v in od["shape"])[1:]  # 배치 차원 제외
+        if s[:2] == (num_cell_row, num_row) and s[2:] and s[2] in lanes:
+            index["loc_row"] = od["index"]
+        elif s[:2] == (num_cell_col, num_col) and s[2:] and s[2] in lanes:
+            index["loc_col"] = od["index"]
+        elif s[:2] == (2, num_row) and s[2:] and s[2] in lanes:
+            index["exist_row"] = od["index"]
+        elif s[:2] == (2, num_col) and s[2:] and s[2] in lanes:
+            index["exist_col"] = od["index"]
+        else:
+            if debug:
+                print(f"[WARN] 매핑 불가 출력: {name} shape={s}")
+
+    need = {"loc_row", "loc_col", "exist_row", "exist_col"}
+    missing = need - set(index.keys())
+    if missing:
+        raise RuntimeError(f"필수 출력 누락: {missing}. 모델 출력 shape를 확인하세요.")
+    return index
 
 class UFLDv2TFLite:
-    def __init__(self, model_path: str, config_path: str, ori_size=None, debug=True, num_threads=4):
-        self.interpreter = Interpreter(model_path=model_path, num_threads=num_threads)
+    def __init__(self, model_path: str, config_path: str, ori_size=None, debug=True, num_threads=4,
+                 color_mask_roi=False, zero_copy=False, fused_preprocess=False, profiler=None,
+                 use_xnnpack=True, motion_gate=0.0, motion_max_reuse=15, color_lut_bits=0,
+                 snap_points=False, config_cache=DEFAULT_CONFIG_CACHE):
+        self.interpreter = make_interpreter(model_path, num_threads, use_xnnpack)
         self.interpreter.allocate_tensors()
         self.input_details = self.interpreter.get_input_details()
         self.output_details = self.interpreter.get_output_details()
 
-        cfg = Config.fromfile(config_path)
+        cfg = load_config(config_path, cache_path=config_cache)
         self.input_width = int(cfg.train_width)      # 1600
         self.input_height = int(cfg.train_height)    # 320
         self.num_row = int(cfg.num_row)              # 72
@@ -49,16 +114,60 @@ class UFLDv2TFLite:
         self.num_cell_row = int(getattr(cfg, "num_cell_row", 200))
         self.num_cell_col = int(getattr(cfg, "num_cell_col", 100))
 
-        # 원본 높이 기준 앵커
-        self.row_anchor = np.linspace(1.0 - self.crop_ratio, 1.0, self.num_row, dtype=np.float32)  # 0.4~1.0
-        self.col_anchor = np.linspace(0.0, 1.0, self.num_col, dtype=np.float32)                    # 0.0~1.0
+        # 후처리(앵커, 해상도별 앵커 LUT 등)는 인터프리터와 무관한 디코더가 담당
+        self.decoder = LaneDecoder.from_config(cfg)
 
+        # ori_size를 지정하면 모든 프레임을 그 크기로 복원, 아니면 프레임마다 실제 크기 사용
+        # (ori_img_w/h는 마지막으로 처리한 프레임의 크기)
+        self.ori_size = tuple(ori_size) if ori_size is not None else None
         if ori_size is not None:
             self.ori_img_w, self.ori_img_h = ori_size
         else:
             self.ori_img_w, self.ori_img_h = None, None
 
+        # True면 색상 마스크를 레인 스트립 합집합 bbox 안에서만 계산
+        self.color_mask_roi = color_mask_roi
+
+        # True면 분류 전에 레인 포인트를 주변 흰/노란색 마스크 점수 최대 지점으로 스냅 (적분 영상 기반)
+        self.snap_points = snap_points
+
+        # 색상 마스크를 HSV/LAB 변환 대신 양자화 BGR 3D LUT gather로 계산 (0이면 기존 경로)
+        self.color_lut = ColorLUT.build(self._lane_color_classes, color_lut_bits) if color_lut_bits else None
+
         self.debug = debug
+
+        # 스테이지별 지연시간 계측 (None이면 비용 없는 NullProfiler)
+        self.profiler = profiler if profiler is not None else NullProfiler()
+
+        # 크롭 먼저 리사이즈 + LUT 정규화 전처리 (None이면 기존 전처리)
+        self.fused = FusedPreprocessor(self.input_width, self.input_height, self.crop_ratio) if fused_preprocess else None
+
+        # 모션 게이트: 크롭 ROI 변화 픽셀 비율이 motion_gate 이하면 직전 결과 재사용 (0이면 끔)
+        self.motion_gate = (MotionGate(1.0 - self.crop_ratio, threshold=motion_gate, max_reuse=motion_max_reuse)
+                            if motion_gate > 0 else None)
+
+        # 출력 인덱스(shape 매핑)는 한 번만 계산해서 재사용
+        self._output_index = None
+
+        # 기존 전처리용 리사이즈/RGB 버퍼와 입력 shape별 float 입력 버퍼 (소스 해상도와 무관하게 크기 고정)
+        if self.fused is None:
+            h_full = int(self.input_height / self.crop_ratio)
+            self._resize_buf = np.empty((h_full, self.input_width, 3), dtype=np.uint8)
+            self._rgb_buf = np.empty((self.input_height, self.input_width, 3), dtype=np.uint8)
+        self._input_bufs = {}
+
+        # zero-copy: 전처리 결과를 입력 버퍼에 직접 쓰고, 출력은 interpreter.tensor() 뷰로 읽음
+        self.zero_copy = bool(zero_copy) and self.input_details[0]["dtype"] == np.float32
+        if zero_copy and not self.zero_copy:
+            print("[WARN] float32 입력 모델이 아니라 zero-copy 모드를 끕니다:", self.input_details[0]["dtype"])
+        if self.zero_copy:
+            in_shape = (1, self.input_height, self.input_width, 3)
+            if tuple(self.input_details[0]["shape"]) != in_shape:
+                self.resize_input(in_shape)
+            self._input_tensor = self.interpreter.tensor(self.input_details[0]["index"])
+            self._output_index = self._map_output_indices()
+            self._output_tensors = {k: self.interpreter.tensor(i) for k, i in self._output_index.items()}
+
         if self.debug:
             print("[TFLite] Input:", self.input_details[0]["shape"], self.input_details[0]["dtype"])
             for od in self.output_details:
@@ -66,9 +175,9 @@ class UFLDv2TFLite:
 
     # === [ADD] Lane-type & color classification utils =========================
     @staticmethod
-    def _lane_color_masks(img_bgr: np.ndarray):
+    def _lane_color_classes(img_bgr: np.ndarray):
         """
-        흰색/노란색 마스크 동시 반환 (0/255)
+        픽셀 단위 흰색/노란색 판정 (0/255, 모폴로지 전). ColorLUT도 이 임계식으로 만든다
         """
         hsv = cv2.cvtColor(img_bgr, cv2.COLOR_BGR2HSV)
         h, s, v = cv2.split(hsv)
@@ -84,85 +193,189 @@ class UFLDv2TFLite:
         y1 = (h >= 8) & (h <= 65) & (s >= 25) & (v >= 110)
         y2 = (L > 150) & (B > 135) & (A > 110) & (A < 150)
         yellow_mask = ((y1 | y2).astype(np.uint8)) * 255
+        return white_mask, yellow_mask
+
+    @staticmethod
+    def _close_yellow(yellow_mask: np.ndarray):
         k = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
-        yellow_mask = cv2.morphologyEx(yellow_mask, cv2.MORPH_CLOSE, k, iterations=1)
+        return cv2.morphologyEx(yellow_mask, cv2.MORPH_CLOSE, k, iterations=1)
+
+    @staticmethod
+    def _lane_color_masks(img_bgr: np.ndarray):
+        """
+        흰색/노란색 마스크 동시 반환 (0/255)
+        """
+        white_mask, yellow_mask = UFLDv2TFLite._lane_color_classes(img_bgr)
+        return white_mask, UFLDv2TFLite._close_yellow(yellow_mask)
+
+    def _color_masks(self, img_bgr: np.ndarray):
+        """
+        color_lut가 있으면 LUT gather, 없으면 HSV/LAB 경로로 흰색/노란색 마스크 계산
+        """
+        if self.color_lut is None:
+            return self._lane_color_masks(img_bgr)
+        white_mask, yellow_mask = self.color_lut(img_bgr)
+        return white_mask, self._close_yellow(yellow_mask)
+
+    def _lane_color_masks_roi(self, img_bgr: np.ndarray, lanes, pad: int):
+        """
+        레인 스트립 합집합 bbox(+pad) 안에서만 흰색/노란색 마스크 계산, bbox 밖은 0
+        """
+        H, W = img_bgr.shape[:2]
+        white_mask = np.zeros((H, W), dtype=np.uint8)
+        yellow_mask = np.zeros((H, W), dtype=np.uint8)
+        pts = [np.asarray(lane, dtype=np.int64).reshape(-1, 2) for lane in lanes if len(lane) > 0]
+        if not pts:
+            return white_mask, yellow_mask
+        pts = np.concatenate(pts, axis=0)
+        x0 = max(0, int(pts[:, 0].min()) - pad)
+        x1 = min(W, int(pts[:, 0].max()) + pad + 1)
+        y0 = max(0, int(pts[:, 1].min()) - pad)
+        y1 = min(H, int(pts[:, 1].max()) + pad + 1)
+        if x0 >= x1 or y0 >= y1:
+            return white_mask, yellow_mask
+
+        w_roi, y_roi = self._color_masks(img_bgr[y0:y1, x0:x1])
+        white_mask[y0:y1, x0:x1] = w_roi
+        yellow_mask[y0:y1, x0:x1] = y_roi
         return white_mask, yellow_mask
 
     @staticmethod
-    def _sample_along_curve(points, step: float = 3.0):
-        if len(points) < 2:
-            return [tuple(map(float, p)) for p in points]
-        pts = np.array(points, dtype=np.float32)
+    def _sample_along_curve(points, step: float = 3.0) -> np.ndarray:
+        """
+        폴리라인을 호 길이 기준 등간격으로 재샘플링. 반환: [N, 2] float64
+        """
+        pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        if len(pts) < 2:
+            return pts.astype(np.float64)
         seg_lens = np.linalg.norm(pts[1:] - pts[:-1], axis=1)
         total = float(seg_lens.sum())
         if total < 1e-6:
-            return [tuple(map(float, p)) for p in points]
+            return pts.astype(np.float64)
         n_samples = int(max(2, total // step))
         s_targets = np.linspace(0, total, n_samples)
 
-        out = []
-        acc = 0.0
-        j = 0
-        for s in s_targets:
-            while j < len(seg_lens) - 1 and acc + seg_lens[j] < s:
-                acc += seg_lens[j]
-                j += 1
-            if j >= len(seg_lens):
-                out.append(tuple(pts[-1]))
-                continue
-            t = (s - acc) / max(1e-6, seg_lens[j])
-            p = pts[j] * (1 - t) + pts[j + 1] * t
-            out.append((float(p[0]), float(p[1])))
-        return out
+        # 누적 호 길이에서 각 샘플이 속한 세그먼트 탐색(마지막 세그먼트에서 클램프)
+        cum = np.cumsum(seg_lens)
+        j = np.minimum(np.searchsorted(cum, s_targets, side="left"), len(seg_lens) - 1)
+        acc = np.concatenate(([0.0], cum[:-1]))[j].astype(np.float64)
+        t = (s_targets - acc) / np.maximum(seg_lens[j].astype(np.float64), 1e-6)
+        t = t[:, None]
+        return pts[j].astype(np.float64) * (1 - t) + pts[j + 1].astype(np.float64) * t
 
     @staticmethod
-    def _normal_direction(points, idx: int) -> np.ndarray:
-        n = len(points)
+    def _normal_directions(points) -> np.ndarray:
+        """
+        각 샘플의 단위 법선(중앙 차분 접선 기준). 반환: [N, 2] float32
+        """
+        pts = np.asarray(points, dtype=np.float32).reshape(-1, 2)
+        n = len(pts)
         if n == 0:
-            return np.array([1.0, 0.0], dtype=np.float32)
+            return np.empty((0, 2), dtype=np.float32)
         if n == 1:
-            return np.array([0.0, 1.0], dtype=np.float32)
-
-        idx = max(0, min(idx, n - 1))
-        i0 = max(0, idx - 1)
-        i1 = min(n - 1, idx + 1)
-
-        p0 = np.array(points[i0], dtype=np.float32)
-        p1 = np.array(points[i1], dtype=np.float32)
-
-        t = p1 - p0
-        norm = np.linalg.norm(t)
-        if norm < 1e-6:
-            if i1 + 1 < n:
-                t = np.array(points[i1 + 1], dtype=np.float32) - p1
-            elif i0 - 1 >= 0:
-                t = p0 - np.array(points[i0 - 1], dtype=np.float32)
-            else:
-                t = np.array([1.0, 0.0], dtype=np.float32)
-            norm = np.linalg.norm(t)
-            if norm < 1e-6:
-                t = np.array([1.0, 0.0], dtype=np.float32)
-                norm = 1.0
+            return np.array([[0.0, 1.0]], dtype=np.float32)
+
+        idx = np.arange(n)
+        i0 = np.maximum(idx - 1, 0)
+        i1 = np.minimum(idx + 1, n - 1)
+        t = pts[i1] - pts[i0]
+        norm = np.sqrt(np.sum(t * t, axis=1))
+
+        # 중복점으로 접선이 0이면 앞쪽/뒤쪽 세그먼트로 대체, 그래도 0이면 x축
+        degenerate = norm < 1e-6
+        if degenerate.any():
+            fwd = pts[np.minimum(i1 + 1, n - 1)] - pts[i1]
+            bwd = pts[i0] - pts[np.maximum(i0 - 1, 0)]
+            x_axis = np.array([1.0, 0.0], dtype=np.float32)
+            alt = np.where((i1 + 1 < n)[:, None], fwd, np.where((i0 - 1 >= 0)[:, None], bwd, x_axis))
+            t = np.where(degenerate[:, None], alt, t)
+            norm = np.where(degenerate, np.sqrt(np.sum(t * t, axis=1)), norm)
+            still = norm < 1e-6
+            t[still] = x_axis
+            norm[still] = 1.0
+
+        t = t / norm[:, None]
+        return np.stack([-t[:, 1], t[:, 0]], axis=1)  # 법선
 
-        t = t / norm
-        nvec = np.array([-t[1], t[0]], dtype=np.float32)  # 법선
-        return nvec
+    @staticmethod
+    def _probe_normal_strip(mask: np.ndarray, samples: np.ndarray, normals: np.ndarray, half_width: int) -> np.ndarray:
+        """
+        각 샘플에서 법선 방향 ±half_width 픽셀을 한 번에 gather, 하나라도 켜져 있으면 1. 반환: [N] uint8
+        """
+        H, W = mask.shape[:2]
+        d = np.arange(-half_width, half_width + 1, dtype=np.float32)
+        base = samples.astype(np.float32)
+        sx = np.rint(base[:, 0:1] + normals[:, 0:1] * d).astype(np.int64)  # [N, 2*half_width+1]
+        sy = np.rint(base[:, 1:2] + normals[:, 1:2] * d).astype(np.int64)
+        inside = (sx >= 0) & (sx < W) & (sy >= 0) & (sy < H)
+        hit = mask[np.clip(sy, 0, H - 1), np.clip(sx, 0, W - 1)] > 0
+        return np.any(hit & inside, axis=1).astype(np.uint8)
 
     @staticmethod
     def _runlength_gaps(signal: np.ndarray, min_gap: int = 6):
-        gaps = []
-        cur = 0
-        for v in signal:
-            if v == 0:
-                cur += 1
-            else:
-                if cur >= min_gap:
-                    gaps.append(cur)
-                cur = 0
-        if cur >= min_gap:
-            gaps.append(cur)
-        return gaps
+        """
+        0 연속 구간 중 길이 min_gap 이상인 것들의 길이 리스트
+        """
+        zero = (np.asarray(signal) == 0).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], zero, [0])))
+        lengths = np.flatnonzero(edges == -1) - np.flatnonzero(edges == 1)
+        return lengths[lengths >= min_gap].tolist()
+
+    # === [ADD] 스냅 보정 유틸 (적분 영상) =======================================
+    @staticmethod
+    def _mask_integral(mask: np.ndarray) -> np.ndarray:
+        """
+        마스크 비0 픽셀 개수의 적분 영상 [H+1, W+1] int32 (박스 개수를 O(1)로 계산)
+        """
+        return cv2.integral((mask > 0).view(np.uint8), sdepth=cv2.CV_32S)
+
+    @staticmethod
+    def _box_counts(integral: np.ndarray, xs: np.ndarray, ys: np.ndarray, r: int) -> np.ndarray:
+        """
+        (xs, ys) 중심 (2r+1)x(2r+1) 박스(이미지 밖은 잘라냄) 안의 비0 픽셀 수. xs, ys: 같은 shape의 int 배열
+        """
+        H, W = integral.shape[0] - 1, integral.shape[1] - 1
+        x0, x1 = np.clip(xs - r, 0, W), np.clip(xs + r + 1, 0, W)
+        y0, y1 = np.clip(ys - r, 0, H), np.clip(ys + r + 1, 0, H)
+        return integral[y1, x1] - integral[y0, x1] - integral[y1, x0] + integral[y0, x0]
 
+    def _snap_points_to_color(self, points, integrals, r: int = 5, prefer_yellow_when_close: bool = True):
+        """
+        각 포인트를 ±r 격자 9개 후보 중 흰/노란색 마스크 점수 최대 지점으로 스냅
+        integrals: (white, yellow) _mask_integral 결과. 후보 점수는 전 포인트 × 9개를 한 번에 계산하고,
+        후보 순서대로의 갱신 규칙(노란색 점수 우선)은 기존 포인트별 루프와 같다.
+        반환: (snapped [(x, y), ...], base_color)
+        """
+        if not points:
+            return points, "unknown"
+        int_w, int_y = integrals
+        pts = np.asarray(points, dtype=np.int64).reshape(-1, 2)
+        x, y = pts[:, 0], pts[:, 1]
+
+        best_x, best_y_pos = x.copy(), y.copy()
+        best_w = self._box_counts(int_w, x, y, r)
+        best_y = self._box_counts(int_y, x, y, r)
+
+        offs = np.array([(dx, dy) for dx in (-r, 0, r) for dy in (-r, 0, r)], dtype=np.int64)  # [9, 2]
+        tx = x[:, None] + offs[None, :, 0]  # [N, 9]
+        ty = y[:, None] + offs[None, :, 1]
+        w_scores = self._box_counts(int_w, tx, ty, r // 2)
+        y_scores = self._box_counts(int_y, tx, ty, r // 2)
+
+        for j in range(len(offs)):
+            take = (y_scores[:, j] > best_y) | (w_scores[:, j] > best_w)
+            best_x = np.where(take, tx[:, j], best_x)
+            best_y_pos = np.where(take, ty[:, j], best_y_pos)
+            best_w = np.where(take, w_scores[:, j], best_w)
+            best_y = np.where(take, y_scores[:, j], best_y)
+
+        yellow_win = int(np.count_nonzero(best_y > best_w))
+        white_win = int(np.count_nonzero(best_w > best_y))
+        base_color = ("yellow" if (yellow_win > white_win and prefer_yellow_when_close)
+                      else ("white" if white_win > 0 else "unknown"))
+        return list(zip(best_x.tolist(), best_y_pos.tolist())), base_color
+
+    @timed("classify_lane")
     def classify_lane(self,
                       img_bgr: np.ndarray,
                       lane_points,
@@ -170,16 +383,18 @@ class UFLDv2TFLite:
                       sample_step: float = 3.0,
                       cov_solid_default: float = 0.65,
                       cov_dashed_default: float = 0.45,
-                      min_gap_pix: int = 6):
+                      min_gap_pix: int = 6,
+                      color_masks=None):
         """
         레인별 색상(white/yellow) 및 유형(solid/dashed/ambiguous) 판정
+        color_masks: 프레임 단위로 미리 계산한 (white_mask, yellow_mask). None이면 여기서 계산
         """
         H, W = img_bgr.shape[:2]
         if len(lane_points) < 2:
             return {"label": "ambiguous", "color": "unknown",
                     "coverage": 0.0, "coverage_white": 0.0, "coverage_yellow": 0.0,
                     "fill_ratio": 0.0, "long_gap_count": 0,
-                    "gaps": [], "signal": []}
+                    "gaps": [], "signal": np.zeros(0, dtype=np.uint8)}
 
         # 1) 스트립 마스크(그리기용)
         lane_mask = np.zeros((H, W), dtype=np.uint8)
@@ -195,10 +410,12 @@ class UFLDv2TFLite:
             return {"label": "ambiguous", "color": "unknown",
                     "coverage": 0.0, "coverage_white": 0.0, "coverage_yellow": 0.0,
                     "fill_ratio": 0.0, "long_gap_count": 0,
-                    "gaps": [], "signal": []}
+                    "gaps": [], "signal": np.zeros(0, dtype=np.uint8)}
 
         # 3) 색상별 마스크
-        white_mask, yellow_mask = self._lane_color_masks(img_bgr)
+        if color_masks is None:
+            color_masks = self._color_masks(img_bgr)
+        white_mask, yellow_mask = color_masks
 
         white_in_lane = int(np.count_nonzero(cv2.bitwise_and(white_mask, white_mask, mask=eval_mask)))
         yellow_in_lane = int(np.count_nonzero(cv2.bitwise_and(yellow_mask, yellow_mask, mask=eval_mask)))
@@ -218,18 +435,8 @@ class UFLDv2TFLite:
 
         # 5) 곡선을 따라 1D 존재 신호 생성(지배 색 기준)
         samples = self._sample_along_curve(lane_points, step=sample_step)
-        signal = []
-        for i, (x, y) in enumerate(samples):
-            nvec = self._normal_direction(samples, i)
-            has_color = 0
-            for d in range(-strip_half_width, strip_half_width + 1):
-                sx = int(round(x + nvec[0] * d))
-                sy = int(round(y + nvec[1] * d))
-                if 0 <= sx < W and 0 <= sy < H and base_mask[sy, sx] > 0:
-                    has_color = 1
-                    break
-            signal.append(has_color)
-        signal = np.array(signal, dtype=np.uint8)
+        normals = self._normal_directions(samples)
+        signal = self._probe_normal_strip(base_mask, samples, normals, strip_half_width)
 
         fill_ratio = float(signal.mean())
         gaps = self._runlength_gaps(signal, min_gap=min_gap_pix)
@@ -264,228 +471,294 @@ class UFLDv2TFLite:
             "fill_ratio": fill_ratio,
             "long_gap_count": long_gap_cnt,
             "gaps": gaps,
-            "signal": signal.tolist()
+            "signal": signal
         }
     # === [ADD] =================================================================
 
-    # 출력 텐서를 shape로 자동 매핑
-    def _collect_outputs(self):
-        outs = {}
-        for od in self.output_details:
-            name = od["name"]
-            val = self.interpreter.get_tensor(od["index"])
-            s = tuple(val.shape)
-            if s == (1, self.num_cell_row, self.num_row, self.num_lanes):
-                outs["loc_row"] = val
-            elif s == (1, self.num_cell_col, self.num_col, self.num_lanes):
-                outs["loc_col"] = val
-            elif s == (1, 2, self.num_row, self.num_lanes):
-                outs["exist_row"] = val
-            elif s == (1, 2, self.num_col, self.num_lanes):
-                outs["exist_col"] = val
-            else:
-                if self.debug:
-                    print(f"[WARN] 매핑 불가 출력: {name} shape={s}")
-
-        need = {"loc_row", "loc_col", "exist_row", "exist_col"}
-        missing = need - set(outs.keys())
-        if missing:
-            raise RuntimeError(f"필수 출력 누락: {missing}. 모델 출력 shape를 확인하세요.")
-        return outs
-
-    def pred2coords(
-        self,
-        pred: dict,
-        ori_w: int,
-        ori_h: int,
-        *,
-        tau_row: float = 0.90,
-        tau_col: float = 0.90,
-        min_pts_row: int = 10,
-        min_pts_col: int = 10,
-        local_width: int = 2,
-        row_lane_idx: tuple = (1, 2),
-        col_lane_idx: tuple = (0, 3),
-        sort_left_to_right: bool = True,
-    ):
+    # 출력 텐서를 shape로 자동 매핑 (이름 -> 텐서 인덱스)
+    def _map_output_indices(self):
+        return map_output_indices(self.output_details, self.num_cell_row, self.num_row,
+                                  self.num_cell_col, self.num_col, self.num_lanes, debug=self.debug)
+
+    @timed("collect_outputs")
+    def collect_outputs(self):
+        if self.zero_copy:
+            # 내부 버퍼 뷰: 다음 invoke() 전에 참조를 놓아야 함
+            return {k: fn() for k, fn in self._output_tensors.items()}
+        if self._output_index is None:
+            self._output_index = self._map_output_indices()
+        return {k: self.interpreter.get_tensor(i) for k, i in self._output_index.items()}
+
+    def _source_size(self, img_bgr):
         """
-        UFLD 계열 출력으로부터 (x,y) 좌표 시퀀스 리스트 생성
+        좌표 복원 기준 (W, H): ori_size 지정 시 그 값, 아니면 프레임 실제 크기
+        """
+        if self.ori_size is not None:
+            return self.ori_size
+        h, w = img_bgr.shape[:2]
+        return w, h
+
+    def _geometry(self, width: int, height: int) -> SourceGeometry:
+        return self.decoder.geometry(width, height)
+
+    def _input_buffer(self, shape):
+        # set_tensor가 복사하므로 같은 shape의 입력 버퍼를 프레임 간 재사용
+        buf = self._input_bufs.get(shape)
+        if buf is None:
+            buf = self._input_bufs[shape] = np.empty(shape, dtype=np.float32)
+        return buf
+
+    def resize_input(self, shape):
+        """
+        인터프리터 입력(동적 리사이즈 대응): 입력 shape 변경 + 재할당. 반환: 성공 여부
         """
-        loc_row = pred["loc_row"]      # [1, 200, 72, 4]
-        loc_col = pred["loc_col"]      # [1, 100, 81, 4]
-        exist_row = pred["exist_row"]  # [1, 2, 72, 4]
-        exist_col = pred["exist_col"]  # [1, 2, 81, 4]
-
-        exist_row_prob = softmax_np(exist_row.astype(np.float32), axis=1)[0, 1]
-        exist_col_prob = softmax_np(exist_col.astype(np.float32), axis=1)[0, 1]
-
-        _, grid_row, num_row, num_lanes = loc_row.shape
-        _, grid_col, num_col, _        = loc_col.shape
-
-        valid_row   = np.argmax(exist_row, axis=1)  # [1, num_row, 4]
-        valid_col   = np.argmax(exist_col, axis=1)  # [1, num_col, 4]
-        max_idx_row = np.argmax(loc_row,  axis=1)   # [1, num_row, 4]
-        max_idx_col = np.argmax(loc_col,  axis=1)   # [1, num_col, 4]
-
-        cut_offset_px = int(ori_h * (1.0 - self.crop_ratio))
-        bottom_h_px   = ori_h - cut_offset_px
-
-        lanes = {i: [] for i in range(num_lanes)}
-
-        def longest_run(indices: np.ndarray, weights: np.ndarray | None = None) -> np.ndarray:
-            if indices.size == 0:
-                return indices
-            splits = np.where(np.diff(indices) > 2)[0] + 1
-            groups = np.split(indices, splits)
-            if weights is None:
-                groups.sort(key=lambda g: len(g), reverse=True)
-            else:
-                groups.sort(key=lambda g: (len(g), float(weights[g].sum())), reverse=True)
-            return groups[0]
-
-        # ROW 기반 (y 고정, x 예측)
-        for i in row_lane_idx:
-            mask = (exist_row_prob[:, i] > tau_row) & (valid_row[0, :, i] == 1)
-            active = np.where(mask)[0]
-            if active.size < min_pts_row:
-                continue
-            active = longest_run(active, weights=exist_row_prob[:, i])
-            if active.size < min_pts_row:
-                continue
-
-            tmp = []
-            for k in active:
-                center = int(max_idx_row[0, k, i])
-                L = max(0, center - local_width)
-                R = min(grid_row - 1, center + local_width)
-                inds = np.arange(L, R + 1, dtype=np.float32)
-                slice_logits = loc_row[0, L:R + 1, k, i].astype(np.float32)
-                probs = softmax_np(slice_logits, axis=0)
-                out = float(np.sum(probs * inds) + 0.5)
-
-                x_px = (out / (grid_row - 1)) * ori_w
-                y_px = int(self.row_anchor[k] * ori_h)
-                tmp.append((int(x_px), int(y_px)))
-
-            if tmp:
-                tmp.sort(key=lambda p: p[1])
-                lanes[i] = tmp
-
-        # COL 기반 (x 고정, y 예측)
-        for i in col_lane_idx:
-            mask = (exist_col_prob[:, i] > tau_col) & (valid_col[0, :, i] == 1)
-            active = np.where(mask)[0]
-            if active.size < min_pts_col:
-                continue
-            active = longest_run(active, weights=exist_col_prob[:, i])
-            if active.size < min_pts_col:
-                continue
-
-            tmp = []
-            for k in active:
-                center = int(max_idx_col[0, k, i])
-                L = max(0, center - local_width)
-                R = min(grid_col - 1, center + local_width)
-                inds = np.arange(L, R + 1, dtype=np.float32)
-                slice_logits = loc_col[0, L:R + 1, k, i].astype(np.float32)
-                probs = softmax_np(slice_logits, axis=0)
-                out = float(np.sum(probs * inds) + 0.5)
-
-                y_px  = float((out / (grid_col - 1)) * ori_h)
-                x_px  = float(self.col_anchor[k] * ori_w)
-                tmp.append((int(x_px), int(y_px)))
-
-            if tmp:
-                tmp.sort(key=lambda p: p[1])
-                lanes[i] = tmp
-
-        coords = [pts for pts in lanes.values() if pts]
-        if not coords:
-            return []
-
-        if sort_left_to_right:
-            def lane_key(pts):
-                ys = [p[1] for p in pts]
-                y_cut = np.percentile(ys, 80)
-                xs_bottom = [p[0] for p in pts if p[1] >= y_cut] or [p[0] for p in pts]
-                xs_bottom.sort()
-                return xs_bottom[len(xs_bottom) // 2]
-            coords = sorted(coords, key=lane_key)
-        else:
-            coords = [lanes[i] for i in range(num_lanes) if lanes[i]]
-
-        return coords
-
-    def forward(self, img_bgr):
-        # 원본 크기 자동 탐지
-        if self.ori_img_w is None or self.ori_img_h is None:
-            self.ori_img_h, self.ori_img_w = img_bgr.shape[:2]
-        im0 = img_bgr.copy()
-
-        # (1600x320) 입력 만들기
-        h_full = int(self.input_height / self.crop_ratio)  # 320/0.6 ≈ 533
-        img_resized_full = cv2.resize(img_bgr, (self.input_width, h_full), cv2.INTER_CUBIC)
-        cut_offset = h_full - self.input_height            # ≈ 213
-        img_resized = img_resized_full[cut_offset:, :, :]  # (320, 1600)
-
-        # BGR->RGB, /255, 정규화
-        img_rgb = cv2.cvtColor(img_resized, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0
-        mean = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(1, 1, 3)
-        std = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(1, 1, 3)
-        img_norm = (img_rgb - mean) / std
-        inp = img_norm[np.newaxis, ...].astype(np.float32)  # [1, 320, 1600, 3]
-        start_time = time.time()
-        # 인터프리터 입력(동적 리사이즈 대응)
         in0 = self.input_details[0]
-        if tuple(in0["shape"]) != tuple(inp.shape):
-            try:
-                self.interpreter.resize_tensor_input(in0["index"], inp.shape, strict=True)
-                self.interpreter.allocate_tensors()
-                self.input_details = self.interpreter.get_input_details()
-                self.output_details = self.interpreter.get_output_details()
-            except Exception as e:
-                if self.debug:
-                    print("[WARN] 입력 리사이즈 실패, 원래 shape로 강제 입력:", in0["shape"], "err:", e)
-
-        
+        try:
+            self.interpreter.resize_tensor_input(in0["index"], shape, strict=True)
+            self.interpreter.allocate_tensors()
+            self.input_details = self.interpreter.get_input_details()
+            self.output_details = self.interpreter.get_output_details()
+            self._output_index = None
+            return True
+        except Exception as e:
+            if self.debug:
+                print("[WARN] 입력 리사이즈 실패, 원래 shape로 강제 입력:", in0["shape"], "err:", e)
+            return False
+
+    def invoke_raw(self, inp: np.ndarray) -> dict:
+        """
+        전처리된 입력 [N, H, W, 3] float32 -> 원시 출력 dict (전처리/후처리 없이 네트워크만, 지연 측정용)
+        입력 shape가 다르면 먼저 리사이즈. zero-copy 모드에서는 출력이 다음 invoke 전까지만 유효한 뷰
+        """
+        if tuple(self.input_details[0]["shape"]) != inp.shape:
+            self.resize_input(inp.shape)
         self.interpreter.set_tensor(self.input_details[0]["index"], inp)
         self.interpreter.invoke()
-        print("inference_time : ", time.time() - start_time)
+        return self.collect_outputs()
 
-        # 출력 수집 + 좌표 복원
-        preds = self._collect_outputs()
-        if self.debug:
-            for k, v in preds.items():
-                try:
-                    print(f"[OUT] {k:10s} shape={v.shape} min={float(v.min()):.3f} "
-                          f"max={float(v.max()):.3f} mean={float(v.mean()):.3f}")
-                except Exception:
-                    print(f"[OUT] {k:10s} shape={v.shape}")
+    def _preprocess_into_input(self, img_bgr, slot=0):
+        """
+        리사이즈/크롭/BGR->RGB/정규화 결과를 인터프리터 입력 버퍼(배치의 slot번째)에 직접 기록
+        (중간 float 배열 할당 없음)
+        """
+        if self.fused is not None:
+            self.fused(img_bgr, out=self._input_tensor()[slot])
+            return
+        self._preprocess_legacy(img_bgr, self._input_tensor()[slot])  # [320, 1600, 3] float32 뷰
 
-        coords = self.pred2coords(preds, ori_w=self.ori_img_w, ori_h=self.ori_img_h)
+    def _preprocess_legacy(self, img_bgr, inp):
+        """
+        기존 전처리(전체 리사이즈 → 상단 크롭 → BGR->RGB → 정규화)를 미리 할당한 버퍼로 수행해 inp에 기록
+        """
+        # 기존 경로와 같은 보간(cv2.resize의 3번째 위치 인자는 dst라 실제로는 INTER_LINEAR가 적용됨)
+        cv2.resize(img_bgr, (self.input_width, self._resize_buf.shape[0]), dst=self._resize_buf)
+        cut_offset = self._resize_buf.shape[0] - self.input_height
+        cv2.cvtColor(self._resize_buf[cut_offset:], cv2.COLOR_BGR2RGB, dst=self._rgb_buf)
 
-        # (옵션) 개발 중 중단점: LANE_BREAKPOINT=1 환경변수로만 활성화
-        if self.debug and os.getenv("LANE_BREAKPOINT", "0") == "1":
-            breakpoint()
+        np.divide(self._rgb_buf, np.float32(255.0), out=inp)
+        np.subtract(inp, np.array([0.485, 0.456, 0.406], dtype=np.float32), out=inp)
+        np.divide(inp, np.array([0.229, 0.224, 0.225], dtype=np.float32), out=inp)
 
-        # 분류 + 그리기 (GUI 없음, 반환 이미지만 작성)
-        drawn = im0.copy()
-        lane_meta = []
+    def pred2coords(self, pred: dict, ori_w: int, ori_h: int, **kwargs):
+        """
+        UFLD 계열 출력으로부터 (x,y) 좌표 시퀀스 리스트 생성 (배치의 첫 프레임만)
+        """
+        return self.pred2coords_batch({k: v[:1] for k, v in pred.items()}, ori_w, ori_h, **kwargs)[0]
 
-        # 해상도 기반 스트립 폭
-        strip_half = max(4, int(self.ori_img_w * 0.004))
+    @timed("pred2coords")
+    def pred2coords_batch(self, pred: dict, ori_w, ori_h, **kwargs):
+        """
+        LaneDecoder.pred2coords_batch (스테이지 계측 포함)
+        """
+        return self.decoder.pred2coords_batch(pred, ori_w, ori_h, **kwargs)
 
-        for lane_idx, lane in enumerate(coords[:self.num_lanes]):
+    def _preprocess(self, img_bgr, out=None):
+        """
+        BGR 원본 -> [input_height, input_width, 3] float32 모델 입력 (out이 있으면 그 버퍼에 기록)
+        """
+        if self.fused is not None:
+            return self.fused(img_bgr, out=out)
+        if out is None:
+            out = np.empty((self.input_height, self.input_width, 3), dtype=np.float32)
+        self._preprocess_legacy(img_bgr, out)
+        return out
+
+    def _print_outputs(self, preds):
+        if not self.debug:
+            return
+        for k, v in preds.items():
+            try:
+                print(f"[OUT] {k:10s} shape={v.shape} min={float(v.min()):.3f} "
+                      f"max={float(v.max()):.3f} mean={float(v.mean()):.3f}")
+            except Exception:
+                print(f"[OUT] {k:10s} shape={v.shape}")
+
+    def _classify_lanes(self, img_bgr, coords, confs=None):
+        """
+        좌표 복원 결과 -> 레인별 색상/유형 판정 리스트 (num_lanes개까지)
+        confs: 레인별 존재 확률 평균(pred2coords return_conf). 있으면 "confidence"로 기록
+        snap_points=True면 coords의 레인들을 스냅된 좌표로 제자리 갱신한 뒤 분류
+        """
+        lane_meta = []
+
+        # 해상도 기반 스트립 폭 / 스냅 반경
+        geo = self._geometry(*self._source_size(img_bgr))
+        strip_half = geo.strip_half
+
+        # 색상 마스크는 프레임에만 의존 → 프레임당 1회만 계산
+        lanes = coords[:self.num_lanes]
+        color_masks = None
+        if lanes:
+            with self.profiler.stage("color_masks"):
+                if self.color_mask_roi:
+                    # 스트립 폭 + 커버리지 AA/모폴로지 여유 (+ 스냅 이동 범위)
+                    pad = strip_half + 4
+                    if self.snap_points:
+                        pad += geo.snap_r + geo.snap_r // 2
+                    color_masks = self._lane_color_masks_roi(img_bgr, lanes, pad=pad)
+                else:
+                    color_masks = self._color_masks(img_bgr)
+            if self.snap_points:
+                with self.profiler.stage("snap"):
+                    integrals = tuple(self._mask_integral(m) for m in color_masks)
+                    lanes = [self._snap_points_to_color(lane, integrals, r=geo.snap_r)[0] for lane in lanes]
+                    coords[:len(lanes)] = lanes
+
+        for k, lane in enumerate(lanes):
             res = self.classify_lane(
-                drawn, lane,
+                img_bgr, lane,
                 strip_half_width=strip_half,
                 sample_step=3.0,
                 cov_solid_default=0.65,
                 cov_dashed_default=0.45,
-                min_gap_pix=6
+                min_gap_pix=6,
+                color_masks=color_masks
             )
+            if confs is not None:
+                res["confidence"] = confs[k]
             lane_meta.append(res)
+        return lane_meta
+
+    @staticmethod
+    def _print_diag(preds, b, coords, lane_meta):
+        # 간단 진단 (배치 b번째 프레임)
+        try:
+            exist_row = preds["exist_row"][b:b + 1].astype(np.float32)
+            exist_col = preds["exist_col"][b:b + 1].astype(np.float32)
+            er = softmax_np(exist_row, axis=1)[0, 1].mean()
+            ec = softmax_np(exist_col, axis=1)[0, 1].mean()
+            summary = " | ".join([f"{i}:{m['label']}-{m['color']}" for i, m in enumerate(lane_meta)])
+            print(f"[diag] lanes={sum(len(l) for l in coords)} "
+                  f"| exist_row≈{er:.3f}, exist_col≈{ec:.3f} | {summary}")
+        except Exception:
+            pass
+
+    def infer(self, img_bgr):
+        """
+        전처리 → invoke → 좌표 복원 → 레인 분류 (그리기 없음). 반환: (coords, lane_meta)
+        """
+        # 좌표 복원 기준 크기 (프레임마다)
+        self.ori_img_w, self.ori_img_h = self._source_size(img_bgr)
+
+        prof = self.profiler
+        gate = self.motion_gate
+        if gate is not None:
+            with prof.stage("motion_gate"):
+                cached = gate.lookup(img_bgr)
+            if cached is not None:
+                self.last_lane_meta = cached[1]
+                return cached
+
+        with prof.stage("preprocess"):
+            if self.zero_copy:
+                if self.input_details[0]["shape"][0] != 1:
+                    # 직전에 배치 추론을 했으면 배치 1로 되돌림
+                    self.resize_input((1, self.input_height, self.input_width, 3))
+                self._preprocess_into_input(img_bgr)
+            else:
+                inp = self._input_buffer((1, self.input_height, self.input_width, 3))
+                self._preprocess(img_bgr, out=inp[0])
+                if tuple(self.input_details[0]["shape"]) != inp.shape:
+                    self.resize_input(inp.shape)
+                self.interpreter.set_tensor(self.input_details[0]["index"], inp)
+
+        with prof.stage("invoke"):
+            self.interpreter.invoke()
+
+        # 출력 수집 + 좌표 복원
+        preds = self.collect_outputs()
+        self._print_outputs(preds)
+
+        coords, confs = self.pred2coords(preds, ori_w=self.ori_img_w, ori_h=self.ori_img_h, return_conf=True)
+
+        # (옵션) 개발 중 중단점: LANE_BREAKPOINT=1 환경변수로만 활성화
+        if self.debug and os.getenv("LANE_BREAKPOINT", "0") == "1":
+            breakpoint()
+
+        # 레인 분류
+        lane_meta = self._classify_lanes(img_bgr, coords, confs)
+        self.last_lane_meta = lane_meta
+
+        self._print_diag(preds, 0, coords, lane_meta)
+        if gate is not None:
+            gate.store((coords, lane_meta))
+        return coords, lane_meta
 
+    def infer_batch(self, frames):
+        """
+        프레임 N장(해상도가 섞여도 됨)을 입력 [N, 320, 1600, 3]으로 한 번에 invoke
+        반환: 프레임별 (coords, lane_meta) 리스트. 동적 배치를 지원하지 않는 모델이면 프레임별 infer로 대체
+        """
+        frames = list(frames)
+        if not frames:
+            return []
+        sizes = [self._source_size(f) for f in frames]
+        self.ori_img_w, self.ori_img_h = sizes[-1]
+
+        shape = (len(frames), self.input_height, self.input_width, 3)
+        if tuple(self.input_details[0]["shape"]) != shape and not self.resize_input(shape):
+            return [self.infer(f) for f in frames]
+
+        prof = self.profiler
+        with prof.stage("preprocess"):
+            if self.zero_copy:
+                for k, frame in enumerate(frames):
+                    self._preprocess_into_input(frame, slot=k)
+            else:
+                inp = self._input_buffer(shape)
+                for k, frame in enumerate(frames):
+                    self._preprocess(frame, out=inp[k])
+                self.interpreter.set_tensor(self.input_details[0]["index"], inp)
+
+        with prof.stage("invoke"):
+            self.interpreter.invoke()
+
+        preds = self.collect_outputs()
+        self._print_outputs(preds)
+        decoded = self.pred2coords_batch(preds, ori_w=[w for w, _ in sizes], ori_h=[h for _, h in sizes],
+                                         return_conf=True)
+
+        results = []
+        for k, (frame, (coords, confs)) in enumerate(zip(frames, decoded)):
+            lane_meta = self._classify_lanes(frame, coords, confs)
+            self._print_diag(preds, k, coords, lane_meta)
+            results.append((coords, lane_meta))
+        self.last_lane_meta = results[-1][1]
+        return results
+
+    def infer_compact(self, img_bgr):
+        """
+        infer() 결과를 lane_compact.LANE_DTYPE 배열(레인당 다항식 계수 + label/color/confidence)로 반환
+        """
+        return compact_lanes(*self.infer(img_bgr))
+
+    @staticmethod
+    def render(img_bgr, coords, lane_meta):
+        """
+        레인 좌표/분류 결과를 원본 복사본에 그림 (GUI 없음, 반환 이미지만 작성)
+        """
+        drawn = img_bgr.copy()
+        for lane_idx, (lane, res) in enumerate(zip(coords, lane_meta)):
             # 선 색상: 지배색
             if res["color"] == "yellow":
                 line_color = (0, 215, 255)   # BGR
@@ -508,23 +781,20 @@ class UFLDv2TFLite:
                 (bx, by),
                 cv2.FONT_HERSHEY_SIMPLEX, 0.55, line_color, 2, cv2.LINE_AA
             )
+        return drawn
 
-        self.last_lane_meta = lane_meta
-
-        # 간단 진단
-        try:
-            exist_row = preds["exist_row"].astype(np.float32)
-            exist_col = preds["exist_col"].astype(np.float32)
-            er = softmax_np(exist_row, axis=1)[0, 1].mean()
-            ec = softmax_np(exist_col, axis=1)[0, 1].mean()
-            summary = " | ".join([f"{i}:{m['label']}-{m['color']}" for i, m in enumerate(lane_meta)])
-            print(f"[diag] lanes={sum(len(l) for l in coords)} "
-                  f"| exist_row≈{er:.3f}, exist_col≈{ec:.3f} | {summary}")
-        except Exception:
-            pass
-
+    def forward(self, img_bgr):
+        coords, lane_meta = self.infer(img_bgr)
+        drawn = self.render(img_bgr, coords, lane_meta)
         return drawn, coords
 
+    def forward_batch(self, frames):
+        """
+        forward의 배치 버전. 반환: 프레임별 (drawn, coords) 리스트
+        """
+        return [(self.render(frame, coords, lane_meta), coords)
+                for frame, (coords, lane_meta) in zip(frames, self.infer_batch(frames))]
+
 
 def get_args():
     p = argparse.ArgumentParser()
@@ -537,91 +807,313 @@ def get_args():
                    help="(W,H) 강제 원본 크기. 보통은 None(자동) 권장")
     p.add_argument("--debug", action="store_true")
     p.add_argument("--threads", type=int, default=4, help="TFLite Interpreter num_threads")
+    p.add_argument("--no_xnnpack", action="store_true", help="XNNPACK delegate 끄기")
+    p.add_argument("--autotune", action="store_true",
+                   help="시작 시 num_threads × XNNPACK on/off를 측정해 가장 빠른 설정 사용(결과 캐시)")
+    p.add_argument("--autotune_cache", default=DEFAULT_CACHE, type=str, help="autotune 결과 캐시 JSON 경로")
+    p.add_argument("--autotune_force", action="store_true", help="캐시를 무시하고 다시 측정")
+    p.add_argument("--config_cache", default=DEFAULT_CONFIG_CACHE,
+                   type=lambda s: None if s in [None, "None", ""] else s,
+                   help="설정 파일 JSON 스냅샷 캐시 경로(mtime/해시 검증, None: 매번 Config.fromfile)")
+    p.add_argument("--color_mask_roi", action="store_true",
+                   help="색상 마스크를 레인 스트립 합집합 bbox 안에서만 계산")
+    p.add_argument("--color_lut", type=int, default=0, metavar="BITS",
+                   help="색상 마스크를 채널당 2^BITS 단계 BGR 3D LUT로 계산(예: 5 → 32^3, 8 → 기존과 동일, 0: 끔)")
+    p.add_argument("--snap_points", action="store_true",
+                   help="분류 전에 레인 포인트를 주변 흰/노란색 마스크 점수 최대 지점으로 스냅(적분 영상 기반)")
+    p.add_argument("--zero_copy", action="store_true",
+                   help="interpreter.tensor() 뷰로 입력/출력 버퍼를 직접 사용(프레임당 복사/할당 제거)")
+    p.add_argument("--fused_preprocess", action="store_true",
+                   help="크롭 먼저 리사이즈 + LUT 정규화 전처리 사용")
+    p.add_argument("--pipeline", action="store_true",
+                   help="비디오: 디코드/추론/렌더+인코드 3단계 스레드 파이프라인으로 처리")
+    p.add_argument("--queue_size", type=int, default=8, help="파이프라인 단계 사이 큐 길이")
+    p.add_argument("--batch_size", type=int, default=1,
+                   help="비디오: 프레임 N장을 [N,320,1600,3] 한 번의 invoke로 추론(동적 배치 모델 필요)")
+    p.add_argument("--double_buffer", action="store_true",
+                   help="비디오: 전처리(N+1) / invoke(N) / 후처리(N-1)를 겹쳐 실행 (zero_copy와 함께 쓸 수 없음)")
+    p.add_argument("--track_every", type=int, default=0,
+                   help="비디오: N 프레임마다만 네트워크 실행, 사이 프레임은 레인 트래커 예측 사용"
+                        "(1: 매 프레임 추론 + 시간 평활화, 0: 끔)")
+    p.add_argument("--track_min_conf", type=float, default=0.5,
+                   help="트래커 신뢰도가 이 값보다 낮으면 N 프레임 전이라도 네트워크 실행")
+    p.add_argument("--motion_gate", type=float, default=0.0,
+                   help="크롭 ROI 축소 프레임의 변화 픽셀 비율이 이 값 이하면 직전 결과 재사용(예: 0.01, 0: 끔)")
+    p.add_argument("--motion_max_reuse", type=int, default=15, help="모션 게이트 연속 재사용 상한(프레임)")
+    p.add_argument("--headless", action="store_true",
+                   help="그리기/영상 인코딩 없이 프레임별 레인 결과만 레코드 파일로 저장")
+    p.add_argument("--records", default=None, type=str,
+                   help="헤드리스 결과 경로(.jsonl 또는 .bin). 지정하지 않으면 <입력>_lanes.jsonl")
+    p.add_argument("--compact_records", action="store_true",
+                   help="헤드리스 레코드를 점 목록 대신 레인별 2차 다항식 계수(lane_compact)로 저장")
+    p.add_argument("--profile", default=None, type=str,
+                   help="스테이지별 지연시간(프레임별 + p50/p95/p99 집계)을 저장할 JSON 경로")
+    p.add_argument("--profile_frames", type=int, default=10000,
+                   help="--profile JSON에 남길 최근 프레임 수(메모리 상한, 0: 프레임별 기록 안 함)")
     return p.parse_args()
 
 
-def main():
-    args = get_args()
+def _run_video(isnet, cap, handle, pipeline=False, queue_size=8, batch_size=1, double_buffer=False,
+               track_every=0, track_min_conf=0.5):
+    """
+    비디오 프레임마다 infer 후 handle(idx, frame, coords, lane_meta) 호출. 반환: 처리 프레임 수
+    pipeline=True면 디코드 / 추론 / handle(렌더+인코드 또는 레코드 기록)을 스레드로 겹쳐 실행
+    batch_size>1이면 프레임을 모아 infer_batch로 한 번에 invoke (pipeline과 함께 쓰면 무시)
+    double_buffer=True면 AsyncLaneRunner로 전처리 / invoke / 후처리를 겹쳐 실행 (pipeline, batch와 함께 쓰면 무시)
+    track_every=N(>0)이면 N 프레임마다(또는 트래커 신뢰도 저하 시) 추론하고 사이 프레임은 LaneTracker 예측 사용
+    (순차 모드 전용, 다른 모드와 함께 쓰면 무시)
+    """
+    prof = isnet.profiler
+    if pipeline and batch_size > 1:
+        print("[WARN] --pipeline 모드에서는 --batch_size를 무시합니다.")
+    if double_buffer and (pipeline or batch_size > 1):
+        print("[WARN] --pipeline / --batch_size 모드에서는 --double_buffer를 무시합니다.")
+        double_buffer = False
+    if track_every > 0 and (pipeline or batch_size > 1 or double_buffer):
+        print("[WARN] --pipeline / --batch_size / --double_buffer 모드에서는 --track_every를 무시합니다.")
+        track_every = 0
+    if isnet.motion_gate is not None and not pipeline and (batch_size > 1 or double_buffer):
+        print("[WARN] --batch_size / --double_buffer 모드에서는 --motion_gate가 적용되지 않습니다.")
+    if pipeline:
+        def read_frame():
+            ok, frame = cap.read()
+            return frame if ok else None
 
-    isnet = UFLDv2TFLite(
-        model_path=args.model_path,
-        config_path=args.config_path,
-        ori_size=args.ori_size,
-        debug=args.debug,
-        num_threads=args.threads,
-    )
+        infer_idx = [0]
 
-    path = args.input_path
-    ext = os.path.splitext(path)[1].lower()
+        def process(frame):
+            # 추론 워커는 입력 순서대로 처리하므로 카운터가 곧 프레임 번호
+            with prof.frame(infer_idx[0]):
+                infer_idx[0] += 1
+                return isnet.infer(frame)
 
-    if is_image_file(path):
-        # 단일 이미지
-        img = cv2.imread(path)
-        if img is None:
-            raise RuntimeError(f"이미지를 열 수 없습니다: {path}")
+        def emit(idx, frame, result):
+            with prof.frame(idx):
+                handle(idx, frame, *result)
 
-        drawn, _ = isnet.forward(img)
+        stats, wall = run_three_stage(read_frame, process, emit, queue_size=queue_size)
+        print_stage_report(stats, wall)
+        return stats[-1].frames
 
-        # 저장 경로 결정
-        if args.output_path:
-            out_img = args.output_path
-        else:
-            stem = os.path.splitext(path)[0]
-            out_img = f"{stem}_lane.jpg"
+    frame_idx = 0
+    if double_buffer:
+        runner = AsyncLaneRunner(isnet)
 
-        ok = cv2.imwrite(out_img, drawn)
-        print(f"[SAVE] image -> {out_img} ({'OK' if ok else 'FAIL'})")
+        def drain(items):
+            for seq, frame, (coords, lane_meta) in items:
+                with prof.frame(seq):
+                    handle(seq, frame, coords, lane_meta)
+            return len(items)
 
-    else:
-        # 비디오
-        cap = cv2.VideoCapture(path)
-        if not cap.isOpened():
-            raise RuntimeError(f"비디오를 열 수 없습니다: {path}")
-
-        # 저장 경로/포맷
-        if args.output_path:
-            out_vid = args.output_path
-        else:
-            stem = os.path.splitext(path)[0]
-            out_vid = f"{stem}_lane.mp4"
-
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        if fps <= 1e-3:
-            fps = 30.0
-        width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-
-        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-        writer = cv2.VideoWriter(out_vid, fourcc, fps, (width, height))
-        if not writer.isOpened():
-            # 코덱 가용성 문제면 프레임 시퀀스로 대체 저장
-            print(f"[WARN] VideoWriter 열기 실패 → 프레임 PNG 시퀀스로 저장합니다.")
-            seq_dir = f"{os.path.splitext(out_vid)[0]}_frames"
-            os.makedirs(seq_dir, exist_ok=True)
-            frame_idx = 0
+        try:
             while True:
                 ok, frame = cap.read()
                 if not ok:
                     break
-                drawn, _ = isnet.forward(frame)
-                cv2.imwrite(os.path.join(seq_dir, f"frame_{frame_idx:06d}.png"), drawn)
-                frame_idx += 1
-            cap.release()
-            print(f"[SAVE] frames -> {seq_dir} ({frame_idx} frames)")
-            return
-
-        frame_idx = 0
+                runner.submit(frame)
+                frame_idx += drain(runner.poll())
+        finally:
+            runner.close()
+        frame_idx += drain(list(runner.results()))
+        runner.join()
+        return frame_idx
+
+    if batch_size > 1:
         while True:
-            ok, frame = cap.read()
-            if not ok:
+            chunk = []
+            while len(chunk) < batch_size:
+                ok, frame = cap.read()
+                if not ok:
+                    break
+                chunk.append(frame)
+            if not chunk:
                 break
-            drawn, _ = isnet.forward(frame)
-            writer.write(drawn)
-            frame_idx += 1
+            # 배치 단위 스테이지(preprocess/invoke/pred2coords)는 배치 첫 프레임에 귀속
+            with prof.frame(frame_idx):
+                results = isnet.infer_batch(chunk)
+            for frame, (coords, lane_meta) in zip(chunk, results):
+                with prof.frame(frame_idx):
+                    handle(frame_idx, frame, coords, lane_meta)
+                frame_idx += 1
+            if len(chunk) < batch_size:
+                break
+        return frame_idx
+
+    tracker = None
+    while True:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        with prof.frame(frame_idx):
+            if track_every <= 0:
+                coords, lane_meta = isnet.infer(frame)
+            else:
+                if tracker is None:
+                    h, w = frame.shape[:2]
+                    tracker = LaneTracker(w, h, detect_every=track_every, min_confidence=track_min_conf)
+                if tracker.should_detect():
+                    coords, lane_meta = isnet.infer(frame)
+                    with prof.stage("track"):
+                        coords, lane_meta = tracker.update(coords, lane_meta)
+                else:
+                    with prof.stage("track"):
+                        coords, lane_meta = tracker.predict()
+            handle(frame_idx, frame, coords, lane_meta)
+        frame_idx += 1
+    if tracker is not None:
+        st = tracker.stats()
+        print(f"[TRACK] {st['detections']}/{st['frames']} frames inferred "
+              f"({st['skipped']} predicted, detect_ratio={st['detect_ratio']:.2f})")
+    return frame_idx
+
+
+def process_image(isnet, path, out_path=None, records=None, frame_idx=0):
+    """
+    이미지 1장 처리. records가 있으면 결과 레코드만 기록(그리기 없음), 아니면 그린 결과를 out_path에 저장
+    반환: (coords, lane_meta)
+    """
+    prof = isnet.profiler
+    img = cv2.imread(path)
+    if img is None:
+        raise RuntimeError(f"이미지를 열 수 없습니다: {path}")
+
+    with prof.frame(frame_idx):
+        coords, lane_meta = isnet.infer(img)
+        if records is not None:
+            with prof.stage("encode"):
+                records.write(frame_idx, 0.0, coords, lane_meta)
+            return coords, lane_meta
+
+        with prof.stage("render"):
+            drawn = isnet.render(img, coords, lane_meta)
+        with prof.stage("encode"):
+            ok = cv2.imwrite(out_path, drawn)
+    print(f"[SAVE] image -> {out_path} ({'OK' if ok else 'FAIL'})")
+    return coords, lane_meta
+
+
+def process_video(isnet, path, out_path=None, records=None, pipeline=False, queue_size=8, batch_size=1,
+                  double_buffer=False, track_every=0, track_min_conf=0.5):
+    """
+    비디오 1개 처리. records가 있으면 프레임별 결과 레코드만 기록(그리기/인코딩 없음),
+    아니면 그린 결과를 out_path(mp4, 실패 시 PNG 시퀀스)에 저장. 반환: 처리 프레임 수
+    """
+    prof = isnet.profiler
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise RuntimeError(f"비디오를 열 수 없습니다: {path}")
+
+    fps = cap.get(cv2.CAP_PROP_FPS)
+    if fps <= 1e-3:
+        fps = 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+
+    if records is not None:
+        # 헤드리스: 그리기/인코딩 없이 결과 레코드만 기록
+        def handle(idx, frame, coords, lane_meta):
+            with prof.stage("encode"):
+                records.write(idx, idx / fps, coords, lane_meta)
+
+        frame_idx = _run_video(isnet, cap, handle, pipeline, queue_size, batch_size, double_buffer,
+                               track_every, track_min_conf)
+        cap.release()
+        return frame_idx
+
+    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+    writer = cv2.VideoWriter(out_path, fourcc, fps, (width, height))
+    seq_dir = None
+    if not writer.isOpened():
+        # 코덱 가용성 문제면 프레임 시퀀스로 대체 저장
+        print(f"[WARN] VideoWriter 열기 실패 → 프레임 PNG 시퀀스로 저장합니다.")
+        seq_dir = f"{os.path.splitext(out_path)[0]}_frames"
+        os.makedirs(seq_dir, exist_ok=True)
+
+    def handle(idx, frame, coords, lane_meta):
+        with prof.stage("render"):
+            drawn = isnet.render(frame, coords, lane_meta)
+        with prof.stage("encode"):
+            if seq_dir is not None:
+                cv2.imwrite(os.path.join(seq_dir, f"frame_{idx:06d}.png"), drawn)
+            else:
+                writer.write(drawn)
 
+    frame_idx = _run_video(isnet, cap, handle, pipeline, queue_size, batch_size, double_buffer,
+                           track_every, track_min_conf)
+    cap.release()
+    if seq_dir is not None:
+        print(f"[SAVE] frames -> {seq_dir} ({frame_idx} frames)")
+    else:
         writer.release()
-        cap.release()
-        print(f"[SAVE] video -> {out_vid} ({frame_idx} frames)")
+        print(f"[SAVE] video -> {out_path} ({frame_idx} frames)")
+    return frame_idx
+
+
+def _run(isnet, args):
+    path = args.input_path
+    stem = os.path.splitext(path)[0]
+    records = None
+    if args.headless:
+        records = LaneRecordWriter(args.records or f"{stem}_lanes.jsonl", compact=args.compact_records)
+
+    try:
+        if is_image_file(path):
+            # 단일 이미지
+            process_image(isnet, path, args.output_path or f"{stem}_lane.jpg", records)
+            frames = 1
+        else:
+            # 비디오
+            frames = process_video(isnet, path, args.output_path or f"{stem}_lane.mp4", records,
+                                   pipeline=args.pipeline, queue_size=args.queue_size,
+                                   batch_size=args.batch_size, double_buffer=args.double_buffer,
+                                   track_every=args.track_every, track_min_conf=args.track_min_conf)
+    finally:
+        if records is not None:
+            records.close()
+    if records is not None:
+        print(f"[SAVE] records -> {records.path} ({frames} frames)")
+    if isnet.motion_gate is not None:
+        st = isnet.motion_gate.stats()
+        print(f"[GATE] {st['reused']}/{st['frames']} frames reused ({st['invoked']} invoked, "
+              f"reuse_ratio={st['reuse_ratio']:.2f})")
+
+
+def main():
+    args = get_args()
+
+    num_threads, use_xnnpack = args.threads, not args.no_xnnpack
+    if args.autotune:
+        cfg = load_config(args.config_path, cache_path=args.config_cache)
+        best = autotune(args.model_path, make_interpreter,
+                        (max(1, args.batch_size), int(cfg.train_height), int(cfg.train_width), 3),
+                        cache_path=args.autotune_cache, force=args.autotune_force)
+        num_threads, use_xnnpack = best["num_threads"], best["use_xnnpack"]
+
+    isnet = UFLDv2TFLite(
+        model_path=args.model_path,
+        config_path=args.config_path,
+        ori_size=args.ori_size,
+        debug=args.debug,
+        num_threads=num_threads,
+        use_xnnpack=use_xnnpack,
+        color_mask_roi=args.color_mask_roi,
+        zero_copy=args.zero_copy,
+        fused_preprocess=args.fused_preprocess,
+        profiler=StageProfiler(max_frames=args.profile_frames) if args.profile else None,
+        motion_gate=args.motion_gate,
+        motion_max_reuse=args.motion_max_reuse,
+        color_lut_bits=args.color_lut,
+        snap_points=args.snap_points,
+        config_cache=args.config_cache,
+    )
+    try:
+        _run(isnet, args)
+    finally:
+        if args.profile:
+            isnet.profiler.report()
+            isnet.profiler.dump(args.profile)
+            print(f"[SAVE] profile -> {args.profile}")
+
 
 if __name__ == "__main__":
     main()
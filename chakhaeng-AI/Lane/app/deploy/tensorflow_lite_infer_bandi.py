@@ -15,6 +15,8 @@ except Exception:
 # 프로젝트 루트 기준 utils.config 사용
 sys.path.append(os.path.join(os.path.dirname(__file__), "../"))
 from utils.config import Config  # type: ignore
+from deploy.lane_decode import local_expectation, points_sorted_by_y  # type: ignore
+from deploy.lane_preprocess import FusedPreprocessor  # type: ignore
 
 def get_args():
     p = argparse.ArgumentParser()
@@ -27,6 +29,7 @@ def get_args():
                    help="(W,H) 강제 원본 크기. 보통은 None(자동) 권장")
     p.add_argument("--debug", action="store_true")
     p.add_argument("--threads", type=int, default=4, help="TFLite Interpreter num_threads")
+    p.add_argument("--fused_preprocess", action="store_true", help="크롭 먼저 리사이즈 + LUT 정규화 전처리 사용")
     p.add_argument("--tau_row", type=float, default=0.55, help="존재 확률 임계값")
     p.add_argument("--tau_col", type=float, default=0.55, help="존재 확률 임계값")
     p.add_argument("--min_pts_row", type=int, default=10, help="한 레인의 최소 포인트 수. 이보다 적으면 그 레인을 버림.")
@@ -82,12 +85,17 @@ class UFLDv2TFLite:
         # 원본 높이 기준 앵커_차선 검출을 위한 기준점(row/col anchor) 좌표를 균일 간격으로 생성
         self.row_anchor = np.linspace(1.0 - self.crop_ratio, 1.0, self.num_row, dtype=np.float32)  # 0.4~1.0
         self.col_anchor = np.linspace(0.0, 1.0, self.num_col, dtype=np.float32)  
+        # 크롭 먼저 리사이즈 + LUT 정규화 전처리 (None이면 기존 전처리)
+        self.fused = FusedPreprocessor(self.input_width, self.input_height, self.crop_ratio) if args.fused_preprocess else None
 
     def data_preprocess(self, img):
         # 원본 크기 자동 탐지
         if self.ori_img_w is None or self.ori_img_h is None:
             self.ori_img_h, self.ori_img_w = img.shape[:2]
-        
+
+        if self.fused is not None:
+            return self.fused(img)[np.newaxis, ...]  # [1, 320, 1600, 3]
+
         img_bgr = img.copy()
         # tensorflow_lite 입력에 맞게 이미지 사이즈 조정
         h_full = int(self.input_height / self.crop_ratio)  # 320/0.6 ≈ 533
@@ -159,8 +167,10 @@ class UFLDv2TFLite:
 
         valid_row   = np.argmax(exist_row, axis=1)  # [1, num_row, 4]
         valid_col   = np.argmax(exist_col, axis=1)  # [1, num_col, 4]
-        max_idx_row = np.argmax(loc_row,  axis=1)   # [1, num_row, 4]
-        max_idx_col = np.argmax(loc_col,  axis=1)   # [1, num_col, 4]
+
+        # argmax 주변 ±local_width 범위를 소프트맥스로 가중평균(서브셀 보정). 모든 anchor/lane을 한 번에 계산
+        out_row = local_expectation(loc_row[0], local_width)  # [num_row, 4]
+        out_col = local_expectation(loc_col[0], local_width)  # [num_col, 4]
 
         lanes = {i: [] for i in range(num_lanes)}
 
@@ -193,23 +203,9 @@ class UFLDv2TFLite:
             if active.size < min_pts_row:
                 continue
 
-            tmp = []
-            for k in active:
-                center = int(max_idx_row[0, k, i])
-                L = max(0, center - local_width)
-                R = min(grid_row - 1, center + local_width)
-                inds = np.arange(L, R + 1, dtype=np.float32) #L 부터 R 까지 1씩 증가하는 값을 원소를 가지는 np.array 생성
-                slice_logits = loc_row[0, L:R + 1, k, i].astype(np.float32)
-                probs = softmax_np(slice_logits, axis=0)
-                out = float(np.sum(probs * inds) + 0.5) #가중치를 반영한 anchor index 값
-
-                x_px = (out / (grid_row - 1)) * ori_w
-                y_px = self.row_anchor[k] * ori_h # 네트워크 출력(셀/anchor 단위)을 실제 원본 이미지 좌표계(px)로 매핑
-                tmp.append((int(x_px), int(y_px)))
-
-            if tmp:
-                tmp.sort(key=lambda p: p[1])
-                lanes[i] = tmp
+            x_px = (out_row[active, i].astype(np.float64) / (grid_row - 1)) * ori_w
+            y_px = self.row_anchor[active] * ori_h # 네트워크 출력(셀/anchor 단위)을 실제 원본 이미지 좌표계(px)로 매핑
+            lanes[i] = points_sorted_by_y(x_px, y_px)
 
         # COL 기반 (x 고정, y 예측)
         for i in col_lane_idx:
@@ -221,23 +217,9 @@ class UFLDv2TFLite:
             if active.size < min_pts_col:
                 continue
 
-            tmp = []
-            for k in active:
-                center = int(max_idx_col[0, k, i])
-                L = max(0, center - local_width)
-                R = min(grid_col - 1, center + local_width)
-                inds = np.arange(L, R + 1, dtype=np.float32)
-                slice_logits = loc_col[0, L:R + 1, k, i].astype(np.float32)
-                probs = softmax_np(slice_logits, axis=0)
-                out = float(np.sum(probs * inds) + 0.5)
-
-                y_px  = float((out / (grid_col - 1)) * ori_h)
-                x_px  = float(self.col_anchor[k] * ori_w)
-                tmp.append((int(x_px), int(y_px)))
-
-            if tmp:
-                tmp.sort(key=lambda p: p[1])
-                lanes[i] = tmp
+            y_px = (out_col[active, i].astype(np.float64) / (grid_col - 1)) * ori_h
+            x_px = self.col_anchor[active] * ori_w
+            lanes[i] = points_sorted_by_y(x_px, y_px)
 
         coords = [pts for pts in lanes.values() if pts]
         if not coords:
@@ -0,0 +1,129 @@
+# video_pipeline.py
+# 디코드 / 추론 / 렌더+인코드 3단계 스레드 파이프라인 (bounded queue, 프레임 순서 유지)
+import queue
+import threading
+import time
+
+_END = object()
+
+
+class StageStats:
+    def __init__(self, name: str):
+        self.name = name
+        self.frames = 0
+        self.busy = 0.0   # 해당 스테이지가 실제로 일한 시간(s), 큐 대기 제외
+
+    def add(self, seconds: float):
+        self.frames += 1
+        self.busy += seconds
+
+    def summary(self) -> str:
+        ms = self.busy / self.frames * 1000.0 if self.frames else 0.0
+        fps = self.frames / self.busy if self.busy > 0 else 0.0
+        return f"{self.name:8s} frames={self.frames:6d} busy={self.busy:8.2f}s {ms:8.2f} ms/frame {fps:8.2f} fps"
+
+
+def run_three_stage(read_frame, process, emit, queue_size: int = 8):
+    """
+    read_frame() -> frame | None(끝)       : 디코더 스레드
+    process(frame) -> result               : 호출 스레드(추론 워커, TFLite invoke 중 GIL 해제)
+    emit(idx, frame, result)               : 렌더/인코더 스레드
+    단계별 처리는 순차 단일 스레드라 출력 순서는 입력 순서와 같다.
+    반환: (StageStats 리스트[decode, infer, render], wall 시간(s))
+    """
+    q_in = queue.Queue(maxsize=queue_size)
+    q_out = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    decode_stats, infer_stats, render_stats = StageStats("decode"), StageStats("infer"), StageStats("render")
+
+    def put(q, item):
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def get(q):
+        while not stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _END
+
+    def decoder():
+        try:
+            idx = 0
+            while not stop.is_set():
+                t0 = time.perf_counter()
+                frame = read_frame()
+                if frame is None:
+                    break
+                decode_stats.add(time.perf_counter() - t0)
+                if not put(q_in, (idx, frame)):
+                    return
+                idx += 1
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+        finally:
+            put(q_in, _END)
+
+    def encoder():
+        try:
+            while True:
+                item = get(q_out)
+                if item is _END:
+                    break
+                idx, frame, result = item
+                t0 = time.perf_counter()
+                emit(idx, frame, result)
+                render_stats.add(time.perf_counter() - t0)
+        except BaseException as e:
+            errors.append(e)
+            stop.set()
+
+    threads = [threading.Thread(target=decoder, name="lane-decode", daemon=True),
+               threading.Thread(target=encoder, name="lane-render", daemon=True)]
+    wall0 = time.perf_counter()
+    for th in threads:
+        th.start()
+
+    try:
+        while True:
+            item = get(q_in)
+            if item is _END:
+                break
+            idx, frame = item
+            t0 = time.perf_counter()
+            result = process(frame)
+            infer_stats.add(time.perf_counter() - t0)
+            if not put(q_out, (idx, frame, result)):
+                break
+    except BaseException as e:
+        errors.append(e)
+        stop.set()
+    finally:
+        put(q_out, _END)
+        for th in threads:
+            th.join()
+
+    wall = time.perf_counter() - wall0
+    if errors:
+        raise errors[0]
+    return [decode_stats, infer_stats, render_stats], wall
+
+
+def print_stage_report(stats, wall: float):
+    frames = stats[-1].frames
+    print("[PIPE] stage throughput")
+    for st in stats:
+        print("[PIPE]   " + st.summary())
+    sum_ms = sum(st.busy / st.frames * 1000.0 for st in stats if st.frames)
+    max_ms = max((st.busy / st.frames * 1000.0 for st in stats if st.frames), default=0.0)
+    e2e_ms = wall / frames * 1000.0 if frames else 0.0
+    print(f"[PIPE]   end-to-end {frames} frames in {wall:.2f}s -> {e2e_ms:.2f} ms/frame "
+          f"(sum(stage)={sum_ms:.2f}, max(stage)={max_ms:.2f})")
@@ -0,0 +1,34 @@
+import torch
+
+
+@torch.no_grad()
+def svd_linear(fc):
+    # W (out x in) = U diag(S) Vh, float32 / CPU (여러 rank에 재사용하도록 분해만 따로)
+    return torch.linalg.svd(fc.weight.detach().float().cpu(), full_matrices=False)
+
+
+@torch.no_grad()
+def lowrank_linear(fc, usv, rank):
+    """
+    Linear(in, out) -> Sequential(Linear(in, rank, bias=False), Linear(rank, out))
+    W ≈ (U_r sqrt(S_r)) (sqrt(S_r) Vh_r). rank가 원래 파라미터 수 이상이면 fc 그대로 반환
+    """
+    out_features, in_features = fc.weight.shape
+    rank = int(rank)
+    if rank <= 0 or rank * (in_features + out_features) >= in_features * out_features:
+        return fc
+    U, S, Vh = usv
+    root = S[:rank].sqrt()
+    first = torch.nn.Linear(in_features, rank, bias=False)
+    second = torch.nn.Linear(rank, out_features, bias=fc.bias is not None)
+    first.weight.copy_(root[:, None] * Vh[:rank])
+    second.weight.copy_(U[:, :rank] * root[None, :])
+    if fc.bias is not None:
+        second.bias.copy_(fc.bias)
+    return torch.nn.Sequential(first, second).to(fc.weight.device, fc.weight.dtype)
+
+
+def energy(S, rank):
+    # 상위 rank개 특이값이 차지하는 에너지(제곱합) 비율
+    S2 = S.double() ** 2
+    return float(S2[:rank].sum() / S2.sum())
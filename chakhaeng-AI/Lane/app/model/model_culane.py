@@ -4,6 +4,7 @@ import numpy as np
 from utils.common import initialize_weights
 from model.seg_model import SegHead
 from model.layer import CoordConv
+from model.lowrank import svd_linear, lowrank_linear
 
 class parsingNet(torch.nn.Module):
     def __init__(self, pretrained=True, backbone='50', num_grid_row = None, num_cls_row = None, num_grid_col = None, num_cls_col = None, num_lane_on_row = None, num_lane_on_col = None, use_aux=False,input_height = None, input_width = None, fc_norm = False):
@@ -15,11 +16,10 @@ class parsingNet(torch.nn.Module):
         self.num_lane_on_row = num_lane_on_row
         self.num_lane_on_col = num_lane_on_col
         self.use_aux = use_aux
-        self.dim1 = self.num_grid_row * self.num_cls_row * self.num_lane_on_row
-        self.dim2 = self.num_grid_col * self.num_cls_col * self.num_lane_on_col
-        self.dim3 = 2 * self.num_cls_row * self.num_lane_on_row
-        self.dim4 = 2 * self.num_cls_col * self.num_lane_on_col
-        self.total_dim = self.dim1 + self.dim2 + self.dim3 + self.dim4
+        # slice_head() 이후 남은 원래 레인 번호 (None: 전체 레인)
+        self.row_lanes = None
+        self.col_lanes = None
+        self._set_dims()
         mlp_mid_dim = 2048
         self.input_dim = input_height // 32 * input_width // 32 * 8
 
@@ -51,7 +51,7 @@ class parsingNet(torch.nn.Module):
         # print(self.coord.shape)
         # fea = torch.cat([fea, self.coord.repeat(fea.shape[0],1,1,1)], dim = 1)
         
-        fea = fea.view(-1, self.input_dim)
+        fea = fea.reshape(-1, self.input_dim)  # channels_last 입력이면 view 불가 → reshape
         out = self.cls(fea)
 
         pred_dict = {'loc_row': out[:,:self.dim1].view(-1,self.num_grid_row, self.num_cls_row, self.num_lane_on_row), 
@@ -63,6 +63,66 @@ class parsingNet(torch.nn.Module):
         
         return pred_dict
 
+    def _set_dims(self):
+        self.dim1 = self.num_grid_row * self.num_cls_row * self.num_lane_on_row
+        self.dim2 = self.num_grid_col * self.num_cls_col * self.num_lane_on_col
+        self.dim3 = 2 * self.num_cls_row * self.num_lane_on_row
+        self.dim4 = 2 * self.num_cls_col * self.num_lane_on_col
+        self.total_dim = self.dim1 + self.dim2 + self.dim3 + self.dim4
+
+    @torch.no_grad()
+    def slice_head(self, row_lanes = (1, 2), col_lanes = (0, 3)):
+        # 추론 전용: cls 마지막 Linear에서 디코더가 읽는 (레인, 축) 출력만 남김
+        # 출력 레인 축은 row_lanes / col_lanes 순서로 줄어들고, 남은 레인의 값은 자르기 전과 동일
+        row_lanes, col_lanes = list(row_lanes), list(col_lanes)
+        assert self.row_lanes is None and self.col_lanes is None, 'head is already sliced'
+        segments = [
+            (self.num_grid_row, self.num_cls_row, self.num_lane_on_row, row_lanes),
+            (self.num_grid_col, self.num_cls_col, self.num_lane_on_col, col_lanes),
+            (2, self.num_cls_row, self.num_lane_on_row, row_lanes),
+            (2, self.num_cls_col, self.num_lane_on_col, col_lanes),
+        ]
+        keep, offset = [], 0
+        for grid, cls, lanes, used in segments:
+            # forward의 view(-1, grid, cls, lanes)와 같은 배치 → 레인 축(마지막)에서 선택
+            idx = torch.arange(grid * cls * lanes).view(grid, cls, lanes)[..., used]
+            keep.append(idx.reshape(-1) + offset)
+            offset += grid * cls * lanes
+        keep = torch.cat(keep)
+
+        # factorize_head() 이후면 두 번째 (rank -> out) Linear의 출력 행을 자름
+        last = self.cls[-1]
+        fc = last[-1] if isinstance(last, torch.nn.Sequential) else last
+        sliced = torch.nn.Linear(fc.in_features, keep.numel(), bias = fc.bias is not None).to(fc.weight.device, fc.weight.dtype)
+        keep = keep.to(fc.weight.device)
+        sliced.weight.copy_(fc.weight[keep])
+        if fc.bias is not None:
+            sliced.bias.copy_(fc.bias[keep])
+        if isinstance(last, torch.nn.Sequential):
+            last[-1] = sliced
+        else:
+            self.cls[-1] = sliced
+
+        self.num_lane_on_row, self.num_lane_on_col = len(row_lanes), len(col_lanes)
+        self.row_lanes, self.col_lanes = tuple(row_lanes), tuple(col_lanes)
+        self._set_dims()
+        return self
+
+    def factorize_head(self, rank, fc1_rank = None, svd_cache = None):
+        # 학습 후 저랭크 분해: cls의 Linear(2048 -> total_dim) (와 fc1_rank가 있으면 Linear(input_dim -> 2048))를
+        # Linear(in -> rank, bias 없음) + Linear(rank -> out)으로 교체. svd_cache(dict)를 주면 분해 결과를 재사용
+        for idx, r in ((len(self.cls) - 1, rank), (len(self.cls) - 3, fc1_rank)):
+            fc = self.cls[idx]
+            if not r or not isinstance(fc, torch.nn.Linear):
+                continue
+            usv = svd_cache.get(idx) if svd_cache is not None else None
+            if usv is None:
+                usv = svd_linear(fc)
+                if svd_cache is not None:
+                    svd_cache[idx] = usv
+            self.cls[idx] = lowrank_linear(fc, usv, r)
+        return self
+
     def forward_tta(self, x):
         x2,x3,fea = self.model(x)
 
@@ -87,7 +147,7 @@ class parsingNet(torch.nn.Module):
         down_pooled_fea[:,:,0,:] = pooled_fea.mean(-2)
         # 10 x 25
         fea = torch.cat([pooled_fea, left_pooled_fea, right_pooled_fea, up_pooled_fea, down_pooled_fea], dim = 0)
-        fea = fea.view(-1, self.input_dim)
+        fea = fea.reshape(-1, self.input_dim)
 
         out = self.cls(fea)
 
@@ -96,5 +156,8 @@ class parsingNet(torch.nn.Module):
                 'exist_row': out[:,self.dim1+self.dim2:self.dim1+self.dim2+self.dim3].view(-1, 2, self.num_cls_row, self.num_lane_on_row), 
                 'exist_col': out[:,-self.dim4:].view(-1, 2, self.num_cls_col, self.num_lane_on_col)}
 
-def get_model(cfg):
-    return parsingNet(pretrained = True, backbone=cfg.backbone, num_grid_row = cfg.num_cell_row, num_cls_row = cfg.num_row, num_grid_col = cfg.num_cell_col, num_cls_col = cfg.num_col, num_lane_on_row = cfg.num_lanes, num_lane_on_col = cfg.num_lanes, use_aux = cfg.use_aux, input_height = cfg.train_height, input_width = cfg.train_width, fc_norm = cfg.fc_norm).cuda()
\ No newline at end of file
+def get_model(cfg, device = None, pretrained = True):
+    # device=None이면 CUDA가 있을 때만 GPU (CPU 전용 환경에서도 생성 가능)
+    if device is None:
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    return parsingNet(pretrained = pretrained, backbone=cfg.backbone, num_grid_row = cfg.num_cell_row, num_cls_row = cfg.num_row, num_grid_col = cfg.num_cell_col, num_cls_col = cfg.num_col, num_lane_on_row = cfg.num_lanes, num_lane_on_col = cfg.num_lanes, use_aux = cfg.use_aux, input_height = cfg.train_height, input_width = cfg.train_width, fc_norm = cfg.fc_norm).to(device)
\ No newline at end of file
@@ -0,0 +1,109 @@
+# lane_bench 핫패스 pytest-benchmark (deploy/lane_bench.py CLI와 같은 함수/입력)
+#   python -m pytest -q tests/test_lane_bench.py --benchmark-json bench.json
+#   LANE_BENCH_MODELS=a.tflite:b.tflite / LANE_BENCH_VIDEOS=glob 으로 입력을 바꿀 수 있음 (기본: lane_bench와 같음)
+# git-lfs를 받지 않아 모델/비디오가 포인터 파일이면 invoke / FPS 항목은 건너뜀
+import glob
+import os
+
+import cv2
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from deploy.lane_bench import (DEFAULT_CONFIG, DEFAULT_IMAGES, DEFAULT_MODELS, DEFAULT_VIDEOS,  # noqa: E402
+                               decode_inputs, is_lfs_pointer, load_sources)
+from deploy.lane_color_lut import ColorLUT  # noqa: E402
+from deploy.lane_preprocess import FusedPreprocessor, legacy_preprocess  # noqa: E402
+from deploy.tensorflow_lite_infer import UFLDv2TFLite  # noqa: E402
+
+MODELS = os.environ.get("LANE_BENCH_MODELS", "").split(os.pathsep) if os.environ.get("LANE_BENCH_MODELS") \
+    else DEFAULT_MODELS
+VIDEOS = os.environ.get("LANE_BENCH_VIDEOS", DEFAULT_VIDEOS)
+VIDEO_FRAMES = 30
+
+
+def _require(path):
+    if not os.path.exists(path):
+        pytest.skip(f"파일이 없습니다: {path}")
+    if is_lfs_pointer(path):
+        pytest.skip(f"git-lfs 포인터입니다(git lfs pull 필요): {path}")
+
+
+@pytest.fixture(scope="module")
+def frame():
+    sources = load_sources(DEFAULT_IMAGES, "", 0)
+    if not sources:
+        pytest.skip(f"테스트 이미지가 없습니다: {DEFAULT_IMAGES}")
+    return sources[0][1][0]
+
+
+@pytest.fixture(scope="module")
+def decode():
+    return decode_inputs(DEFAULT_CONFIG)
+
+
+def test_decode_numpy(benchmark, decode):
+    _, decoder, preds = decode
+    coords = benchmark(decoder.pred2coords, preds, ori_w=1640, ori_h=590)
+    assert isinstance(coords, list)
+
+
+def test_preprocess_legacy(benchmark, decode, frame):
+    cfg = decode[0]
+    out = benchmark(legacy_preprocess, frame, int(cfg.train_width), int(cfg.train_height), float(cfg.crop_ratio))
+    assert out.shape == (int(cfg.train_height), int(cfg.train_width), 3)
+
+
+def test_preprocess_fused(benchmark, decode, frame):
+    cfg = decode[0]
+    fused = FusedPreprocessor(int(cfg.train_width), int(cfg.train_height), float(cfg.crop_ratio))
+    out = benchmark(fused, frame)
+    assert out.shape == (int(cfg.train_height), int(cfg.train_width), 3)
+
+
+def test_color_masks_legacy(benchmark, frame):
+    white, yellow = benchmark(UFLDv2TFLite._lane_color_classes, frame)
+    assert white.shape == frame.shape[:2]
+
+
+@pytest.mark.parametrize("bits", [5, 6, 8])
+def test_color_masks_lut(benchmark, frame, bits):
+    lut = ColorLUT.build(UFLDv2TFLite._lane_color_classes, bits)
+    white, yellow = benchmark(lut, frame)
+    if bits == 8:  # 전체 해상도 테이블은 기존 판정과 같아야 함
+        ref_w, ref_y = UFLDv2TFLite._lane_color_classes(frame)
+        assert (white == ref_w).all() and (yellow == ref_y).all()
+
+
+@pytest.fixture(scope="module", params=MODELS, ids=os.path.basename)
+def isnet(request):
+    _require(request.param)
+    return UFLDv2TFLite(model_path=request.param, config_path=DEFAULT_CONFIG, debug=False, num_threads=1)
+
+
+def test_infer(benchmark, isnet, frame):
+    coords, _ = benchmark(isnet.infer, frame)
+    assert isinstance(coords, list)
+
+
+@pytest.mark.parametrize("video", sorted(glob.glob(VIDEOS)) or [VIDEOS], ids=os.path.basename)
+def test_video_fps(benchmark, isnet, video):
+    _require(video)
+    cap = cv2.VideoCapture(video)
+    frames = []
+    while len(frames) < VIDEO_FRAMES:
+        ok, f = cap.read()
+        if not ok:
+            break
+        frames.append(f)
+    cap.release()
+    if not frames:
+        pytest.skip(f"비디오를 읽을 수 없습니다: {video}")
+
+    def run():
+        for f in frames:
+            isnet.render(f, *isnet.infer(f))
+
+    benchmark.pedantic(run, rounds=3, warmup_rounds=1)
+    benchmark.extra_info["frames"] = len(frames)
+    benchmark.extra_info["fps"] = len(frames) / benchmark.stats.stats.mean
@@ -0,0 +1,45 @@
+# ColorLUT vs 기존 HSV/LAB 임계식 (UFLDv2TFLite._lane_color_classes)
+#   python -m pytest -q tests/test_lane_color_lut.py
+import glob
+
+import cv2
+import numpy as np
+import pytest
+
+from deploy.lane_bench import DEFAULT_IMAGES
+from deploy.lane_color_lut import ColorLUT, _classify_all_colors
+from deploy.tensorflow_lite_infer import UFLDv2TFLite
+
+CLASSIFY = UFLDv2TFLite._lane_color_classes
+# bits=2(채널당 4단계)는 셀 하나가 64^3색 → 경계 부근 픽셀이 다수결로 뒤집힘. 이미지별 불일치 픽셀 비율 상한
+MISMATCH_TOL = {2: 0.2, 5: 0.07}
+
+
+@pytest.fixture(scope="module")
+def images():
+    paths = sorted(glob.glob(DEFAULT_IMAGES))
+    if not paths:
+        pytest.skip(f"테스트 이미지가 없습니다: {DEFAULT_IMAGES}")
+    return [cv2.imread(p) for p in paths]
+
+
+@pytest.mark.parametrize("bits", sorted(MISMATCH_TOL))
+def test_lut_matches_legacy_within_quantization(images, bits):
+    lut = ColorLUT.build(CLASSIFY, bits)
+    for img in images:
+        white, yellow = lut(img)
+        ref_white, ref_yellow = CLASSIFY(img)
+        assert np.mean(white != ref_white) <= MISMATCH_TOL[bits]
+        assert np.mean(yellow != ref_yellow) <= MISMATCH_TOL[bits]
+
+
+@pytest.mark.parametrize("bits", [1, 2])
+def test_coarse_table_is_cell_majority(bits):
+    # 셀당 색 수(2^(3*(8-bits)))가 uint16 범위를 넘는 설정: 테이블이 셀 안 색의 과반 판정과 같아야 함
+    white, yellow = _classify_all_colors(CLASSIFY)
+    n, k = 1 << bits, 1 << (8 - bits)
+    cell = (n, k, n, k, n, k)
+    packed = ColorLUT.build(CLASSIFY, bits).table.view(np.uint8).reshape(-1, 2)
+    for mask, col in ((white, 0), (yellow, 1)):
+        majority = mask.reshape(cell).mean(axis=(1, 3, 5), dtype=np.float64) > 0.5
+        assert np.array_equal(packed[:, col] > 0, majority.ravel())
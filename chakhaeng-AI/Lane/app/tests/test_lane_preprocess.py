@@ -0,0 +1,70 @@
+# FusedPreprocessor vs 기존 전처리(UFLDv2TFLite.infer) 일치 검사
+#   python -m pytest -q tests/test_lane_preprocess.py
+import glob
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+from deploy.lane_bench import DEFAULT_CONFIG, DEFAULT_IMAGES, check_preprocess_parity
+from deploy.lane_preprocess import FusedPreprocessor, IMAGENET_STD, legacy_preprocess
+
+SOURCE_SIZES = ((640, 360), (1280, 720), (1920, 1080), (1640, 590))
+
+# 크롭 시작 행 반올림(원본 기준 0.5px 이내)으로 에지 부근 픽셀이 세로로 조금 밀림 → uint8 단계(LSB) 기준 허용치
+MEAN_LSB_TOL = 1.5
+P99_LSB_TOL = 16.0
+# 세로로 변화가 없는 이미지는 행 밀림의 영향이 없으므로 리사이즈 반올림 차이(1 LSB)만 허용
+FLAT_LSB_TOL = 1.0 + 1e-3
+
+LSB = 1.0 / 255.0 / np.array(IMAGENET_STD, dtype=np.float32)
+
+
+def _sources():
+    paths = sorted(glob.glob(DEFAULT_IMAGES))
+    if not paths:
+        pytest.skip(f"테스트 이미지가 없습니다: {DEFAULT_IMAGES}")
+    return [(os.path.basename(p), [cv2.imread(p)]) for p in paths]
+
+
+@pytest.fixture(scope="module")
+def parity():
+    return check_preprocess_parity(DEFAULT_CONFIG, _sources(), sizes=SOURCE_SIZES)
+
+
+@pytest.fixture(scope="module")
+def cfg():
+    from utils.config import Config
+    return Config.fromfile(DEFAULT_CONFIG)
+
+
+@pytest.fixture(scope="module")
+def fused(cfg):
+    return FusedPreprocessor(int(cfg.train_width), int(cfg.train_height), float(cfg.crop_ratio))
+
+
+def test_lut_is_bit_exact(parity):
+    assert parity["lut_exact"]
+
+
+@pytest.mark.parametrize("size", SOURCE_SIZES)
+def test_crop_row_rounding_within_half_pixel(fused, size):
+    h = size[1]
+    assert abs(fused.crop_top(h) - fused.cut_offset * h / fused.h_full) <= 0.5
+
+
+@pytest.mark.parametrize("size", SOURCE_SIZES)
+def test_flat_rows_match_legacy(cfg, fused, size):
+    w, h = size
+    row = np.random.default_rng(0).integers(0, 256, (1, w, 3), dtype=np.uint8)
+    img = np.ascontiguousarray(np.repeat(row, h, axis=0))
+    diff = np.abs(fused(img) - legacy_preprocess(img, fused.input_width, fused.input_height, float(cfg.crop_ratio)))
+    assert (diff / LSB).max() <= FLAT_LSB_TOL
+
+
+def test_dataset_images_within_tolerance(parity):
+    assert len(parity["images"]) == len(glob.glob(DEFAULT_IMAGES)) * len(SOURCE_SIZES)
+    for r in parity["images"]:
+        assert r["mean_lsb"] <= MEAN_LSB_TOL, r
+        assert r["p99_lsb"] <= P99_LSB_TOL, r
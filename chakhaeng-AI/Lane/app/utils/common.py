@@ -1,5 +1,4 @@
 import os, argparse
-from data.dali_data import TrainCollect
 from utils.dist_utils import get_rank, get_world_size, is_main_process, dist_print, DistSummaryWriter
 from utils.config import Config
 import torch
@@ -66,11 +65,15 @@ def get_args():
     parser.add_argument('--selected_lane', default = None, type = int, nargs='+')
     parser.add_argument('--cumsum', default = None, type = str2bool)
     parser.add_argument('--masked', default = None, type = str2bool)
+    # 추론(데모/검증) 전용: 설정 파일에는 합치지 않음
+    parser.add_argument('--device', default = None, type = str, help = 'cuda / cpu (기본: CUDA가 있으면 cuda)')
+    parser.add_argument('--threads', default = None, type = int, help = 'CPU intra-op 스레드 수')
+    parser.add_argument('--amp', action = 'store_true', help = 'autocast로 추론 (CPU: bf16, CUDA: fp16)')
     
     
     return parser
 
-import numpy as np
+from utils.infer_utils import set_anchors
 def merge_config():
     args = get_args().parse_args()
     cfg = Config.fromfile(args.config)
@@ -85,16 +88,8 @@ def merge_config():
             dist_print('merge ', item, ' config')
             setattr(cfg, item, getattr(args, item))
 
-    if cfg.dataset == 'CULane':
-        cfg.row_anchor = np.linspace(0.42,1, cfg.num_row)
-        cfg.col_anchor = np.linspace(0,1, cfg.num_col)
-    elif cfg.dataset == 'Tusimple':
-        cfg.row_anchor = np.linspace(160,710, cfg.num_row)/720
-        cfg.col_anchor = np.linspace(0,1, cfg.num_col)
-    elif cfg.dataset == 'CurveLanes':
-        cfg.row_anchor = np.linspace(0.4, 1, cfg.num_row)
-        cfg.col_anchor = np.linspace(0, 1, cfg.num_col)
-    
+    set_anchors(cfg)
+
     return args, cfg
 
 
@@ -176,10 +171,12 @@ def real_init_weights(m):
             print('unkonwn module', m)
             
 import importlib
-def get_model(cfg):
-    return importlib.import_module('model.model_'+cfg.dataset.lower()).get_model(cfg)
+def get_model(cfg, **kwargs):
+    return importlib.import_module('model.model_'+cfg.dataset.lower()).get_model(cfg, **kwargs)
 
 def get_train_loader(cfg):
+    # DALI는 CUDA 전용이라 학습 로더를 만들 때만 import (CPU 추론 환경에서도 utils.common을 쓸 수 있도록)
+    from data.dali_data import TrainCollect
     if cfg.dataset == 'CULane':
         train_loader = TrainCollect(cfg.batch_size, 4, cfg.data_root, os.path.join(cfg.data_root, 'list/train_gt.txt'), get_rank(), get_world_size(), 
                                 cfg.row_anchor, cfg.col_anchor, cfg.train_width, cfg.train_height, cfg.num_cell_row, cfg.num_cell_col, cfg.dataset, cfg.crop_ratio)
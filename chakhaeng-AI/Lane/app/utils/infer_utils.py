@@ -0,0 +1,83 @@
+# 장치 무관 parsingNet 추론 경로 (데모 / 체크포인트 검증 / 벤치마크 공용)
+#  - CUDA가 없으면 CPU: channels_last, inference_mode, 선택적 bf16 autocast, intra-op 스레드 수 지정
+import numpy as np
+import torch
+
+
+def resolve_device(device=None):
+    # None이면 CUDA가 있을 때만 cuda
+    if device is None:
+        device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    return torch.device(device)
+
+
+def configure_threads(threads=None, interop_threads=None):
+    # CPU intra-op / inter-op 스레드 수 (inter-op는 첫 병렬 연산 이전에만 설정 가능)
+    if threads:
+        torch.set_num_threads(int(threads))
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(int(interop_threads))
+        except RuntimeError:
+            pass
+    return torch.get_num_threads()
+
+
+def set_anchors(cfg):
+    # 데이터셋별 row/col 앵커 (merge_config와 CLI 인자 없이 설정 파일만 읽은 cfg가 공용)
+    if cfg.dataset == 'CULane':
+        cfg.row_anchor = np.linspace(0.42, 1, cfg.num_row)
+    elif cfg.dataset == 'Tusimple':
+        cfg.row_anchor = np.linspace(160, 710, cfg.num_row) / 720
+    elif cfg.dataset == 'CurveLanes':
+        cfg.row_anchor = np.linspace(0.4, 1, cfg.num_row)
+    else:
+        raise ValueError(f"앵커를 알 수 없는 데이터셋입니다: {cfg.dataset!r}")
+    cfg.col_anchor = np.linspace(0, 1, cfg.num_col)
+    return cfg
+
+
+def load_checkpoint(net, path):
+    state_dict = torch.load(path, map_location='cpu')['model']
+    # 'module.' prefix 정리 (DDP로 저장된 체크포인트)
+    state_dict = {(k[7:] if k.startswith('module.') else k): v for k, v in state_dict.items()}
+    net.load_state_dict(state_dict, strict=False)
+    return net
+
+
+def prepare_model(net, device, channels_last=None):
+    """
+    eval + 장치 이동. channels_last를 지정하지 않으면 CPU에서만 사용 (oneDNN 합성곱이 NHWC에서 빠름)
+    """
+    device = resolve_device(device)
+    if channels_last is None:
+        channels_last = device.type == 'cpu'
+    net = net.eval().to(device, memory_format=torch.channels_last if channels_last else torch.contiguous_format)
+    net.channels_last = bool(channels_last)
+    return net
+
+
+def build_model(cfg, checkpoint=None, device=None, channels_last=None):
+    """
+    cfg로 parsingNet 생성 → (체크포인트 로드) → prepare_model
+    추론 전용이라 ImageNet 사전학습 가중치는 받지 않음 (체크포인트가 없으면 무작위 가중치)
+    """
+    from utils.common import get_model
+    device = resolve_device(device)
+    net = get_model(cfg, device=device, pretrained=False)
+    if checkpoint is not None:
+        load_checkpoint(net, checkpoint)
+    return prepare_model(net, device, channels_last)
+
+
+def forward(net, x, amp=False):
+    """
+    x: [N, 3, H, W] (어느 장치든) -> pred dict (float32)
+    amp: autocast (CUDA: fp16, CPU: bf16)
+    """
+    param = next(net.parameters())
+    memory_format = torch.channels_last if getattr(net, 'channels_last', False) else torch.contiguous_format
+    x = x.to(param.device, non_blocking=True).contiguous(memory_format=memory_format)
+    with torch.inference_mode(), torch.autocast(device_type=param.device.type, enabled=amp):
+        pred = net(x)
+    return {k: v.float() for k, v in pred.items()}